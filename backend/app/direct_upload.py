@@ -0,0 +1,91 @@
+"""
+Direct-to-storage uploads.
+
+Instead of posting the file through the API, the client:
+
+1. calls `POST /storage/upload-url`, which returns a Supabase signed upload
+   URL for a server-chosen object path plus an `upload_ticket`;
+2. PUTs the bytes straight to Supabase Storage;
+3. calls `POST /storage/upload-complete` with the ticket. The API checks the
+   object exists, inserts the `case_documents` row and queues OCR and
+   summarization as a background job.
+
+The ticket is a short-lived HS256 token binding the bucket, object path,
+case and user, so a completion can only register the object the same user
+was given a URL for. Supabase's own signed URLs stay valid for two hours;
+`DIRECT_UPLOAD_TTL` bounds how long a completion is accepted.
+"""
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import jwt
+
+from .supabase_client import SUPABASE_SERVICE_ROLE_KEY
+from .utils import sanitize_filename
+
+DIRECT_UPLOAD_TTL = int(os.environ.get('DIRECT_UPLOAD_TTL', '900'))
+DIRECT_UPLOAD_MAX_BYTES = int(os.environ.get('DIRECT_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+_TICKET_SECRET = (
+    os.environ.get('UPLOAD_TICKET_SECRET')
+    or os.environ.get('SUPABASE_JWT_SECRET')
+    or SUPABASE_SERVICE_ROLE_KEY
+)
+_TICKET_AUDIENCE = 'direct-upload'
+
+DIRECT_UPLOAD_BUCKETS = ('case-documents', 'eligibility-documents')
+ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'}
+
+
+class UploadTicketError(ValueError):
+    """The upload ticket is missing, forged, expired or for another user."""
+
+
+def object_path(bucket: str, case_id: str, user_id: str, file_name: str) -> str:
+    """Storage path for a new upload, following the layout of the proxied upload endpoints."""
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    unique_id = uuid.uuid4().hex[:8]
+    ext = Path(file_name).suffix.lower()
+    stem = sanitize_filename(Path(file_name).stem)
+    safe_name = f"{stem}_{unique_id}{ext}"
+    if bucket == 'eligibility-documents':
+        return f"{user_id or 'anonymous'}/{timestamp}_{safe_name}"
+    return f"cases/{case_id}/documents/{timestamp}_{safe_name}"
+
+
+def issue_ticket(bucket: str, path: str, case_id: str, user_id: str, file_name: str,
+                 content_type: Optional[str], document_type: str) -> str:
+    if not _TICKET_SECRET:
+        raise RuntimeError('Upload ticket secret not configured')
+    now = int(time.time())
+    payload = {
+        'aud': _TICKET_AUDIENCE,
+        'iat': now,
+        'exp': now + DIRECT_UPLOAD_TTL,
+        'sub': str(user_id),
+        'bucket': bucket,
+        'path': path,
+        'case_id': case_id,
+        'file_name': file_name,
+        'content_type': content_type,
+        'document_type': document_type,
+    }
+    return jwt.encode(payload, _TICKET_SECRET, algorithm='HS256')
+
+
+def verify_ticket(ticket: str, user_id: str) -> Dict[str, Any]:
+    """Return the ticket payload; raise UploadTicketError if it is not valid for user_id."""
+    if not ticket or not _TICKET_SECRET:
+        raise UploadTicketError('invalid_upload_ticket')
+    try:
+        payload = jwt.decode(ticket, _TICKET_SECRET, algorithms=['HS256'], audience=_TICKET_AUDIENCE)
+    except jwt.ExpiredSignatureError:
+        raise UploadTicketError('upload_ticket_expired')
+    except jwt.PyJWTError:
+        raise UploadTicketError('invalid_upload_ticket')
+    if payload.get('sub') != str(user_id) or payload.get('bucket') not in DIRECT_UPLOAD_BUCKETS:
+        raise UploadTicketError('invalid_upload_ticket')
+    return payload
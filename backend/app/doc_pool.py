@@ -0,0 +1,115 @@
+"""
+Shared process pool for CPU-bound document work.
+
+PyMuPDF rendering and text-layer checks, PyPDF2 fallback extraction and
+pdfminer parsing hold the GIL for seconds on large documents. Run on the
+event loop (or in a thread) they stall every other request on the worker,
+including interview chat and job polling. They are submitted here instead:
+
+    text = await doc_pool.run(extract_text_from_pdf_file, path)
+
+- `DOC_POOL_WORKERS` processes (default: up to 4, one per CPU). Set it to 0
+  to fall back to a thread pool, e.g. where subprocesses are not allowed.
+- Workers are started with `DOC_POOL_START_METHOD` (spawn by default: the
+  API process has live threads and sockets that must not be forked) and
+  replaced after `DOC_WORKER_MAX_TASKS` tasks to bound MuPDF memory growth.
+- Each task has a timeout (`DOC_TASK_TIMEOUT` seconds unless given);
+  callers get DocumentTaskTimeout. A running task cannot be interrupted, so
+  its worker is only freed when the task finishes.
+- A worker crash (e.g. MuPDF aborting on a malformed file) breaks the pool;
+  it is rebuilt on the next submission.
+
+Tasks must be top-level functions with picklable arguments: pass file paths
+rather than open files or memory maps.
+"""
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger('doc_pool')
+
+DOC_POOL_WORKERS = int(os.environ.get('DOC_POOL_WORKERS', str(min(4, os.cpu_count() or 1))))
+DOC_POOL_START_METHOD = os.environ.get('DOC_POOL_START_METHOD', 'spawn')
+DOC_WORKER_MAX_TASKS = int(os.environ.get('DOC_WORKER_MAX_TASKS', '100'))
+DOC_TASK_TIMEOUT = float(os.environ.get('DOC_TASK_TIMEOUT', '120'))
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+
+
+class DocumentTaskTimeout(TimeoutError):
+    """A document task did not finish within its timeout."""
+
+
+def uses_processes() -> bool:
+    return DOC_POOL_WORKERS > 0
+
+
+def get_pool() -> Executor:
+    """Get or create the shared executor"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if uses_processes():
+                    kwargs = {'max_workers': DOC_POOL_WORKERS,
+                              'mp_context': multiprocessing.get_context(DOC_POOL_START_METHOD)}
+                    if DOC_WORKER_MAX_TASKS > 0 and DOC_POOL_START_METHOD != 'fork':
+                        kwargs['max_tasks_per_child'] = DOC_WORKER_MAX_TASKS
+                    _pool = ProcessPoolExecutor(**kwargs)
+                    logger.info(f'Started document process pool: workers={DOC_POOL_WORKERS}, start={DOC_POOL_START_METHOD}')
+                else:
+                    _pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='doc-work')
+    return _pool
+
+
+def _discard_broken(pool: Executor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    logger.error('Document process pool broke (a worker died); it will be restarted')
+
+
+async def run(func: Callable, *args, timeout: Optional[float] = None) -> Any:
+    """Run func(*args) in the pool without blocking the event loop."""
+    pool = get_pool()
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(pool, func, *args), timeout or DOC_TASK_TIMEOUT)
+    except asyncio.TimeoutError:
+        name = getattr(func, '__name__', repr(func))
+        logger.warning(f'Document task {name} timed out after {timeout or DOC_TASK_TIMEOUT}s')
+        raise DocumentTaskTimeout(f'{name} timed out')
+    except BrokenProcessPool:
+        _discard_broken(pool)
+        raise
+
+
+def run_blocking(func: Callable, *args, timeout: Optional[float] = None) -> Any:
+    """Sync counterpart of run() for code that is not on an event loop."""
+    pool = get_pool()
+    try:
+        return pool.submit(func, *args).result(timeout=timeout or DOC_TASK_TIMEOUT)
+    except FutureTimeoutError:
+        name = getattr(func, '__name__', repr(func))
+        logger.warning(f'Document task {name} timed out after {timeout or DOC_TASK_TIMEOUT}s')
+        raise DocumentTaskTimeout(f'{name} timed out')
+    except BrokenProcessPool:
+        _discard_broken(pool)
+        raise
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
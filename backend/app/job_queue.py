@@ -1,17 +1,180 @@
 """
-In-memory job queue system for long-running tasks.
-Provides job creation, status tracking, and result storage without database dependency.
+Job queue system for long-running tasks.
+Provides job creation, status tracking, and result storage. Jobs run in the
+process that created them; their state is written through a JobStore
+(see job_store.py) so any worker can report on them.
 """
+import os
+import json
+import math
+import time
 import uuid
+import heapq
+import hashlib
+import socket
 import asyncio
-from typing import Dict, Any, Optional, Callable
-from datetime import datetime, timedelta
-from enum import Enum
+import random
+import itertools
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Callable
+from datetime import datetime, timedelta, timezone
+from enum import Enum, IntEnum
 import logging
 import traceback
 
+from .job_store import JobStore, JOB_STORE_FLUSH_INTERVAL, create_job_store
+
 logger = logging.getLogger(__name__)
 
+# Running jobs re-save at least this often; a stored running job not updated
+# for JOB_STALE_SECONDS is reported as failed (its worker is gone)
+JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '300'))
+JOB_MAX_AGE_HOURS = int(os.environ.get('JOB_MAX_AGE_HOURS', '24'))
+# watch_job: how often to re-read jobs owned by another worker from the store
+JOB_EVENTS_POLL_SECONDS = float(os.environ.get('JOB_EVENTS_POLL_SECONDS', '1'))
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    """'type_a=3,type_b=1' -> {'type_a': 3, 'type_b': 1}"""
+    limits = {}
+    for item in (value or '').split(','):
+        name, _, count = item.partition('=')
+        if name.strip() and count.strip().isdigit():
+            limits[name.strip()] = int(count)
+    return limits
+
+
+# Scheduler: jobs submitted with JobQueue.submit wait in a priority queue and
+# start when both a worker slot and a slot for their job type are free.
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '8'))
+JOB_DEFAULT_CONCURRENCY = int(os.environ.get('JOB_DEFAULT_CONCURRENCY', '2'))
+JOB_TYPE_CONCURRENCY = {
+    'vapi_call_analysis': 3,
+    'call_analysis': 2,
+    'document_analysis_agent': 2,
+    'document_processing': 4,
+    **_parse_limits(os.environ.get('JOB_TYPE_CONCURRENCY', '')),
+}
+JOB_INTERACTIVE_TYPES = set(
+    t.strip() for t in os.environ.get('JOB_INTERACTIVE_TYPES', 'vapi_call_analysis,document_processing').split(',')
+    if t.strip()
+)
+# Share of JOB_WORKERS background jobs may occupy; the rest is kept for interactive jobs
+JOB_BACKGROUND_SHARE = float(os.environ.get('JOB_BACKGROUND_SHARE', '0.75'))
+JOB_MAX_QUEUE_DEPTH = int(os.environ.get('JOB_MAX_QUEUE_DEPTH', '50'))
+# How long a completed job keeps answering repeat submissions with the same idempotency key
+JOB_IDEMPOTENCY_WINDOW = int(os.environ.get('JOB_IDEMPOTENCY_WINDOW', '600'))
+
+
+def idempotency_key(job_type: str, case_id: Optional[str], *inputs) -> str:
+    """Key for create_job: the job type, the case and a hash of the job's inputs"""
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{job_type}:{case_id}:{digest[:32]}"
+
+
+# Retries: attempts per job type (1 = no retry) and exponential backoff between them
+JOB_DEFAULT_ATTEMPTS = int(os.environ.get('JOB_DEFAULT_ATTEMPTS', '2'))
+JOB_RETRY_ATTEMPTS = {
+    'vapi_call_analysis': 4,
+    'call_analysis': 4,
+    'document_analysis_agent': 3,
+    'document_processing': 2,
+    **_parse_limits(os.environ.get('JOB_RETRY_ATTEMPTS', '')),
+}
+JOB_RETRY_BASE_DELAY = float(os.environ.get('JOB_RETRY_BASE_DELAY', '2'))
+JOB_RETRY_MAX_DELAY = float(os.environ.get('JOB_RETRY_MAX_DELAY', '60'))
+# Hard limit on one attempt, in seconds (0 = none)
+JOB_DEFAULT_TIMEOUT = int(os.environ.get('JOB_DEFAULT_TIMEOUT', '900'))
+JOB_TIMEOUTS = {
+    'vapi_call_analysis': 300,
+    'call_analysis': 300,
+    'document_analysis_agent': 600,
+    'document_processing': 900,
+    **_parse_limits(os.environ.get('JOB_TIMEOUTS', '')),
+}
+JOB_DEAD_LETTER_MAX = int(os.environ.get('JOB_DEAD_LETTER_MAX', '200'))
+
+# HTTP statuses worth retrying (rate limits, overloaded or failing upstreams)
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+# Connection-level errors of openai/httpx, matched by name so neither needs importing here
+TRANSIENT_ERROR_NAMES = {
+    'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError',
+    'ConnectError', 'ConnectTimeout', 'ReadTimeout', 'ReadError', 'RemoteProtocolError', 'PoolTimeout',
+}
+
+
+class TransientJobError(Exception):
+    """Raise from a job to have it retried under its job type's policy"""
+
+
+class JobTimeout(Exception):
+    """An attempt ran longer than its job type's timeout"""
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Whether an error is likely to go away on retry (429, 5xx, dropped connections)"""
+    if isinstance(exc, TransientJobError):
+        return True
+    status = getattr(exc, 'status_code', None) or getattr(getattr(exc, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS_CODES or status >= 500
+    return type(exc).__name__ in TRANSIENT_ERROR_NAMES or isinstance(exc, ConnectionError)
+
+
+class RetryPolicy:
+    """How a job type is retried and timed out"""
+    
+    def __init__(self, max_attempts: int = 1, timeout: Optional[float] = None,
+                 base_delay: float = JOB_RETRY_BASE_DELAY, max_delay: float = JOB_RETRY_MAX_DELAY,
+                 retry_on: Callable[[BaseException], bool] = is_transient_error):
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout or None
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+    
+    @classmethod
+    def for_job_type(cls, job_type: str) -> 'RetryPolicy':
+        return cls(
+            max_attempts=JOB_RETRY_ATTEMPTS.get(job_type, JOB_DEFAULT_ATTEMPTS),
+            timeout=JOB_TIMEOUTS.get(job_type, JOB_DEFAULT_TIMEOUT)
+        )
+    
+    def delay(self, attempt: int) -> float:
+        """Backoff after the given (1-based) failed attempt, with jitter"""
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+
+class JobPriority(IntEnum):
+    """Scheduling classes; lower runs first"""
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+
+class JobQueueFull(Exception):
+    """Too many jobs of this type are already waiting"""
+    
+    def __init__(self, job_type: str, depth: int, retry_after: int):
+        super().__init__(f"{job_type} queue is full ({depth} waiting)")
+        self.job_type = job_type
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """ISO string from a store -> naive UTC datetime, like datetime.utcnow()"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 
 class JobStatus(str, Enum):
     """Job status states"""
@@ -36,8 +199,84 @@ class Job:
         self.completed_at: Optional[datetime] = None
         self.progress: int = 0  # 0-100 percentage
         self.progress_message: str = ""
+        # Results available before completion (per-page OCR text, preliminary summaries)
+        self.partial: Optional[Dict[str, Any]] = None
+        self.pages: Dict[int, str] = {}
+        self.owner: Optional[str] = None
+        self.updated_at: datetime = self.created_at
+        # Failed for good (retries exhausted, permanent error or timeout)
+        self.dead_letter: bool = False
+        self.error_traceback: Optional[str] = None
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_record(self) -> Dict[str, Any]:
+        """Flat representation written to the job store"""
+        return {
+            'job_id': self.job_id,
+            'job_type': self.job_type,
+            'status': self.status.value,
+            'user_id': self.metadata.get('user_id'),
+            'metadata': self.metadata,
+            'result': self.result,
+            'error': self.error,
+            'created_at': _iso(self.created_at),
+            'started_at': _iso(self.started_at),
+            'completed_at': _iso(self.completed_at),
+            'progress': self.progress,
+            'progress_message': self.progress_message,
+            'partial': self.partial,
+            'pages': {str(k): v for k, v in self.pages.items()} or None,
+            'owner': self.owner,
+            'updated_at': _iso(self.updated_at),
+            'idempotency_key': self.metadata.get('idempotency_key'),
+            'dead_letter': self.dead_letter,
+            'error_traceback': self.error_traceback,
+        }
+    
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'Job':
+        job = cls(record['job_id'], record['job_type'], record.get('metadata'))
+        job.status = JobStatus(record['status'])
+        job.result = record.get('result')
+        job.error = record.get('error')
+        job.created_at = _parse_time(record.get('created_at')) or job.created_at
+        job.started_at = _parse_time(record.get('started_at'))
+        job.completed_at = _parse_time(record.get('completed_at'))
+        job.progress = record.get('progress') or 0
+        job.progress_message = record.get('progress_message') or ''
+        job.partial = record.get('partial')
+        job.pages = {int(k): v for k, v in (record.get('pages') or {}).items()}
+        job.owner = record.get('owner')
+        job.updated_at = _parse_time(record.get('updated_at')) or job.created_at
+        job.dead_letter = bool(record.get('dead_letter'))
+        job.error_traceback = record.get('error_traceback')
+        return job
+    
+    def is_stale(self) -> bool:
+        """Unfinished, but its worker has stopped saving it"""
+        if self.status not in (JobStatus.PENDING, JobStatus.RUNNING):
+            return False
+        return (datetime.utcnow() - self.updated_at).total_seconds() > JOB_STALE_SECONDS
+    
+    def ready_pages(self) -> List[str]:
+        """Text of the pages finished so far, up to the first page still pending"""
+        ready = []
+        while len(ready) in self.pages:
+            ready.append(self.pages[len(ready)])
+        return ready
+    
+    def partial_dict(self, include_text: bool = False) -> Optional[Dict[str, Any]]:
+        if self.partial is None:
+            return None
+        data = dict(self.partial)
+        if 'page_count' in data:
+            ready = self.ready_pages()
+            data['pages_done'] = len(self.pages)
+            data['ready_pages'] = len(ready)
+            if include_text:
+                data['pages'] = ready
+        return data
+    
+    def to_dict(self, include_partial_text: bool = False) -> Dict[str, Any]:
         """Convert job to dictionary for API responses"""
         return {
             'job_id': self.job_id,
@@ -50,36 +289,374 @@ class Job:
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'progress': self.progress,
-            'progress_message': self.progress_message
+            'progress_message': self.progress_message,
+            'partial': self.partial_dict(include_partial_text)
         }
 
 
 class JobQueue:
-    """In-memory job queue manager"""
+    """Job queue manager; `jobs` holds the jobs running in this process"""
     
-    def __init__(self):
+    def __init__(self, store: Optional[JobStore] = None):
         self.jobs: Dict[str, Job] = {}
         self._lock = asyncio.Lock()
+        self.store = store or create_job_store()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._dirty: set = set()
+        self._flush_now: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flusher_loop = None
+        self._last_cleanup = datetime.utcnow()
+        # Scheduler state
+        self._pending: List[tuple] = []  # heap of (priority, seq, job_id, task_func, args, kwargs)
+        self._seq = itertools.count()
+        self._running: Counter = Counter()
+        self._durations: Dict[str, float] = {}  # moving average run time per job type
+        self._submitted: set = set()  # job ids queued or running via submit()
+        self._by_key: Dict[str, str] = {}  # idempotency key -> job_id
+        self._watchers: Dict[str, set] = {}  # job_id -> asyncio.Events of open watch_job streams
+        self._tasks: Dict[str, asyncio.Task] = {}  # job_id -> task running execute_job
+        self._cancelled: set = set()
+        self.policies: Dict[str, RetryPolicy] = {}  # overrides of RetryPolicy.for_job_type
+        # job_id -> (task_func, args, kwargs) of this process's dead letters, for retry_dead_letter;
+        # the dead-letter state itself is saved with the job
+        self._dead_tasks: OrderedDict = OrderedDict()
+    
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def concurrency_limit(job_type: str) -> int:
+        return JOB_TYPE_CONCURRENCY.get(job_type, JOB_DEFAULT_CONCURRENCY)
+    
+    @staticmethod
+    def priority_for(job_type: str) -> int:
+        return JobPriority.INTERACTIVE if job_type in JOB_INTERACTIVE_TYPES else JobPriority.BACKGROUND
+    
+    def queue_depth(self, job_type: Optional[str] = None) -> int:
+        """Jobs submitted but not yet started (of one type, or all)"""
+        if job_type is None:
+            return len(self._pending)
+        return sum(1 for item in self._pending if self._job_type_of(item[2]) == job_type)
+    
+    def _job_type_of(self, job_id: str) -> Optional[str]:
+        job = self.jobs.get(job_id)
+        return job.job_type if job else None
+    
+    def estimate_wait(self, job_type: str) -> int:
+        """Seconds until a newly submitted job of this type would likely start"""
+        average = self._durations.get(job_type, 30.0)
+        waves = (self.queue_depth(job_type) + 1) / max(self.concurrency_limit(job_type), 1)
+        return max(1, math.ceil(average * waves))
+    
+    async def submit(self, job_id: str, task_func: Callable, *args, priority: Optional[int] = None,
+                     reject_when_full: bool = True, **kwargs):
+        """
+        Queue a created job for execution under the scheduler's limits
+        
+        Args:
+            job_id: Job ID from create_job
+            task_func: Async function to execute
+            priority: JobPriority; defaults by job type (JOB_INTERACTIVE_TYPES)
+            reject_when_full: Raise JobQueueFull (and fail the job) when JOB_MAX_QUEUE_DEPTH
+                jobs of this type are already waiting; False always queues
+            *args, **kwargs: Arguments to pass to task_func
+        """
+        job = self.get_job(job_id)
+        if not job:
+            # create_job_once attached to a job of another worker, which runs it
+            logger.info(f"[JOB] Job {job_id} is not owned by this process; not submitting")
+            return
+        if job_id in self._submitted or job.status != JobStatus.PENDING:
+            return  # create_job handed back an existing job for this idempotency key
+        depth = self.queue_depth(job.job_type)
+        if reject_when_full and depth >= JOB_MAX_QUEUE_DEPTH:
+            retry_after = self.estimate_wait(job.job_type)
+            await self.fail_job(job_id, f"Rejected: {job.job_type} queue is full")
+            logger.warning(f"[JOB] 🚦 Rejected job {job_id}: {depth} {job.job_type} jobs waiting")
+            raise JobQueueFull(job.job_type, depth, retry_after)
+        
+        if priority is None:
+            priority = self.priority_for(job.job_type)
+        heapq.heappush(self._pending, (int(priority), next(self._seq), job_id, task_func, args, kwargs))
+        self._submitted.add(job_id)
+        await self.update_job_progress(job_id, 0, f"Queued ({depth} ahead)" if depth else "Queued")
+        self._dispatch()
     
-    def create_job(self, job_type: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    def _dispatch(self):
+        """Start every queued job that fits the worker and per-type limits, highest priority first"""
+        background_cap = max(1, int(JOB_WORKERS * JOB_BACKGROUND_SHARE))
+        running_total = sum(self._running.values())
+        held = []
+        while self._pending and running_total < JOB_WORKERS:
+            item = heapq.heappop(self._pending)
+            priority, _, job_id, task_func, args, kwargs = item
+            job_type = self._job_type_of(job_id)
+            if job_type is None:
+                self._submitted.discard(job_id)
+                continue  # cleaned up while waiting
+            if self._running[job_type] >= self.concurrency_limit(job_type) or (
+                priority >= JobPriority.BACKGROUND and running_total >= background_cap
+            ):
+                held.append(item)
+                continue
+            self._running[job_type] += 1
+            running_total += 1
+            asyncio.get_running_loop().create_task(self._run_scheduled(job_id, job_type, task_func, args, kwargs))
+        for item in held:
+            heapq.heappush(self._pending, item)
+    
+    async def _run_scheduled(self, job_id: str, job_type: str, task_func: Callable, args: tuple, kwargs: dict):
+        started = time.monotonic()
+        try:
+            await self.execute_job(job_id, task_func, *args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            previous = self._durations.get(job_type)
+            self._durations[job_type] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+            self._running[job_type] -= 1
+            self._submitted.discard(job_id)
+            self._dispatch()
+    
+    def scheduler_stats(self) -> Dict[str, Any]:
+        types = set(self._running) | {self._job_type_of(item[2]) for item in self._pending} - {None}
+        return {
+            'workers': JOB_WORKERS,
+            'running': sum(self._running.values()),
+            'queued': len(self._pending),
+            'max_queue_depth': JOB_MAX_QUEUE_DEPTH,
+            'types': {
+                t: {
+                    'running': self._running.get(t, 0),
+                    'queued': self.queue_depth(t),
+                    'limit': self.concurrency_limit(t),
+                    'priority': JobPriority(self.priority_for(t)).name.lower(),
+                    'avg_seconds': round(self._durations[t], 1) if t in self._durations else None,
+                }
+                for t in sorted(types)
+            }
+        }
+    
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    
+    def _touch(self, job_id: str, urgent: bool = False):
+        """Queue the job for the next batched write to the store"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.updated_at = datetime.utcnow()
+        self._dirty.add(job_id)
+        self._ensure_flusher()
+        if urgent and self._flush_now is not None:
+            self._flush_now.set()
+        for event in self._watchers.get(job_id, ()):
+            event.set()
+    
+    def _ensure_flusher(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; the next call from async code starts it
+        if self._flusher is None or self._flusher.done() or self._flusher_loop is not loop:
+            self._flush_now = asyncio.Event()
+            self._flusher_loop = loop
+            self._flusher = loop.create_task(self._flush_loop())
+    
+    async def _flush_loop(self):
+        last_heartbeat = datetime.utcnow()
+        while True:
+            # asyncio.wait rather than wait_for: wait_for can swallow a cancel
+            # that races with the event being set, and the loop never exits
+            waiter = asyncio.ensure_future(self._flush_now.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=JOB_STORE_FLUSH_INTERVAL)
+            finally:
+                waiter.cancel()
+            self._flush_now.clear()
+            now = datetime.utcnow()
+            if (now - last_heartbeat).total_seconds() >= JOB_HEARTBEAT_SECONDS:
+                last_heartbeat = now
+                for job in self.jobs.values():
+                    if job.status in (JobStatus.PENDING, JobStatus.RUNNING):
+                        job.updated_at = now
+                        self._dirty.add(job.job_id)
+            await self.flush()
+            if (now - self._last_cleanup).total_seconds() >= 3600:
+                self._last_cleanup = now
+                await self.cleanup_old_jobs_async(JOB_MAX_AGE_HOURS)
+    
+    async def flush(self):
+        """Write every changed job to the store in one batch"""
+        if not self._dirty:
+            return
+        job_ids, self._dirty = self._dirty, set()
+        records = [self.jobs[j].to_record() for j in job_ids if j in self.jobs]
+        try:
+            await self.store.save_many(records)
+        except Exception as e:
+            logger.warning(f"[JOB] Failed to save {len(records)} job(s) to {self.store.name} store: {e}")
+            self._dirty |= job_ids
+    
+    async def fetch_job(self, job_id: str) -> Optional[Job]:
+        """Get a job from this process or, failing that, the shared store"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            record = await self.store.load(job_id)
+        except Exception as e:
+            logger.warning(f"[JOB] Failed to load job {job_id} from {self.store.name} store: {e}")
+            return None
+        if not record:
+            return None
+        job = Job.from_record(record)
+        if job.is_stale():
+            job.status = JobStatus.FAILED
+            job.error = f"Job lost: worker {job.owner} stopped before finishing"
+        return job
+    
+    async def watch_job(self, job_id: str, include_partial_text: bool = False):
+        """
+        Yield changes to a job as they happen, until it completes or fails
+        
+        The first item is the full Job.to_dict(); later items hold only the keys
+        whose value changed, plus job_id. With include_partial_text, a changed
+        `partial` carries only the pages that became ready since the previous
+        item, as `pages_added` (appended after the pages already sent), instead
+        of the whole `pages` list. Changes made while the consumer is busy
+        are merged into one item. Jobs running in this process are followed
+        through _touch (every state change); jobs of other workers are re-read
+        from the store every JOB_EVENTS_POLL_SECONDS.
+        """
+        event = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(event)
+        last: Dict[str, Any] = {}
+        pages_sent = 0
+        try:
+            while True:
+                event.clear()
+                job = await self.fetch_job(job_id)
+                if job is None:
+                    return
+                current = job.to_dict(include_partial_text=include_partial_text)
+                delta = {k: v for k, v in current.items() if k not in last or last[k] != v}
+                partial = delta.get('partial')
+                if partial and 'pages' in partial:
+                    pages = partial['pages']
+                    if last:
+                        delta['partial'] = {k: v for k, v in partial.items() if k != 'pages'}
+                        if len(pages) > pages_sent:
+                            delta['partial']['pages_added'] = pages[pages_sent:]
+                    pages_sent = len(pages)
+                if delta:
+                    yield {'job_id': job_id, **delta}
+                last = current
+                if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                    return
+                if job_id in self.jobs:
+                    await event.wait()
+                else:
+                    await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(event)
+                if not watchers:
+                    del self._watchers[job_id]
+    
+    async def list_jobs(self, user_id: Optional[str] = None) -> List[Job]:
+        """Jobs from the shared store plus this process, newest first"""
+        jobs: Dict[str, Job] = {}
+        try:
+            for record in await self.store.list(user_id=user_id):
+                job = Job.from_record(record)
+                if job.is_stale():
+                    job.status = JobStatus.FAILED
+                    job.error = f"Job lost: worker {job.owner} stopped before finishing"
+                jobs[job.job_id] = job
+        except Exception as e:
+            logger.warning(f"[JOB] Failed to list jobs from {self.store.name} store: {e}")
+        for job in self.jobs.values():
+            if user_id is None or job.metadata.get('user_id') == user_id:
+                jobs[job.job_id] = job
+        return sorted(jobs.values(), key=lambda j: j.created_at, reverse=True)
+    
+    def create_job(self, job_type: str, metadata: Optional[Dict[str, Any]] = None,
+                   idempotency_key: Optional[str] = None, reuse_window: Optional[float] = None) -> str:
         """
         Create a new job and return its ID
         
         Args:
             job_type: Type of job (e.g., 'call_analysis', 'document_analysis')
             metadata: Optional metadata to associate with the job
+            idempotency_key: Optional key (see idempotency_key()). While a job of this process
+                with the same key is pending or running, or completed within reuse_window
+                seconds (default JOB_IDEMPOTENCY_WINDOW), its ID is returned instead of creating
+                a new job; submitting it again is a no-op. create_job_once also checks the store.
         
         Returns:
             job_id: Unique identifier for the job
         """
+        if idempotency_key:
+            existing = self.find_by_key(idempotency_key, reuse_window)
+            if existing:
+                logger.info(f"Reusing job {existing.job_id} ({existing.status.value}) for {idempotency_key}")
+                return existing.job_id
+            metadata = {**(metadata or {}), 'idempotency_key': idempotency_key}
         job_id = str(uuid.uuid4())
         job = Job(job_id, job_type, metadata)
+        job.owner = self.owner
         self.jobs[job_id] = job
+        if idempotency_key:
+            self._by_key[idempotency_key] = job_id
+        self._touch(job_id, urgent=True)
         logger.info(f"Created job {job_id} of type {job_type}")
         return job_id
     
+    @staticmethod
+    def _reusable(job: Job, reuse_window: Optional[float] = None) -> bool:
+        """Whether a new submission with the same idempotency key should attach to job"""
+        if job.status in (JobStatus.PENDING, JobStatus.RUNNING):
+            return not job.is_stale()
+        window = JOB_IDEMPOTENCY_WINDOW if reuse_window is None else reuse_window
+        return (job.status == JobStatus.COMPLETED and job.completed_at is not None
+                and (datetime.utcnow() - job.completed_at).total_seconds() <= window)
+    
+    def find_by_key(self, idempotency_key: str, reuse_window: Optional[float] = None) -> Optional[Job]:
+        """Job of this process that a new submission with this key should attach to"""
+        job = self.jobs.get(self._by_key.get(idempotency_key, ''))
+        if job is None:
+            self._by_key.pop(idempotency_key, None)
+            return None
+        return job if self._reusable(job, reuse_window) else None
+    
+    async def create_job_once(self, job_type: str, metadata: Optional[Dict[str, Any]], idempotency_key: str,
+                              reuse_window: Optional[float] = None) -> str:
+        """
+        create_job, attaching to a reusable job with the same key in this process or,
+        failing that, in the shared store (jobs of other workers). The returned job may
+        belong to another worker: read it with fetch_job; submit() leaves it alone.
+        """
+        existing = self.find_by_key(idempotency_key, reuse_window)
+        if existing:
+            return existing.job_id
+        try:
+            record = await self.store.find_by_key(idempotency_key)
+        except Exception as e:
+            logger.warning(f"[JOB] Idempotency lookup in {self.store.name} store failed: {e}")
+            record = None
+        if record and record['job_id'] not in self.jobs:
+            job = Job.from_record(record)
+            if self._reusable(job, reuse_window):
+                logger.info(f"Reusing job {job.job_id} ({job.status.value}) of {job.owner} for {idempotency_key}")
+                return job.job_id
+        return self.create_job(job_type, metadata, idempotency_key=idempotency_key, reuse_window=reuse_window)
+    
     def get_job(self, job_id: str) -> Optional[Job]:
-        """Get a job by ID"""
+        """Get a job of this process by ID (fetch_job also sees other workers' jobs)"""
         return self.jobs.get(job_id)
     
     async def update_job_progress(self, job_id: str, progress: int, message: str = ""):
@@ -89,8 +666,33 @@ class JobQueue:
             async with self._lock:
                 job.progress = progress
                 job.progress_message = message
+                self._touch(job_id)
                 logger.debug(f"Job {job_id} progress: {progress}% - {message}")
     
+    async def record_page(self, job_id: str, index: int, page_count: int, text: str,
+                          progress_start: int = 0, progress_end: int = 100):
+        """Store one finished page and move progress proportionally between progress_start and progress_end"""
+        job = self.get_job(job_id)
+        if job:
+            async with self._lock:
+                job.pages[index] = text
+                if job.partial is None:
+                    job.partial = {}
+                job.partial['page_count'] = page_count
+                done = len(job.pages)
+                job.progress = progress_start + (progress_end - progress_start) * done // max(page_count, 1)
+                job.progress_message = f"Extracted page {done}/{page_count}"
+                self._touch(job_id)
+                logger.debug(f"Job {job_id} page {index + 1}/{page_count} ready")
+    
+    async def update_job_partial(self, job_id: str, **fields):
+        """Merge fields into the job's partial results"""
+        job = self.get_job(job_id)
+        if job:
+            async with self._lock:
+                job.partial = {**(job.partial or {}), **fields}
+                self._touch(job_id)
+    
     async def start_job(self, job_id: str):
         """Mark a job as running"""
         job = self.get_job(job_id)
@@ -98,6 +700,7 @@ class JobQueue:
             async with self._lock:
                 job.status = JobStatus.RUNNING
                 job.started_at = datetime.utcnow()
+                self._touch(job_id)
                 logger.info(f"Started job {job_id}")
     
     async def complete_job(self, job_id: str, result: Dict[str, Any]):
@@ -110,6 +713,7 @@ class JobQueue:
                 job.completed_at = datetime.utcnow()
                 job.progress = 100
                 job.progress_message = "Completed"
+                self._touch(job_id, urgent=True)
                 logger.info(f"Completed job {job_id}")
     
     async def fail_job(self, job_id: str, error: str):
@@ -120,8 +724,12 @@ class JobQueue:
                 job.status = JobStatus.FAILED
                 job.error = error
                 job.completed_at = datetime.utcnow()
+                self._touch(job_id, urgent=True)
                 logger.error(f"Failed job {job_id}: {error}")
     
+    def policy_for(self, job_type: str) -> RetryPolicy:
+        return self.policies.get(job_type) or RetryPolicy.for_job_type(job_type)
+    
     async def execute_job(
         self,
         job_id: str,
@@ -132,6 +740,10 @@ class JobQueue:
         """
         Execute a job asynchronously in the background
         
+        Each attempt is limited to the job type's timeout. Transient errors
+        (see is_transient_error) are retried with exponential backoff up to the
+        policy's max_attempts; a job that still fails is dead-lettered.
+        
         Args:
             job_id: Job ID to execute
             task_func: Async function to execute
@@ -142,22 +754,147 @@ class JobQueue:
             logger.error(f"[JOB] ❌ Job {job_id} not found")
             return
         
+        policy = self.policy_for(job.job_type)
         logger.info(f"[JOB] ▶️  Starting job {job_id} - Type: {job.job_type}")
         logger.info(f"[JOB] 📋 Task function: {task_func.__name__}")
         logger.info(f"[JOB] 📊 Args count: {len(args)}, Kwargs count: {len(kwargs)}")
         
+        self._tasks[job_id] = asyncio.current_task()
         try:
             await self.start_job(job_id)
-            logger.info(f"[JOB] 🔄 Executing task function...")
-            result = await task_func(*args, **kwargs)
-            logger.info(f"[JOB] ✅ Task function completed successfully")
-            await self.complete_job(job_id, result)
-            logger.info(f"[JOB] ✅ Job {job_id} marked as completed")
+            attempt = 0
+            while True:
+                attempt += 1
+                job.metadata['attempts'] = attempt
+                details = None
+                try:
+                    logger.info(f"[JOB] 🔄 Executing task function (attempt {attempt}/{policy.max_attempts})...")
+                    result = await self._run_attempt(task_func(*args, **kwargs), policy.timeout)
+                except JobTimeout as e:
+                    error = str(e)
+                    logger.error(f"[JOB] ⏱️  Job {job_id} {error}")
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    details = traceback.format_exc()
+                    if policy.retry_on(e) and attempt < policy.max_attempts:
+                        delay = policy.delay(attempt)
+                        logger.warning(f"[JOB] 🔁 Job {job_id} attempt {attempt} failed ({error}); retrying in {delay:.1f}s")
+                        await self.update_job_progress(
+                            job_id, job.progress,
+                            f"Retrying in {delay:.0f}s (attempt {attempt + 1}/{policy.max_attempts})"
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                    logger.exception(f"[JOB] ❌ Job {job_id} failed: {e}")
+                else:
+                    logger.info(f"[JOB] ✅ Task function completed successfully")
+                    await self.complete_job(job_id, result)
+                    logger.info(f"[JOB] ✅ Job {job_id} marked as completed")
+                    return
+                
+                self._dead_letter(job, details, task_func, args, kwargs)
+                await self.fail_job(job_id, error)
+                logger.error(f"[JOB] ❌ Job {job_id} marked as failed after {attempt} attempt(s)")
+                return
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                raise
+            await self.fail_job(job_id, "Cancelled")
+            logger.info(f"[JOB] 🛑 Job {job_id} cancelled")
+        finally:
+            self._tasks.pop(job_id, None)
+            self._cancelled.discard(job_id)
+    
+    @staticmethod
+    async def _run_attempt(coro, timeout: Optional[float]):
+        """Await coro, cancelling it after timeout seconds"""
+        task = asyncio.ensure_future(coro)
+        try:
+            await asyncio.wait({task}, timeout=timeout)
+        finally:
+            if not task.done():
+                task.cancel()
+        if task.done() and not task.cancelled():
+            return task.result()
+        try:
+            await task  # let it unwind
+        except asyncio.CancelledError:
+            pass
+        raise JobTimeout(f"timed out after {timeout:g}s")
+    
+    def _dead_letter(self, job: Job, details: Optional[str], task_func: Callable, args: tuple, kwargs: dict):
+        """Flag the job (saved by the following fail_job) and keep its callable for a retry"""
+        job.dead_letter = True
+        job.error_traceback = details
+        self._dead_tasks[job.job_id] = (task_func, args, kwargs)
+        while len(self._dead_tasks) > JOB_DEAD_LETTER_MAX:
+            self._dead_tasks.popitem(last=False)
+    
+    async def list_dead_letters(self, limit: int = JOB_DEAD_LETTER_MAX) -> List[Dict[str, Any]]:
+        """
+        Dead-lettered jobs of every worker, most recently failed first
+        
+        `retriable` is True for the ones this process can resubmit.
+        """
+        jobs = {job.job_id: job for job in self.jobs.values() if job.dead_letter}
+        try:
+            for record in await self.store.list_dead_letters(limit):
+                if record['job_id'] not in jobs:
+                    jobs[record['job_id']] = Job.from_record(record)
         except Exception as e:
-            error_msg = f"{str(e)}\n{traceback.format_exc()}"
-            logger.exception(f"[JOB] ❌ Job {job_id} failed: {e}")
-            await self.fail_job(job_id, error_msg)
-            logger.error(f"[JOB] ❌ Job {job_id} marked as failed")
+            logger.warning(f"[JOB] Failed to list dead letters from {self.store.name} store: {e}")
+        newest = sorted(jobs.values(), key=lambda j: j.completed_at or j.created_at, reverse=True)[:limit]
+        return [{
+            'job_id': job.job_id,
+            'job_type': job.job_type,
+            'metadata': job.metadata,
+            'attempts': job.metadata.get('attempts', 1),
+            'error': job.error,
+            'traceback': job.error_traceback,
+            'failed_at': _iso(job.completed_at),
+            'retriable': job.job_id in self._dead_tasks,
+        } for job in newest]
+    
+    async def retry_dead_letter(self, job_id: str) -> Optional[str]:
+        """
+        Run a dead-lettered job again as a new job; returns the new job_id
+        
+        None unless the job was dead-lettered by this process, which holds
+        the function and arguments to run it with.
+        """
+        job = self.get_job(job_id)
+        if job is None or not job.dead_letter or job_id not in self._dead_tasks:
+            return None
+        task_func, args, kwargs = self._dead_tasks.pop(job_id)
+        async with self._lock:
+            job.dead_letter = False
+            self._touch(job_id)
+        metadata = {k: v for k, v in job.metadata.items() if k not in ('attempts', 'idempotency_key')}
+        metadata['retry_of'] = job_id
+        new_job_id = self.create_job(job.job_type, metadata)
+        await self.submit(new_job_id, task_func, *args, reject_when_full=False, **kwargs)
+        logger.info(f"[JOB] 🔁 Dead-lettered job {job_id} resubmitted as {new_job_id}")
+        return new_job_id
+    
+    async def cancel_job(self, job_id: str) -> bool:
+        """Cancel a queued or running job of this process; False if it is not one"""
+        job = self.get_job(job_id)
+        if job is None or job.status not in (JobStatus.PENDING, JobStatus.RUNNING):
+            return False
+        queued = [item for item in self._pending if item[2] == job_id]
+        if queued:
+            self._pending = [item for item in self._pending if item[2] != job_id]
+            heapq.heapify(self._pending)
+            self._submitted.discard(job_id)
+            await self.fail_job(job_id, "Cancelled")
+            logger.info(f"[JOB] 🛑 Job {job_id} cancelled before it started")
+            return True
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        self._cancelled.add(job_id)
+        task.cancel()
+        return True
     
     def cleanup_old_jobs(self, max_age_hours: int = 24):
         """
@@ -174,11 +911,25 @@ class JobQueue:
                 jobs_to_remove.append(job_id)
         
         for job_id in jobs_to_remove:
-            del self.jobs[job_id]
+            self._dead_tasks.pop(job_id, None)
+            key = self.jobs.pop(job_id).metadata.get('idempotency_key')
+            if key and self._by_key.get(key) == job_id:
+                del self._by_key[key]
             logger.info(f"Cleaned up old job {job_id}")
         
         if jobs_to_remove:
             logger.info(f"Cleaned up {len(jobs_to_remove)} old jobs")
+    
+    async def cleanup_old_jobs_async(self, max_age_hours: int = 24):
+        """cleanup_old_jobs plus the same cleanup in the shared store"""
+        self.cleanup_old_jobs(max_age_hours)
+        cutoff = _iso(datetime.utcnow() - timedelta(hours=max_age_hours))
+        try:
+            removed = await self.store.delete_finished_before(cutoff)
+            if removed:
+                logger.info(f"Removed {removed} old jobs from {self.store.name} store")
+        except Exception as e:
+            logger.warning(f"[JOB] Failed to clean up {self.store.name} store: {e}")
 
 
 # Global job queue instance
@@ -0,0 +1,296 @@
+"""
+Persistence backends for JobQueue.
+
+Jobs used to live only in the creating process's dict, so a `/jobs/{job_id}`
+poll landing on another uvicorn/gunicorn worker returned 404 and a restart
+lost every in-flight job. JobQueue now writes job state through a store:
+
+- `memory`:   nothing persisted (the previous behaviour).
+- `sqlite`:   a SQLite file (`JOB_STORE_PATH`) shared by all workers on
+              one host. The default. Job results hold case data, so the
+              file is created 0600 (and the default directory 0700).
+- `postgres`: the `jobs` table (migration 022) through PostgREST, shared
+              by every host.
+
+Writes are batched: JobQueue collects changed jobs and saves them together
+every `JOB_STORE_FLUSH_INTERVAL` seconds (immediately for creation and
+completion), so a stream of progress updates costs one write per interval.
+The process that runs a job keeps the live object; other processes read
+the stored copy.
+"""
+import os
+import abc
+import json
+import sqlite3
+import logging
+import tempfile
+import threading
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from .utils import ensure_private_dir, ensure_private_file
+
+logger = logging.getLogger(__name__)
+
+JOB_STORE = os.environ.get('JOB_STORE', 'sqlite')  # memory | sqlite | postgres
+_DEFAULT_JOB_STORE_PATH = os.path.join(tempfile.gettempdir(), 'job-store', 'jobs.sqlite3')
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH') or _DEFAULT_JOB_STORE_PATH
+JOB_STORE_FLUSH_INTERVAL = float(os.environ.get('JOB_STORE_FLUSH_INTERVAL', '0.5'))
+
+# Columns holding JSON documents
+JSON_FIELDS = ('metadata', 'result', 'partial', 'pages')
+FIELDS = (
+    'job_id', 'job_type', 'status', 'user_id', 'metadata', 'result', 'error',
+    'created_at', 'started_at', 'completed_at', 'progress', 'progress_message',
+    'partial', 'pages', 'owner', 'updated_at', 'idempotency_key', 'dead_letter', 'error_traceback'
+)
+
+
+class JobStore(abc.ABC):
+    """Interface; records are flat dicts with the keys in FIELDS (timestamps as ISO strings)."""
+
+    name = 'base'
+
+    @abc.abstractmethod
+    async def save_many(self, records: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def list(self, user_id: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def delete_finished_before(self, cutoff_iso: str) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def find_by_key(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """Newest job created with this idempotency key"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def list_dead_letters(self, limit: int = 200) -> List[Dict[str, Any]]:
+        """Dead-lettered jobs, most recently failed first"""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    name = 'memory'
+
+    async def save_many(self, records):
+        pass
+
+    async def load(self, job_id):
+        return None
+
+    async def list(self, user_id=None, limit=200):
+        return []
+
+    async def delete_finished_before(self, cutoff_iso):
+        return 0
+
+    async def find_by_key(self, idempotency_key):
+        return None
+
+    async def list_dead_letters(self, limit=200):
+        return []
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+  job_id TEXT PRIMARY KEY,
+  job_type TEXT NOT NULL,
+  status TEXT NOT NULL,
+  user_id TEXT,
+  metadata TEXT,
+  result TEXT,
+  error TEXT,
+  created_at TEXT NOT NULL,
+  started_at TEXT,
+  completed_at TEXT,
+  progress INTEGER NOT NULL DEFAULT 0,
+  progress_message TEXT,
+  partial TEXT,
+  pages TEXT,
+  owner TEXT,
+  updated_at TEXT NOT NULL,
+  idempotency_key TEXT,
+  dead_letter INTEGER NOT NULL DEFAULT 0,
+  error_traceback TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_completed ON jobs (status, completed_at);
+"""
+_SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_idempotency_key ON jobs (idempotency_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_dead_letter ON jobs (dead_letter, completed_at);
+"""
+# Types of columns added after the first release (the rest are TEXT)
+_SQLITE_ADDED_TYPES = {'dead_letter': 'INTEGER NOT NULL DEFAULT 0'}
+
+
+class SQLiteJobStore(JobStore):
+    """One SQLite file per host; calls run in a worker thread."""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        if path == _DEFAULT_JOB_STORE_PATH:
+            ensure_private_dir(os.path.dirname(path))
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        ensure_private_file(path)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SQLITE_SCHEMA)
+        # Files created by older versions lack the newer columns
+        existing = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for field in FIELDS:
+            if field not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {field} {_SQLITE_ADDED_TYPES.get(field, 'TEXT')}")
+        conn.executescript(_SQLITE_INDEXES)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> tuple:
+        return tuple(
+            json.dumps(record.get(f), default=str) if f in JSON_FIELDS and record.get(f) is not None else record.get(f)
+            for f in FIELDS
+        )
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for f in JSON_FIELDS:
+            if record.get(f) is not None:
+                record[f] = json.loads(record[f])
+        record['dead_letter'] = bool(record.get('dead_letter'))
+        return record
+
+    def _save_many(self, records):
+        placeholders = ', '.join('?' for _ in FIELDS)
+        updates = ', '.join(f'{f} = excluded.{f}' for f in FIELDS if f != 'job_id')
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                f"INSERT INTO jobs ({', '.join(FIELDS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (job_id) DO UPDATE SET {updates}",
+                [self._encode(r) for r in records]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    async def save_many(self, records):
+        await asyncio.to_thread(self._save_many, records)
+
+    def _load(self, job_id):
+        row = self._conn().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    async def load(self, job_id):
+        return await asyncio.to_thread(self._load, job_id)
+
+    def _list(self, user_id, limit):
+        if user_id:
+            rows = self._conn().execute(
+                'SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?', (user_id, limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        return [self._decode(r) for r in rows]
+
+    async def list(self, user_id=None, limit=200):
+        return await asyncio.to_thread(self._list, user_id, limit)
+
+    def _delete_finished_before(self, cutoff_iso):
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND created_at < ?", (cutoff_iso,)
+        )
+        return cur.rowcount
+
+    async def delete_finished_before(self, cutoff_iso):
+        return await asyncio.to_thread(self._delete_finished_before, cutoff_iso)
+
+    def _find_by_key(self, idempotency_key):
+        row = self._conn().execute(
+            'SELECT * FROM jobs WHERE idempotency_key = ? ORDER BY created_at DESC LIMIT 1', (idempotency_key,)
+        ).fetchone()
+        return self._decode(row) if row else None
+
+    async def find_by_key(self, idempotency_key):
+        return await asyncio.to_thread(self._find_by_key, idempotency_key)
+
+    def _list_dead_letters(self, limit):
+        rows = self._conn().execute(
+            'SELECT * FROM jobs WHERE dead_letter = 1 ORDER BY completed_at DESC LIMIT ?', (limit,)
+        ).fetchall()
+        return [self._decode(r) for r in rows]
+
+    async def list_dead_letters(self, limit=200):
+        return await asyncio.to_thread(self._list_dead_letters, limit)
+
+
+class PostgresJobStore(JobStore):
+    """The public.jobs table via PostgREST (service role)."""
+
+    name = 'postgres'
+
+    async def save_many(self, records):
+        from . import supabase_async
+        await supabase_async.upsert_jobs(records)
+
+    async def load(self, job_id):
+        from . import supabase_async
+        rows = await supabase_async.postgrest_get('jobs', {'job_id': f'eq.{job_id}', 'limit': 1})
+        return rows[0] if rows else None
+
+    async def list(self, user_id=None, limit=200):
+        from . import supabase_async
+        params = {'order': 'created_at.desc', 'limit': limit}
+        if user_id:
+            params['user_id'] = f'eq.{user_id}'
+        return await supabase_async.postgrest_get('jobs', params)
+
+    async def delete_finished_before(self, cutoff_iso):
+        from . import supabase_async
+        return await supabase_async.delete_finished_jobs(cutoff_iso)
+
+    async def find_by_key(self, idempotency_key):
+        from . import supabase_async
+        rows = await supabase_async.postgrest_get(
+            'jobs', {'idempotency_key': f'eq.{idempotency_key}', 'order': 'created_at.desc', 'limit': 1}
+        )
+        return rows[0] if rows else None
+
+    async def list_dead_letters(self, limit=200):
+        from . import supabase_async
+        return await supabase_async.postgrest_get(
+            'jobs', {'dead_letter': 'is.true', 'order': 'completed_at.desc', 'limit': limit}
+        )
+
+
+def create_job_store(kind: str = JOB_STORE) -> JobStore:
+    if kind == 'postgres':
+        return PostgresJobStore()
+    if kind == 'sqlite':
+        try:
+            return SQLiteJobStore()
+        except Exception as e:
+            logger.error(f"Could not open job store at {JOB_STORE_PATH}, keeping jobs in memory: {e}")
+    return MemoryJobStore()
@@ -0,0 +1,256 @@
+"""
+Local verification of Supabase access tokens.
+
+`get_current_user` used to call Supabase `/auth/v1/user` and then fetch the
+profile on every authenticated request. This module verifies the JWT
+locally instead and caches the results:
+
+- Signing keys: the project's HS256 secret (`SUPABASE_JWT_SECRET`) and/or
+  the asymmetric keys published at `/auth/v1/.well-known/jwks.json`. The
+  JWKS is cached for `JWKS_CACHE_TTL` seconds and refetched early when a
+  token arrives with an unknown `kid` (key rotation).
+- Verified claims: cached per token for `AUTH_CLAIMS_TTL` seconds (never
+  past the token's own `exp`).
+- Profiles: cached per `sub` for `AUTH_PROFILE_TTL` seconds.
+
+Revocation: a signature check alone cannot see a revoked session, so each
+session is re-checked against Supabase at most every
+`AUTH_REVOCATION_CHECK_SECONDS` (0 disables it). Tokens passed to
+`/user/logout` are also denied locally straight away. A revoked token
+therefore stops working within a bounded TTL, not only when it expires.
+
+If no signing key is configured or reachable, `authenticate` falls back to
+the remote `/auth/v1/user` check.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import jwt
+import httpx
+
+from . import supabase_async
+from .supabase_client import SUPABASE_URL, SUPABASE_ANON_KEY
+
+logger = logging.getLogger('jwt_auth')
+
+SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET')
+JWT_AUDIENCE = os.environ.get('SUPABASE_JWT_AUDIENCE', 'authenticated')
+JWT_LEEWAY = int(os.environ.get('SUPABASE_JWT_LEEWAY', '10'))
+JWKS_CACHE_TTL = int(os.environ.get('JWKS_CACHE_TTL', '600'))
+JWKS_MIN_REFRESH_INTERVAL = int(os.environ.get('JWKS_MIN_REFRESH_INTERVAL', '30'))
+AUTH_CLAIMS_TTL = int(os.environ.get('AUTH_CLAIMS_TTL', '60'))
+AUTH_PROFILE_TTL = int(os.environ.get('AUTH_PROFILE_TTL', '30'))
+AUTH_REVOCATION_CHECK_SECONDS = int(os.environ.get('AUTH_REVOCATION_CHECK_SECONDS', '300'))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000'))
+
+
+class TTLCache:
+    """Small LRU cache with per-entry expiry (monotonic clock)."""
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+_claims_cache = TTLCache()
+_profile_cache = TTLCache()
+_session_checked = TTLCache()
+_revoked = TTLCache()
+
+_jwks_keys: Dict[str, Any] = {}
+_jwks_fetched_at: float = 0.0
+_jwks_lock: Optional[asyncio.Lock] = None
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _jwks_url() -> str:
+    return f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+
+
+async def _refresh_jwks(force: bool = False):
+    """Fetch the project's JWKS, at most once per JWKS_MIN_REFRESH_INTERVAL."""
+    global _jwks_keys, _jwks_fetched_at, _jwks_lock
+    if not SUPABASE_URL:
+        return
+    if _jwks_lock is None:
+        _jwks_lock = asyncio.Lock()
+    async with _jwks_lock:
+        age = time.monotonic() - _jwks_fetched_at
+        if _jwks_fetched_at and age < (JWKS_MIN_REFRESH_INTERVAL if force else JWKS_CACHE_TTL):
+            return
+        try:
+            resp = await supabase_async.request('GET', _jwks_url(), headers={'apikey': SUPABASE_ANON_KEY or ''})
+            keys = {}
+            for jwk in resp.json().get('keys', []):
+                try:
+                    keys[jwk.get('kid')] = jwt.PyJWK(jwk)
+                except Exception as e:
+                    logger.warning(f"Skipping unsupported JWK kid={jwk.get('kid')}: {e}")
+            _jwks_keys = keys
+            logger.info(f'Loaded {len(keys)} signing key(s) from JWKS')
+        except Exception as e:
+            logger.warning(f'Failed to fetch JWKS: {e}')
+        finally:
+            _jwks_fetched_at = time.monotonic()
+
+
+async def _signing_key(header: Dict[str, Any]):
+    """(key, algorithm) to verify a token with; the algorithm comes from our side, never the token."""
+    if header.get('alg') == 'HS256':
+        return SUPABASE_JWT_SECRET, 'HS256'
+    kid = header.get('kid')
+    await _refresh_jwks()
+    if kid not in _jwks_keys:
+        # Unknown kid: keys may have rotated since the last fetch
+        await _refresh_jwks(force=True)
+    jwk = _jwks_keys.get(kid)
+    if jwk is None:
+        return None, None
+    return jwk.key, jwk.algorithm_name
+
+
+async def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify signature, expiry and audience locally.
+
+    Returns the claims, or None when no signing key is available for this
+    token (caller should fall back to the remote check).
+    Raises ValueError('invalid_token') / ValueError('token_expired').
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError:
+        raise ValueError('invalid_token')
+
+    key, algorithm = await _signing_key(header)
+    if not key:
+        return None
+    try:
+        return jwt.decode(
+            token,
+            key=key,
+            algorithms=[algorithm],
+            audience=JWT_AUDIENCE,
+            leeway=JWT_LEEWAY,
+            options={'require': ['exp', 'sub']},
+        )
+    except jwt.ExpiredSignatureError:
+        raise ValueError('token_expired')
+    except jwt.PyJWTError as e:
+        logger.debug(f'JWT verification failed: {e}')
+        raise ValueError('invalid_token')
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape verified claims like the `/auth/v1/user` response fields we use."""
+    return {
+        'id': claims.get('sub'),
+        'email': claims.get('email'),
+        'phone': claims.get('phone'),
+        'role': claims.get('role'),
+        'aud': claims.get('aud'),
+        'app_metadata': claims.get('app_metadata', {}),
+        'user_metadata': claims.get('user_metadata', {}),
+        'session_id': claims.get('session_id'),
+    }
+
+
+async def authenticate(token: str) -> Dict[str, Any]:
+    """Return the auth user for a bearer token, verifying locally when possible.
+
+    Raises ValueError('invalid_token' | 'token_expired' | 'user_not_found')
+    or the underlying HTTP error from the remote fallback.
+    """
+    key = _token_key(token)
+    if _revoked.get(key):
+        raise ValueError('invalid_token')
+
+    cached = _claims_cache.get(key)
+    if cached is not None:
+        return cached
+
+    claims = await verify_access_token(token)
+    if claims is None:
+        auth_user = await supabase_async.get_user_from_token(token)
+        ttl = AUTH_CLAIMS_TTL
+    else:
+        session_key = claims.get('session_id') or key
+        if AUTH_REVOCATION_CHECK_SECONDS > 0 and not _session_checked.get(session_key):
+            # Periodic remote check so revoked sessions stop working
+            try:
+                await supabase_async.get_user_from_token(token)
+                _session_checked.set(session_key, True, AUTH_REVOCATION_CHECK_SECONDS)
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                    raise
+                # Supabase unreachable or failing: the signature is valid, retry the check next time
+                logger.warning(f'Revocation check skipped: {e}')
+        auth_user = _user_from_claims(claims)
+        ttl = min(AUTH_CLAIMS_TTL, claims['exp'] - time.time())
+
+    _claims_cache.set(key, auth_user, ttl)
+    return auth_user
+
+
+async def get_profile(user_id: str) -> Dict[str, Any]:
+    """Return the user_profile row for `user_id`, cached for AUTH_PROFILE_TTL."""
+    if not user_id:
+        return {}
+    profile = _profile_cache.get(user_id)
+    if profile is None:
+        profiles = await supabase_async.get_profile_by_user_id(user_id)
+        profile = profiles[0] if profiles else {}
+        _profile_cache.set(user_id, profile, AUTH_PROFILE_TTL)
+    return profile
+
+
+def invalidate_profile(user_id: str):
+    """Drop a cached profile (call after role/permission/profile edits)."""
+    if user_id:
+        _profile_cache.pop(str(user_id))
+
+
+def revoke_token(token: str):
+    """Deny a token locally (e.g. on logout) until its cached state would expire."""
+    key = _token_key(token)
+    _claims_cache.pop(key)
+    ttl = max(AUTH_CLAIMS_TTL, AUTH_REVOCATION_CHECK_SECONDS)
+    try:
+        exp = jwt.decode(token, options={'verify_signature': False}).get('exp')
+        if exp:
+            ttl = max(0, exp - time.time()) + JWT_LEEWAY
+    except jwt.PyJWTError:
+        pass
+    _revoked.set(key, True, ttl)
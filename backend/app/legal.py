@@ -46,3 +46,4 @@ def load_legal_document_chunks(documents_dir: str = '../documents', max_chunk_ch
         })
         i += max_chunk_chars
     return chunks
+
@@ -15,10 +15,12 @@ if _openai_key:
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Response, Request, Depends, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .schemas import EligibilityRequest, EligibilityResult, CaseFilterRequest
-from .ocr import extract_text_from_document, extract_text_from_pdf_bytes
+from .schemas import EligibilityRequest, EligibilityResult, CaseFilterRequest, SignedUploadRequest, UploadCompleteRequest
+from .ocr import extract_text_from_document_async, extract_text_from_file_async, extract_text_from_pdf_bytes_async
+from .upload_spool import spool_upload, UploadTooLarge
 from .legal import load_legal_document_chunks
 from .gemini_client import call_gemini, analyze_document_questions
+from .utils import parse_json_field
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 import json
@@ -67,13 +69,16 @@ from .supabase_client import (
     verify_phone_otp,
 )
 from .supabase_client import _has_supabase_py, _supabase_admin, SUPABASE_URL
+from . import supabase_async
+from . import jwt_auth
+from . import doc_pool
 from .email_utils import send_otp_email
 from .boldsign import create_embedded_sign_link, get_document_status
 from .constants import CaseStatusConstants
 from .case_status_manager import CaseStatusManager
 from .document_analyzer_agent import analyze_case_documents_with_agent
 from .openai_form7801_agent import analyze_documents_with_openai_agent
-from .job_queue import get_job_queue, JobStatus
+from .job_queue import get_job_queue, JobStatus, JobQueueFull, JOB_MAX_AGE_HOURS, idempotency_key, is_transient_error
 from aiohttp import web
 from openai import OpenAI
 
@@ -89,7 +94,7 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 # Reduce verbosity from noisy third-party libraries and the supabase client
-for _name in ('supabase_client', 'supabase_auth', 'httpx', 'httpcore', 'urllib3', 'hpack'):
+for _name in ('supabase_client', 'supabase_async', 'supabase_auth', 'httpx', 'httpcore', 'urllib3', 'hpack'):
     try:
         logging.getLogger(_name).setLevel(logging.WARNING)
     except Exception:
@@ -97,6 +102,39 @@ for _name in ('supabase_client', 'supabase_auth', 'httpx', 'httpcore', 'urllib3'
 logger = logging.getLogger('eligibility_orchestrator')
 
 
+@app.on_event('shutdown')
+async def _close_supabase_http_client():
+    """Save pending job state, then release the pooled Supabase connections and document worker processes."""
+    await get_job_queue().flush()
+    await supabase_async.close_http_client()
+    doc_pool.shutdown()
+
+
+async def _poll_agent_prompt_versions():
+    """Drop cached agent prompts whose updated_at changed (edits from other workers)."""
+    from .supabase_client import refresh_agent_cache, AGENT_PROMPT_POLL_SECONDS
+    while True:
+        await asyncio.sleep(AGENT_PROMPT_POLL_SECONDS)
+        try:
+            await asyncio.to_thread(refresh_agent_cache)
+        except Exception as e:
+            logger.warning(f'Agent prompt version poll failed: {e}')
+
+
+@app.on_event('startup')
+async def _start_agent_prompt_poll():
+    from .supabase_client import AGENT_PROMPT_POLL_SECONDS
+    if AGENT_PROMPT_POLL_SECONDS > 0:
+        app.state.agent_prompt_poll = asyncio.create_task(_poll_agent_prompt_versions())
+
+
+@app.on_event('shutdown')
+async def _stop_agent_prompt_poll():
+    task = getattr(app.state, 'agent_prompt_poll', None)
+    if task:
+        task.cancel()
+
+
 def update_case_status(case_id: str, case_data: dict) -> str:
     """
     Determine and update case status based on case data.
@@ -121,6 +159,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     """Dependency: resolve current user from Authorization header (Bearer token).
     Returns profile dict merged with auth user info or None when no header provided.
     Raises HTTPException(401) when token invalid.
+    The token is verified locally and the profile cached (see jwt_auth).
     """
     if not authorization:
         return None
@@ -129,7 +168,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     if isinstance(authorization, str) and authorization.lower().startswith('bearer '):
         token = authorization.split(' ', 1)[1]
     try:
-        auth_user = get_user_from_token(token)
+        auth_user = await jwt_auth.authenticate(token)
     except ValueError as ve:
         # propagate specific errors
         if str(ve) == 'user_not_found':
@@ -140,8 +179,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
 
     # Fetch profile row if exists
     try:
-        profiles = get_profile_by_user_id(auth_user.get('id'))
-        profile = profiles[0] if profiles else {}
+        profile = await jwt_auth.get_profile(auth_user.get('id'))
     except Exception:
         profile = {}
 
@@ -952,6 +990,7 @@ async def patch_subadmin(user_id: str, payload: Dict[str, Any] = Body(...), user
     try:
         from .supabase_client import admin_update_profile
         res = admin_update_profile(user_id=user_id, fields=payload)
+        jwt_auth.invalidate_profile(user_id)
         return JSONResponse({'status': 'ok', 'updated': res})
     except Exception:
         logger.exception('patch_subadmin failed')
@@ -993,6 +1032,7 @@ async def update_subadmin_permissions_endpoint(user_id: str, payload: Dict[str,
     try:
         from .supabase_client import update_subadmin_permissions
         res = update_subadmin_permissions(user_id, permissions)
+        jwt_auth.invalidate_profile(user_id)
         return JSONResponse({'status': 'ok', 'result': res})
     except Exception:
         logger.exception('update_subadmin_permissions failed')
@@ -1025,34 +1065,37 @@ async def delete_subadmin_endpoint(id: str, user = Depends(require_admin)):
 async def admin_list_users(
     limit: int = 200,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: str = 'none',
     user = Depends(require_admin)
 ):
-    """Admin: list all non-admin/non-subadmin users (no cases, just users)."""
+    """Admin: list all non-admin/non-subadmin users (no cases, just users).
+
+    Pass `next_cursor` from the previous response as `cursor` to page without
+    OFFSET; `count` may be exact, planned, estimated or none (the default, in
+    which case `total` is null).
+    """
     try:
-        import requests
-        from .supabase_client import _postgrest_headers
-        
-        # Fetch ALL non-admin/non-subadmin users from user_profile
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile"
+        # Fetch non-admin/non-subadmin users from user_profile, newest first
         params = {
-            'select': 'user_id,email,full_name,phone,identity_code,contact_details,payments',
-            'limit': str(limit),
-            'offset': str(offset),
-            'order': 'created_at.desc'
+            'select': 'id,user_id,email,full_name,phone,identity_code,contact_details,payments,created_at',
+            # Filter out admins and sub-admins
+            'or': '(and(role.is.null), and(is_subadmin.is.false)))',
         }
-        
-        # Filter out admins and sub-admins
-        params['or'] = '(and(role.is.null), and(is_subadmin.is.false)))'
-        
-        resp = requests.get(url, headers=_postgrest_headers(), params=params, timeout=10)
-        resp.raise_for_status()
-        
-        users = resp.json()
+        page = await supabase_async.postgrest_page(
+            'user_profile', params, ['created_at', 'id'],
+            limit=limit, cursor=cursor, offset=offset,
+            count=supabase_async.count_mode(count),
+        )
         
         return JSONResponse({
             'status': 'ok',
-            'users': users
+            'users': page['rows'],
+            'total': page['total'],
+            'next_cursor': page['next_cursor']
         })
+    except supabase_async.PaginationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         logger.exception('admin_list_users failed')
         raise HTTPException(status_code=500, detail='admin_list_users_failed')
@@ -1073,46 +1116,26 @@ async def admin_list_all_users_cases(
     - recent_activity = "not available"
     """
     try:
-        import requests
-        from .supabase_client import _postgrest_headers
-        
         logger.info(f'admin_list_all_users_cases called by user: {user.get("id")}')
-        
-        # Fetch ALL non-admin/non-subadmin users from user_profile
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile"
-        params = {
-            'limit': str(limit),
-            'offset': str(offset),
-            'order': 'created_at.desc'
-        }
-        
-        # Filter out admins and sub-admins
-        # Include only users where: (role is NULL OR role NOT IN admin/subadmin) AND (is_admin != true) AND (is_subadmin != true)
-        params['or'] = '(and(role.is.null), and(is_subadmin.is.false)))'
-        
-        headers = _postgrest_headers()
-        headers['Prefer'] = 'count=exact'
-        
         logger.info(f'Fetching users from user_profile with limit={limit}, offset={offset}')
         
-        resp = requests.get(url, headers=headers, params=params, timeout=15)
-        resp.raise_for_status()
-        
-        # Get total count from Content-Range header
-        total = 0
-        content_range = resp.headers.get('Content-Range')
-        if content_range:
-            parts = content_range.split('/')
-            if len(parts) > 1:
-                try:
-                    total = int(parts[1])
-                except (ValueError, IndexError):
-                    pass
-        
-        users = resp.json()
+        # One embedded query: every profile with its newest case and newest eligibility record
+        page = await supabase_async.list_profiles_with_cases(
+            limit=limit,
+            offset=offset,
+            profile_filter='(and(role.is.null), and(is_subadmin.is.false)))',
+            cases_limit=1,
+            # user_eligibility reaches user_profile both directly and through cases; name the FK
+            embed='user_eligibility!user_eligibility_user_id_fkey(eligibility_raw,processed_at)',
+            embed_params={
+                'user_eligibility.order': 'processed_at.desc',
+                'user_eligibility.limit': '1',
+            },
+        )
+        users = page['profiles']
+        total = page['total']
         logger.info(f'Fetched {len(users)} users from user_profile (total: {total})')
         
-        # For each user, fetch their associated cases
         cases = []
         for profile in users:
             user_id = profile.get('user_id')
@@ -1120,101 +1143,36 @@ async def admin_list_all_users_cases(
                 logger.warning(f'User profile {profile.get("id")} has no user_id, skipping')
                 continue
             
-            try:
-                # Fetch FIRST case for this user only
-                cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases"
-                cases_params = {
-                    'user_id': f'eq.{user_id}',
-                    'order': 'created_at.desc',
-                    'limit': '1'  # Only fetch the first case
-                }
-                
-                cases_resp = requests.get(cases_url, headers=_postgrest_headers(), params=cases_params, timeout=10)
-                cases_resp.raise_for_status()
-                user_cases = cases_resp.json()
-                
-                logger.debug(f'User {user_id} has {len(user_cases)} case(s)')
-                
-                # Skip users with no cases
-                if not user_cases or len(user_cases) == 0:
-                    logger.debug(f'User {user_id} has no cases, skipping')
-                    continue
-                
-                # Process only the first case
-                case = user_cases[0]
-                
-                # Skip if case is None
-                if not case:
-                    logger.warning(f'Case data is None for user_id={user_id}, skipping')
-                    continue
-                
-                logger.debug(f'Case data for user {user_id}: status={case.get("status")}, id={case.get("id")}')
-                
-                # Enrich case with user and eligibility data
-                try:
-                    case['user_name'] = profile.get('full_name') if profile else None
-                    case['user_email'] = profile.get('email') if profile else None
-                    case['user_phone'] = profile.get('phone') if profile else None
-                    case['user_photo_url'] = profile.get('photo_url') if profile else None
-                    case['user_id'] = user_id
-                    
-                    # Fetch FIRST eligibility record for this user from user_eligibility table
-                    eligibility_raw = {}
-                    try:
-                        eligibility_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_eligibility"
-                        eligibility_params = {
-                            'user_id': f'eq.{user_id}',
-                            'order': 'processed_at.desc',
-                            'limit': '1'  # Only fetch the first (most recent) eligibility record
-                        }
-                        
-                        eligibility_resp = requests.get(eligibility_url, headers=_postgrest_headers(), params=eligibility_params, timeout=10)
-                        eligibility_resp.raise_for_status()
-                        eligibility_records = eligibility_resp.json()
-                        
-                        if eligibility_records and len(eligibility_records) > 0:
-                            eligibility_record = eligibility_records[0]
-                            eligibility_raw = eligibility_record.get('eligibility_raw', {})
-                            
-                            # Parse eligibility_raw if it's a string
-                            if isinstance(eligibility_raw, str):
-                                try:
-                                    import json
-                                    eligibility_raw = json.loads(eligibility_raw)
-                                except:
-                                    eligibility_raw = {}
-                        
-                        logger.debug(f'Fetched eligibility for user {user_id}: score={eligibility_raw.get("eligibility_score", 0)}')
-                    except Exception as e:
-                        logger.warning(f'Failed to fetch eligibility for user_id={user_id}: {e}')
-                        eligibility_raw = {}
-                    
-                    case['ai_score'] = eligibility_raw.get('eligibility_score', 0) if eligibility_raw else 0
-                    case['eligibility_status'] = eligibility_raw.get('eligibility_status', 'not_rated') if eligibility_raw else 'not_rated'
-                    
-                    # Extract estimated_claim_amount and products from call_summary
-                    call_summary = {}
-                    if case:
-                        call_summary = case.get('call_summary', {})
-                        if isinstance(call_summary, str):
-                            try:
-                                import json
-                                call_summary = json.loads(call_summary)
-                            except:
-                                call_summary = {}
-                    
-                    case['estimated_claim_amount'] = call_summary.get('estimated_claim_amount', 0) if call_summary else 0
-                    case['products'] = call_summary.get('products', []) if call_summary else []
-                    
-                    # Add recent activity
-                    case['recent_activity'] = 'not available'
-                    
-                    cases.append(case)
-                except Exception as e:
-                    logger.warning(f'Failed to enrich case for user_id={user_id}: {e}')
-                    
-            except Exception as e:
-                logger.warning(f'Failed to fetch cases for user_id={user_id}: {e}')
+            # Skip users with no cases
+            user_cases = profile.get('cases') or []
+            if not user_cases or not user_cases[0]:
+                logger.debug(f'User {user_id} has no cases, skipping')
+                continue
+            
+            # Process only the first case
+            case = user_cases[0]
+            
+            # Enrich case with user and eligibility data
+            case['user_name'] = profile.get('full_name')
+            case['user_email'] = profile.get('email')
+            case['user_phone'] = profile.get('phone')
+            case['user_photo_url'] = profile.get('photo_url')
+            case['user_id'] = user_id
+            
+            eligibility_records = profile.get('user_eligibility') or []
+            eligibility_raw = parse_json_field(eligibility_records[0].get('eligibility_raw')) if eligibility_records else {}
+            case['ai_score'] = eligibility_raw.get('eligibility_score', 0)
+            case['eligibility_status'] = eligibility_raw.get('eligibility_status', 'not_rated')
+            
+            # Extract estimated_claim_amount and products from call_summary
+            call_summary = parse_json_field(case.get('call_summary'))
+            case['estimated_claim_amount'] = call_summary.get('estimated_claim_amount', 0)
+            case['products'] = call_summary.get('products', [])
+            
+            # Add recent activity
+            case['recent_activity'] = 'not available'
+            
+            cases.append(case)
         
         logger.info(f'Total cases fetched for all users: {len(cases)}')
         
@@ -1274,6 +1232,7 @@ async def patch_admin_user(user_id: str, payload: Dict[str, Any] = Body(...), us
     try:
         from .supabase_client import admin_update_profile
         res = admin_update_profile(user_id=user_id, fields=payload)
+        jwt_auth.invalidate_profile(user_id)
         return JSONResponse({'status': 'ok', 'updated': res})
     except Exception:
         logger.exception('patch_admin_user failed')
@@ -1296,52 +1255,35 @@ async def delete_admin_user(user_id: str, user = Depends(require_superadmin)):
 async def admin_list_all_cases(
     limit: int = 200,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: str = 'exact',
     status: Optional[str] = None,
     eligibility: Optional[str] = None,
     search: Optional[str] = None,
     user = Depends(get_current_user)
 ):
-    """Admin: list all users (except admins/sub-admins) with their cases and eligibility data."""
+    """Admin: list all users (except admins/sub-admins) with their cases and eligibility data.
+
+    Profiles and their cases come back from a single embedded PostgREST query,
+    so the dashboard costs one round trip per page instead of one per user.
+    Pages are keyed on the profile's (created_at, id): pass `next_cursor` back
+    as `cursor` for the next page.
+    """
     try:
-        from .supabase_client import _postgrest_headers, _supabase_admin
-        import requests
-        
-        # Fetch ALL users from user_profile (excluding admin/subadmin)
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile"
-        params = {
-            'limit': str(limit),
-            'offset': str(offset),
-            'order': 'created_at.desc'
-        }
+        logger.info(f'Fetching users with cases from user_profile with limit={limit}, offset={offset}')
         
         # Filter out admins and sub-admins
         # Include only users where role is NULL or role is NOT 'admin' or 'subadmin'
-        # Using 'or' to handle both null and non-admin/non-subadmin cases
-        params['or'] = '(role.is.null,and(role.neq.admin,role.neq.subadmin))'
-        
-        headers = _postgrest_headers()
-        headers['Prefer'] = 'count=exact'
-        
-        logger.info(f'Fetching users from user_profile with limit={limit}, offset={offset}')
-        
-        resp = requests.get(url, headers=headers, params=params, timeout=15)
-        resp.raise_for_status()
-        
-        # Get total count from Content-Range header
-        total = 0
-        content_range = resp.headers.get('Content-Range')
-        if content_range:
-            parts = content_range.split('/')
-            if len(parts) > 1:
-                try:
-                    total = int(parts[1])
-                except (ValueError, IndexError):
-                    pass
-        
-        users = resp.json()
-        logger.info(f'Fetched {len(users)} users from user_profile (total: {total})')
+        page = await supabase_async.list_profiles_with_cases(
+            limit=limit,
+            offset=offset,
+            profile_filter='(role.is.null,and(role.neq.admin,role.neq.subadmin))',
+            cursor=cursor,
+            count=supabase_async.count_mode(count),
+        )
+        users = page['profiles']
+        logger.info(f'Fetched {len(users)} users from user_profile (total: {page["total"]})')
         
-        # For each user, fetch their associated cases
         cases = []
         for profile in users:
             user_id = profile.get('user_id')
@@ -1349,66 +1291,39 @@ async def admin_list_all_cases(
                 logger.warning(f'User profile {profile.get("id")} has no user_id, skipping')
                 continue
             
-            try:
-                # Fetch cases for this user
-                cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases"
-                cases_params = {
-                    'user_id': f'eq.{user_id}',
-                    'order': 'created_at.desc',
-                    'limit': '1000'
-                }
+            # Get eligibility score from user_profile.eligibility_raw
+            eligibility_raw = parse_json_field(profile.get('eligibility_raw'))
+            
+            # Enrich each case with user and eligibility data
+            for case in profile.get('cases') or []:
+                case['user_name'] = profile.get('full_name')
+                case['user_email'] = profile.get('email')
+                case['user_phone'] = profile.get('phone')
+                case['user_photo_url'] = profile.get('photo_url')
+                case['user_id'] = user_id
+                case['ai_score'] = eligibility_raw.get('eligibility_score', 0)
+                case['eligibility_status'] = eligibility_raw.get('eligibility_status', 'not_rated')
                 
-                cases_resp = requests.get(cases_url, headers=_postgrest_headers(), params=cases_params, timeout=10)
-                cases_resp.raise_for_status()
-                user_cases = cases_resp.json()
+                # Extract estimated_claim_amount from call_summary
+                call_summary = parse_json_field(case.get('call_summary'))
+                case['estimated_claim_amount'] = call_summary.get('estimated_claim_amount', 0)
                 
-                logger.debug(f'User {user_id} has {len(user_cases)} case(s)')
+                # Add recent activity
+                case['recent_activity'] = 'not available'
                 
-                # Enrich each case with user and eligibility data
-                for case in user_cases:
-                    case['user_name'] = profile.get('full_name')
-                    case['user_email'] = profile.get('email')
-                    case['user_phone'] = profile.get('phone')
-                    case['user_photo_url'] = profile.get('photo_url')
-                    case['user_id'] = user_id
-                    
-                    # Get eligibility score from user_profile.eligibility_raw
-                    eligibility_raw = profile.get('eligibility_raw', {})
-                    if isinstance(eligibility_raw, str):
-                        try:
-                            import json
-                            eligibility_raw = json.loads(eligibility_raw)
-                        except:
-                            eligibility_raw = {}
-                    
-                    case['ai_score'] = eligibility_raw.get('eligibility_score', 0)
-                    case['eligibility_status'] = eligibility_raw.get('eligibility_status', 'not_rated')
-                    
-                    # Extract estimated_claim_amount from call_summary
-                    call_summary = case.get('call_summary', {})
-                    if isinstance(call_summary, str):
-                        try:
-                            import json
-                            call_summary = json.loads(call_summary)
-                        except:
-                            call_summary = {}
-                    case['estimated_claim_amount'] = call_summary.get('estimated_claim_amount', 0)
-                    
-                    # Add recent activity
-                    case['recent_activity'] = 'not available'
-                    
-                    cases.append(case)
-                    
-            except Exception as e:
-                logger.warning(f'Failed to fetch cases for user_id={user_id}: {e}')
+                cases.append(case)
         
         logger.info(f'Total cases fetched for all users: {len(cases)}')
         
         return JSONResponse({
             'status': 'ok', 
             'cases': cases, 
-            'total': len(cases)
+            'total': len(cases),
+            'total_users': page['total'],
+            'next_cursor': page['next_cursor']
         })
+    except supabase_async.PaginationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception(f'admin_list_all_cases failed: {e}')
         return JSONResponse({'status': 'ok', 'cases': [], 'total': 0})
@@ -1418,6 +1333,8 @@ async def admin_list_all_cases(
 async def admin_claims_table(
     limit: int = 200,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: str = 'exact',
     user = Depends(get_current_user)
 ):
     """
@@ -1431,123 +1348,61 @@ async def admin_claims_table(
     - Recent activity (פעילות אחרונה): hardcoded as "not available"
     
     Filters: Only non-admin and non-sub-admin users
+
+    Rows come from the `admin_claims_table` view (migration 016), which
+    precomputes the JSON-derived columns, so a page is a single request.
+    Pass `next_cursor` back as `cursor` to page without OFFSET; the total is
+    only counted on offset pages (count: exact, planned, estimated or none).
     """
     try:
-        import requests
-        from .supabase_client import _postgrest_headers
-        
-        # Fetch ALL non-admin/non-subadmin users from user_profile
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile"
-        params = {
-            'limit': str(limit),
-            'offset': str(offset),
-            'order': 'created_at.desc'
-        }
-        
-        # Filter: exclude admins and sub-admins
-        params['or'] = '(and(role.is.null,is_admin.is.false,is_subadmin.is.false),and(role.not.in.(admin,subadmin),is_admin.is.false,is_subadmin.is.false))'
-        
-        headers = _postgrest_headers()
-        headers['Prefer'] = 'count=exact'
+        logger.info(f'Admin claims table: Fetching rows with limit={limit}, offset={offset}')
         
-        logger.info(f'Admin claims table: Fetching users with limit={limit}, offset={offset}')
-        
-        resp = requests.get(url, headers=headers, params=params, timeout=15)
-        resp.raise_for_status()
-        
-        total = 0
-        content_range = resp.headers.get('Content-Range')
-        if content_range:
-            parts = content_range.split('/')
-            if len(parts) > 1:
-                try:
-                    total = int(parts[1])
-                except (ValueError, IndexError):
-                    pass
-        
-        users = resp.json()
-        logger.info(f'Fetched {len(users)} users (total: {total})')
+        page = await supabase_async.list_claims_table(
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            count=supabase_async.count_mode(count),
+        )
         
-        # Build claims table data
         claims_data = []
+        for view_row in page['rows']:
+            row = {
+                'id': view_row.get('case_id'),
+                'case_id': view_row.get('case_id'),
+                'user_id': view_row.get('user_id'),
+                # לקוח (Client) - from user_profile
+                'client_name': view_row.get('client_name'),
+                'client_email': view_row.get('client_email'),
+                'client_phone': view_row.get('client_phone'),
+                'client_photo': view_row.get('client_photo'),
+                # מוצרים בתיק (Products) - from call_summary.products
+                'products': view_row.get('products') or [],
+                # סטטוס (Status) - from cases.status
+                'status': view_row.get('status'),
+                # ציון AI (AI Score) - from eligibility_raw.eligibility_score
+                'ai_score': view_row.get('ai_score', 0),
+                'eligibility_status': view_row.get('eligibility_status', 'not_rated'),
+                # סכום עתודה משוער (Estimated claim amount) - from call_summary.estimated_claim_amount
+                'estimated_claim_amount': view_row.get('estimated_claim_amount', 0),
+                # פעילות אחרונה (Recent activity) - hardcoded
+                'recent_activity': 'not available',
+                # Additional metadata
+                'created_at': view_row.get('created_at'),
+                'updated_at': view_row.get('updated_at'),
+            }
+            claims_data.append(row)
         
-        for profile in users:
-            user_id = profile.get('user_id')
-            if not user_id:
-                continue
-            
-            try:
-                # Fetch cases for this user
-                cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases"
-                cases_params = {
-                    'user_id': f'eq.{user_id}',
-                    'order': 'created_at.desc',
-                    'limit': '1000'
-                }
-                
-                cases_resp = requests.get(cases_url, headers=_postgrest_headers(), params=cases_params, timeout=10)
-                cases_resp.raise_for_status()
-                user_cases = cases_resp.json()
-                
-                # For each case, build the claims table row
-                for case in user_cases:
-                    # Parse call_summary if it's a string
-                    call_summary = case.get('call_summary', {})
-                    if isinstance(call_summary, str):
-                        try:
-                            import json
-                            call_summary = json.loads(call_summary)
-                        except:
-                            call_summary = {}
-                    
-                    # Parse eligibility_raw if it's a string
-                    eligibility_raw = profile.get('eligibility_raw', {})
-                    if isinstance(eligibility_raw, str):
-                        try:
-                            import json
-                            eligibility_raw = json.loads(eligibility_raw)
-                        except:
-                            eligibility_raw = {}
-                    
-                    # Build row for claims table
-                    row = {
-                        'id': case.get('id'),
-                        'case_id': case.get('id'),
-                        'user_id': user_id,
-                        # לקוח (Client) - from user_profile
-                        'client_name': profile.get('full_name'),
-                        'client_email': profile.get('email'),
-                        'client_phone': profile.get('phone'),
-                        'client_photo': profile.get('photo_url'),
-                        # מוצרים בתיק (Products) - from call_summary.products
-                        'products': call_summary.get('products', []),
-                        # סטטוס (Status) - from cases.status
-                        'status': case.get('status'),
-                        # ציון AI (AI Score) - from eligibility_raw.eligibility_score
-                        'ai_score': eligibility_raw.get('eligibility_score', 0),
-                        'eligibility_status': eligibility_raw.get('eligibility_status', 'not_rated'),
-                        # סכום עתודה משוער (Estimated claim amount) - from call_summary.estimated_claim_amount
-                        'estimated_claim_amount': call_summary.get('estimated_claim_amount', 0),
-                        # פעילות אחרונה (Recent activity) - hardcoded
-                        'recent_activity': 'not available',
-                        # Additional metadata
-                        'created_at': case.get('created_at'),
-                        'updated_at': case.get('updated_at'),
-                    }
-                    
-                    claims_data.append(row)
-                    
-            except Exception as e:
-                logger.warning(f'Failed to fetch cases for user_id={user_id}: {e}')
-        
-        logger.info(f'Built claims table with {len(claims_data)} rows')
+        logger.info(f'Built claims table with {len(claims_data)} rows (total: {page["total"]})')
         
         return JSONResponse({
             'status': 'ok',
             'data': claims_data,
-            'total': len(claims_data)
+            'total': page['total'],
+            'next_cursor': page['next_cursor']
         })
         
+    except supabase_async.PaginationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception(f'admin_claims_table failed: {e}')
         return JSONResponse({'status': 'ok', 'data': [], 'total': 0})
@@ -1567,168 +1422,36 @@ async def filter_cases_advanced(
     - Start date (created_at)
     - End date (updated_at)
     - Search query (client name, email, case ID)
+
+    All conditions are ANDed and evaluated by the database against the
+    indexed columns from migration 017, so pages are full and `total` is
+    the exact number of matching cases.
     """
     try:
-        import requests
-        from .supabase_client import _postgrest_headers
-        
-        # Build filter params for PostgREST query
-        filters = []
-        params = {}
-        
-        # Status filter
-        if filter_params.status and len(filter_params.status) > 0:
-            status_list = ','.join([f'"{s}"' for s in filter_params.status])
-            filters.append(f'status.in.({status_list})')
-        
-        # Date filters
-        if filter_params.start_date:
-            filters.append(f"created_at.gte.{filter_params.start_date.isoformat()}")
-        if filter_params.end_date:
-            filters.append(f"updated_at.lte.{filter_params.end_date.isoformat()}")
-        
-        # Build the initial cases query
-        url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases"
-        query_params = {
-            'limit': str(filter_params.limit),
-            'offset': str(filter_params.offset),
-            'order': 'created_at.desc'
-        }
-        
-        # Add filters
-        for f in filters:
-            query_params['or'] = query_params.get('or', '') + (',' if query_params.get('or') else '') + f
-        
-        headers = _postgrest_headers()
-        headers['Prefer'] = 'count=exact'
+        page = await supabase_async.filter_cases(filter_params)
         
-        resp = requests.get(url, headers=headers, params=query_params, timeout=15)
-        resp.raise_for_status()
-        
-        cases = resp.json()
-        
-        # Now process cases and apply additional filters
         filtered_data = []
-        
-        for case in cases:
-            # Skip if case is None or not a dict
-            if not case or not isinstance(case, dict):
-                logger.warning(f'Skipping invalid case object: {case}')
-                continue
-            
-            user_id = case.get('user_id')
-            if not user_id:
-                continue
-            
-            try:
-                # Fetch user profile for eligibility score
-                profile_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile?user_id=eq.{user_id}"
-                logger.info(f'Fetching profile for case {case.get("id")}, user_id: {user_id}')
-                profile_resp = requests.get(profile_url, headers=_postgrest_headers(), timeout=10)
-                profile_resp.raise_for_status()
-                
-                profiles = profile_resp.json()
-                if not profiles:
-                    logger.warning(f'No profiles found for user_id: {user_id}, case: {case.get("id")}')
-                    continue
-                
-                profile = profiles[0]
-                if not profile:
-                    logger.warning(f'Profile is None for user_id: {user_id}, case: {case.get("id")}')
-                    continue
-                
-                logger.debug(f'Profile loaded: {profile.get("user_id")} for case {case.get("id")}')
-                
-                # Parse eligibility_raw
-                eligibility_raw = profile.get('eligibility_raw', {})
-                logger.debug(f'eligibility_raw type: {type(eligibility_raw)}, value: {eligibility_raw}')
-                if isinstance(eligibility_raw, str):
-                    try:
-                        eligibility_raw = json.loads(eligibility_raw)
-                    except Exception as parse_err:
-                        logger.warning(f'Failed to parse eligibility_raw for case {case.get("id")}: {parse_err}')
-                        eligibility_raw = {}
-                
-                ai_score = eligibility_raw.get('eligibility_score', 0) if eligibility_raw else 0
-                logger.debug(f'AI score for case {case.get("id")}: {ai_score}')
-                
-                # Apply AI score filters
-                if filter_params.min_ai_score is not None and ai_score < filter_params.min_ai_score:
-                    logger.debug(f'Case {case.get("id")} filtered out: AI score {ai_score} < {filter_params.min_ai_score}')
-                    continue
-                if filter_params.max_ai_score is not None and ai_score > filter_params.max_ai_score:
-                    logger.debug(f'Case {case.get("id")} filtered out: AI score {ai_score} > {filter_params.max_ai_score}')
-                    continue
-                
-                # Parse call_summary
-                call_summary = case.get('call_summary', {})
-                logger.debug(f'call_summary type: {type(call_summary)}, value: {call_summary}')
-                if isinstance(call_summary, str):
-                    try:
-                        call_summary = json.loads(call_summary)
-                    except Exception as parse_err:
-                        logger.warning(f'Failed to parse call_summary for case {case.get("id")}: {parse_err}')
-                        call_summary = {}
-                
-                estimated_claim = call_summary.get('estimated_claim_amount', 0) if call_summary else 0
-                logger.debug(f'Estimated claim for case {case.get("id")}: {estimated_claim}')
-                
-                # Apply income potential filters
-                if filter_params.min_income_potential is not None and estimated_claim < filter_params.min_income_potential:
-                    logger.debug(f'Case {case.get("id")} filtered out: claim {estimated_claim} < {filter_params.min_income_potential}')
-                    continue
-                if filter_params.max_income_potential is not None and estimated_claim > filter_params.max_income_potential:
-                    logger.debug(f'Case {case.get("id")} filtered out: claim {estimated_claim} > {filter_params.max_income_potential}')
-                    continue
-                
-                # Apply search query filter
-                if filter_params.search_query:
-                    query_lower = filter_params.search_query.lower()
-                    client_name = profile.get('full_name') or ''
-                    client_email = profile.get('email') or ''
-                    case_id = case.get('id', '')
-                    logger.debug(f'Searching in: name={client_name}, email={client_email}, case_id={case_id}')
-                    match = (
-                        query_lower in client_name.lower() or
-                        query_lower in client_email.lower() or
-                        query_lower in case_id.lower()
-                    )
-                    if not match:
-                        logger.debug(f'Case {case.get("id")} filtered out: search query "{filter_params.search_query}" not found')
-                        continue
-                
-                # Build response row
-                row = {
-                    'case_id': case.get('id'),
-                    'user_id': user_id,
-                    'client_name': profile.get('full_name'),
-                    'client_email': profile.get('email'),
-                    'client_phone': profile.get('phone'),
-                    'status': case.get('status'),
-                    'ai_score': ai_score,
-                    'eligibility_status': eligibility_raw.get('eligibility_status', 'not_rated') if eligibility_raw else 'not_rated',
-                    'estimated_claim_amount': estimated_claim,
-                    'created_at': case.get('created_at'),
-                    'updated_at': case.get('updated_at'),
-                    'products': call_summary.get('products', []) if call_summary else [],
-                    'risk_assessment': call_summary.get('risk_assessment') if call_summary else None,
-                }
-                logger.info(f'Case {case.get("id")} passed all filters and added to results')
-                
-                filtered_data.append(row)
-                
-            except Exception as e:
-                case_id = case.get("id") if isinstance(case, dict) else "unknown"
-                import traceback
-                error_traceback = traceback.format_exc()
-                logger.error(f'Failed to process case {case_id}: {type(e).__name__}: {e}')
-                logger.error(f'Traceback: {error_traceback}')
-                continue
+        for row in page['rows']:
+            filtered_data.append({
+                'case_id': row.get('case_id'),
+                'user_id': row.get('user_id'),
+                'client_name': row.get('client_name'),
+                'client_email': row.get('client_email'),
+                'client_phone': row.get('client_phone'),
+                'status': row.get('status'),
+                'ai_score': row.get('ai_score', 0),
+                'eligibility_status': row.get('eligibility_status', 'not_rated'),
+                'estimated_claim_amount': row.get('estimated_claim_amount', 0),
+                'created_at': row.get('created_at'),
+                'updated_at': row.get('updated_at'),
+                'products': row.get('products') or [],
+                'risk_assessment': row.get('risk_assessment'),
+            })
         
         return JSONResponse({
             'status': 'ok',
             'data': filtered_data,
-            'total': len(filtered_data),
+            'total': page['total'],
             'limit': filter_params.limit,
             'offset': filter_params.offset
         })
@@ -2020,6 +1743,36 @@ async def get_document_summary(
         raise HTTPException(status_code=500, detail='get_document_summary_failed')
 
 
+async def _mark_requested_document_uploaded(case_id: str, document_id: str, document_name: str, doc_id: str, storage_url: str) -> bool:
+    """Flag the matching call_summary.documents_requested_list entry as uploaded.
+
+    Matches by the requested document's id first, then by its exact name.
+    Each attempt is a single atomic JSONB patch (migration 020), so
+    concurrent uploads to the same case cannot overwrite each other.
+    Returns True when an entry was matched.
+    """
+    patch = {'uploaded': True, 'document_id': doc_id, 'file_url': storage_url}
+    attempts = []
+    if document_id:
+        attempts.append(('id', document_id))
+    if document_name:
+        attempts.append(('name', document_name))
+    if not attempts:
+        logger.warning("✗ NO MATCH FOUND: frontend must provide document_name or document_id from documents_requested_list")
+        return False
+
+    for match_key, match_value in attempts:
+        matched = await supabase_async.case_json_update_element(
+            case_id, 'call_summary', ['documents_requested_list'], match_key, match_value, patch
+        )
+        if matched:
+            logger.info(f"✓ MATCHED by {match_key}: {matched.get('name')}")
+            return True
+
+    logger.warning(f"✗ NO MATCH FOUND for document_id={document_id!r} document_name={document_name!r}")
+    return False
+
+
 @app.post('/cases/{case_id}/documents')
 async def upload_case_document(
     case_id: str,
@@ -2045,11 +1798,12 @@ async def upload_case_document(
         - If relevance confidence <= 60 and not confirmed: {status: "needs_confirmation", relevance_check: {...}, temp_storage_info: {...}}
         - If confirmed=True: Standard upload response regardless of confidence
     """
+    spool = None
     try:
         from datetime import datetime
         from .supabase_client import (
             get_case, 
-            storage_upload_file, 
+            storage_upload_stream, 
             insert_case_document,
             get_profile_by_user_id,
             update_case
@@ -2070,14 +1824,14 @@ async def upload_case_document(
         if not profile:
             raise HTTPException(status_code=400, detail='user_profile_not_found')
         
-        # Read file content
-        content = await file.read()
-        filesize = len(content)
+        # Spool the upload to disk; OCR and storage read it from there
+        spool = await spool_upload(file)
+        filesize = spool.size
         file_ext = Path(file.filename).suffix or ''
         
         # Validate file type - only PDF and image files allowed
         from .ocr import is_pdf, is_image
-        if not (is_pdf(content, file.filename) or is_image(file.filename)):
+        if not (is_pdf(spool.head, file.filename) or is_image(file.filename)):
             raise HTTPException(status_code=400, detail='invalid_file_type_only_pdf_and_images_allowed')
         
         # Extract text and analyze document for summary
@@ -2087,7 +1841,7 @@ async def upload_case_document(
         
         try:
             logger.info(f"Analyzing document: {file.filename}")
-            text, extraction_success = extract_text_from_document(content, file.filename)
+            text, extraction_success = await extract_text_from_file_async(spool.path, file.filename, sha256=spool.sha256)
             
             if extraction_success and text:
                 from .dashboard_document_summarizer import summarize_dashboard_document
@@ -2126,12 +1880,14 @@ async def upload_case_document(
         
         storage_path = f"cases/{case_id}/documents/{timestamp}_{safe_filename}"
         
-        upload_result = storage_upload_file(
+        upload_result = await asyncio.to_thread(
+            storage_upload_stream,
             bucket='case-documents',
             path=storage_path,
-            file_bytes=content,
+            source_path=spool.path,
             content_type=file.content_type or 'application/octet-stream',
-            upsert=True
+            upsert=True,
+            size=spool.size
         )
         storage_url = upload_result.get('public_url')
         logger.info(f"Uploaded document to: {storage_url}")
@@ -2243,6 +1999,7 @@ async def upload_case_document(
             uploaded_by=user['profile']['id'],
             metadata={
                 'upload_source': 'manual_upload',
+                'sha256': spool.sha256,
                 'document_summary': document_summary,
                 'key_points': document_key_points,
                 'is_relevant': is_relevant,
@@ -2253,94 +2010,8 @@ async def upload_case_document(
         
         # Update call_summary.documents_requested_list with uploaded document info
         try:
-            call_summary = case.get('call_summary', {})
-            
-            # Parse call_summary if it's a string (JSON)
-            if isinstance(call_summary, str):
-                try:
-                    call_summary = json.loads(call_summary)
-                except json.JSONDecodeError:
-                    call_summary = {}
-            
-            # Ensure call_summary is a dict
-            if not isinstance(call_summary, dict):
-                call_summary = {}
-            
-            # Ensure documents_requested_list exists
-            if 'documents_requested_list' not in call_summary:
-                call_summary['documents_requested_list'] = []
-            
-            # Update document status - try to match by document_id or name
-            documents_list = call_summary.get('documents_requested_list', [])
-            
-            # Ensure documents_list contains dicts, not strings
-            normalized_documents_list = []
-            for item in documents_list:
-                if isinstance(item, str):
-                    try:
-                        item = json.loads(item)
-                    except (json.JSONDecodeError, ValueError):
-                        logger.warning(f"Could not parse document item as JSON: {item}")
-                        continue
-                if isinstance(item, dict):
-                    normalized_documents_list.append(item)
-            documents_list = normalized_documents_list
-            
-            # Get the document ID from the inserted record (from case_documents table)
             doc_id = doc_record.get('id') if isinstance(doc_record, dict) else None
-            
-            logger.info(f"DEBUG upload_case_document:")
-            logger.info(f"  document_id from frontend: {document_id}")
-            logger.info(f"  document_name from frontend: {document_name}")
-            logger.info(f"  file.filename (local file, IGNORED for matching): {file.filename}")
-            logger.info(f"  doc_id from case_documents: {doc_id}")
-            logger.info(f"  documents_list count: {len(documents_list)}")
-            for idx, doc in enumerate(documents_list):
-                logger.info(f"    doc[{idx}]: id={doc.get('id')}, name={doc.get('name')}")
-            
-            # Match document by ID first, then by exact name from documents_requested_list
-            document_matched = False
-            
-            # Strategy 1: If document_id was provided, try to match by ID first
-            if document_id:
-                for idx, doc in enumerate(documents_list):
-                    if doc.get('id') == document_id:
-                        doc['uploaded'] = True
-                        doc['document_id'] = doc_id
-                        doc['file_url'] = storage_url
-                        document_matched = True
-                        logger.info(f"✓ MATCHED by ID at index {idx}: {doc.get('name')}")
-                        break
-            
-            # Strategy 2: If document_name provided from frontend, match by exact name
-            if not document_matched and document_name:
-                logger.info(f"[Strategy 2] Matching by document_name: {document_name}")
-                for idx, doc in enumerate(documents_list):
-                    if doc.get('name') == document_name:
-                        doc['uploaded'] = True
-                        doc['document_id'] = doc_id
-                        doc['file_url'] = storage_url
-                        document_matched = True
-                        logger.info(f"✓ MATCHED by name at index {idx}: {doc.get('name')}")
-                        break
-            
-            if not document_matched:
-                logger.warning(f"✗ NO MATCH FOUND")
-                if not document_name and not document_id:
-                    logger.warning(f"  ERROR: Frontend must provide document_name or document_id from documents_requested_list")
-                elif document_name:
-                    logger.warning(f"  ERROR: Could not find document with name='{document_name}'")
-                    logger.warning(f"  Available documents: {[d.get('name') for d in documents_list]}")
-            
-            call_summary['documents_requested_list'] = documents_list
-            
-            # Update case with modified call_summary - pass dict directly, Supabase client handles JSON
-            logger.info(f"DEBUG: Updating case {case_id} with {len(documents_list)} documents")
-            if document_matched:
-                logger.info(f"  ✓ Document was matched and updated")
-            logger.info(f"  call_summary dict: {call_summary}")
-            result = update_case(case_id, {'call_summary': call_summary})
-            logger.info(f"  update_case returned: {result}")
+            await _mark_requested_document_uploaded(case_id, document_id, document_name, doc_id, storage_url)
             logger.info(f"✓ Updated call_summary for case {case_id}")
         except Exception as e:
             logger.exception(f"CRITICAL: Failed to update call_summary with document info: {e}")
@@ -2368,6 +2039,9 @@ async def upload_case_document(
     except Exception:
         logger.exception(f'upload_case_document failed for case_id={case_id}')
         raise HTTPException(status_code=500, detail='upload_case_document_failed')
+    finally:
+        if spool:
+            spool.cleanup()
 
 
 @app.delete('/cases/{case_id}/documents/temp')
@@ -2590,8 +2264,9 @@ async def upload_medical_document(
     The document_name is used to match and update the correct document in call_summary.documents_requested_list.
     The local uploaded filename is irrelevant for matching - it's just stored as the file.
     """
+    spool = None
     try:
-        from .supabase_client import get_case, storage_upload_file, insert_case_document, update_case
+        from .supabase_client import get_case, storage_upload_stream, insert_case_document, update_case
         
         # Verify user has access to this case
         case_list = get_case(case_id)
@@ -2602,8 +2277,8 @@ async def upload_medical_document(
         if user['role'] != 'admin' and case.get('user_id') != user['id']:
             raise HTTPException(status_code=403, detail='access_denied')
         
-        # Read file content
-        file_content = await file.read()
+        # Spool the upload to disk; OCR and storage read it from there
+        spool = await spool_upload(file)
         
         # Extract text and analyze document for summary
         document_summary = None
@@ -2612,7 +2287,7 @@ async def upload_medical_document(
         
         try:
             logger.info(f"Analyzing medical document: {file.filename}")
-            text, extraction_success = extract_text_from_document(file_content, file.filename)
+            text, extraction_success = await extract_text_from_file_async(spool.path, file.filename, sha256=spool.sha256)
             
             if extraction_success and text:
                 from .dashboard_document_summarizer import summarize_dashboard_document
@@ -2650,11 +2325,13 @@ async def upload_medical_document(
         
         file_path = f"{user['id']}/{case_id}/{document_type}_{timestamp}_{sanitized_filename}"
         
-        upload_result = storage_upload_file(
-            bucket_name=bucket_name,
-            file_path=file_path,
-            file_data=file_content,
-            content_type=file.content_type or 'application/octet-stream'
+        upload_result = await asyncio.to_thread(
+            storage_upload_stream,
+            bucket=bucket_name,
+            path=file_path,
+            source_path=spool.path,
+            content_type=file.content_type or 'application/octet-stream',
+            size=spool.size
         )
         
         storage_url = upload_result.get('public_url')
@@ -2666,12 +2343,13 @@ async def upload_medical_document(
             document_type=document_type,
             file_name=file.filename,
             file_path=file_path,
-            file_size=len(file_content),
+            file_size=spool.size,
             file_type=file.content_type,
             storage_url=storage_url,
             uploaded_by=user['profile']['id'],
             metadata={
                 'upload_source': 'medical_documents_flow',
+                'sha256': spool.sha256,
                 'document_category': 'medical',
                 'ai_recommended': True,
                 'document_summary': document_summary,
@@ -2682,87 +2360,8 @@ async def upload_medical_document(
         
         # Update call_summary.documents_requested_list with uploaded document info
         try:
-            call_summary = case.get('call_summary', {})
-            
-            # Parse call_summary if it's a string (JSON)
-            if isinstance(call_summary, str):
-                try:
-                    call_summary = json.loads(call_summary)
-                except json.JSONDecodeError:
-                    call_summary = {}
-            
-            # Ensure call_summary is a dict
-            if not isinstance(call_summary, dict):
-                call_summary = {}
-            
-            # Ensure documents_requested_list exists
-            if 'documents_requested_list' not in call_summary:
-                call_summary['documents_requested_list'] = []
-            
-            # Update document status - try to match by document_id or name
-            documents_list = call_summary.get('documents_requested_list', [])
-            
-            # Get the document ID from the inserted record
             doc_id = doc_record.get('id') if isinstance(doc_record, dict) else None
-            
-            # DEBUG logging
-            logger.info(f"DEBUG upload_medical_document:")
-            logger.info(f"  document_id from frontend: {document_id}")
-            logger.info(f"  document_name from frontend: {document_name}")
-            logger.info(f"  file.filename (local file, IGNORED for matching): {file.filename}")
-            logger.info(f"  doc_id from case_documents: {doc_id}")
-            logger.info(f"  documents_list count: {len(documents_list)}")
-            for idx, doc in enumerate(documents_list):
-                logger.info(f"    doc[{idx}]: id={doc.get('id')}, name={doc.get('name')}")
-            
-            # Match document by ID first, then by exact name from documents_requested_list
-            document_matched = False
-            matched_index = -1
-            
-            # Strategy 1: If document_id was provided from frontend, match by that
-            if document_id:
-                logger.info(f"[Strategy 1] Attempting to match by document_id: {document_id}")
-                for idx, doc in enumerate(documents_list):
-                    if doc.get('id') == document_id:
-                        doc['uploaded'] = True
-                        doc['document_id'] = doc_id
-                        doc['file_url'] = storage_url
-                        document_matched = True
-                        matched_index = idx
-                        logger.info(f"  ✓ MATCHED by ID at index {idx}: {doc.get('name')}")
-                        break
-            
-            # Strategy 2: If document_name provided from frontend, match by exact name
-            if not document_matched and document_name:
-                logger.info(f"[Strategy 2] Matching by document_name: {document_name}")
-                for idx, doc in enumerate(documents_list):
-                    if doc.get('name') == document_name:
-                        doc['uploaded'] = True
-                        doc['document_id'] = doc_id
-                        doc['file_url'] = storage_url
-                        document_matched = True
-                        matched_index = idx
-                        logger.info(f"  ✓ MATCHED by name at index {idx}: {doc.get('name')}")
-                        break
-            
-            # Log result
-            if document_matched:
-                logger.info(f"✓ Document matched and updated at index {matched_index}")
-            else:
-                logger.warning(f"✗ NO MATCH FOUND")
-                if not document_name and not document_id:
-                    logger.warning(f"  ERROR: Frontend must provide document_name or document_id from documents_requested_list")
-                elif document_name:
-                    logger.warning(f"  ERROR: Could not find document with name='{document_name}'")
-                    logger.warning(f"  Available documents: {[d.get('name') for d in documents_list]}")
-            
-            call_summary['documents_requested_list'] = documents_list
-            
-            # Update case with modified call_summary - pass dict directly, Supabase client handles JSON
-            logger.info(f"DEBUG: Updating case {case_id} with {len(documents_list)} documents")
-            logger.info(f"  call_summary dict: {call_summary}")
-            result = update_case(case_id, {'call_summary': call_summary})
-            logger.info(f"  update_case returned: {result}")
+            await _mark_requested_document_uploaded(case_id, document_id, document_name, doc_id, storage_url)
             logger.info(f"✓ Updated call_summary for case {case_id} with document upload info")
         except Exception as e:
             logger.exception(f"CRITICAL: Failed to update call_summary with document info: {e}")
@@ -2778,6 +2377,9 @@ async def upload_medical_document(
     except Exception:
         logger.exception(f'upload_medical_document failed')
         raise HTTPException(status_code=500, detail='upload_medical_document_failed')
+    finally:
+        if spool:
+            spool.cleanup()
 
 
 
@@ -2811,7 +2413,7 @@ async def delete_case_document_endpoint(
         file_path = doc.get('file_path')
         if file_path:
             try:
-                storage_delete_file(bucket='case-documents', path=file_path)
+                storage_delete_file(bucket=doc.get('storage_bucket') or 'case-documents', path=file_path)
                 logger.info(f"Deleted file from storage: {file_path}")
             except Exception:
                 logger.exception(f'Failed to delete file from storage: {file_path}')
@@ -2831,6 +2433,292 @@ async def delete_case_document_endpoint(
         raise HTTPException(status_code=500, detail='delete_case_document_failed')
 
 
+# ===========================
+# DIRECT-TO-STORAGE UPLOADS
+# ===========================
+
+async def _get_accessible_case(case_id: str, user: dict) -> dict:
+    case_list = await supabase_async.get_case(case_id)
+    if not case_list:
+        raise HTTPException(status_code=404, detail='case_not_found')
+    case = case_list[0]
+    if user['role'] != 'admin' and case.get('user_id') != user['id']:
+        raise HTTPException(status_code=403, detail='access_denied')
+    return case
+
+
+# Pages that must be OCRed before a preliminary summary of a longer document starts (0 = off)
+EARLY_SUMMARY_PAGES = int(os.environ.get('EARLY_SUMMARY_PAGES', '3'))
+
+
+async def submit_job(job_id: str, func, *args, **kwargs):
+    """Queue a created job on the scheduler; a full queue for its type becomes 503 + Retry-After."""
+    try:
+        await get_job_queue().submit(job_id, func, *args, **kwargs)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f'Too many {e.job_type} jobs waiting; retry in {e.retry_after}s',
+            headers={'Retry-After': str(e.retry_after)}
+        )
+
+
+async def _stream_ocr_to_job(job_id: str, local_path: str, file_name: str, document_type: str,
+                             progress_start: int = 30, progress_end: int = 70):
+    """OCR a file inside a job, publishing each page as it finishes.
+
+    Pages appear under `partial` at /jobs/{job_id}?include_text=true. Once the
+    first EARLY_SUMMARY_PAGES pages of a longer document are in, a preliminary
+    summary of them is produced alongside the rest of the OCR and published
+    as partial['preliminary_summary'].
+
+    Returns (text, success, summary). summary is the summarizer result for the
+    whole text when the preliminary summary ended up covering every page (OCR
+    finished before it started), so the caller does not summarize twice; else
+    None (also when that summary failed). A preliminary summary still running when OCR ends is cancelled.
+    """
+    from .ocr_engine import join_pages
+    from .dashboard_document_summarizer import summarize_dashboard_document
+
+    job_queue = get_job_queue()
+    job = job_queue.get_job(job_id)
+    early_summary = []  # the preliminary summary task, once started
+    summarized = []  # the text it summarizes
+
+    async def preliminary_summary(page_count: int):
+        # OCR keeps going until this task gets to run; take every page ready by now
+        pages = job.ready_pages()
+        summarized.append(join_pages(pages))
+        try:
+            result = await asyncio.to_thread(
+                summarize_dashboard_document, summarized[0], document_name=file_name, document_type=document_type
+            )
+            await job_queue.update_job_partial(job_id, preliminary_summary={
+                'pages': len(pages),
+                'page_count': page_count,
+                'document_summary': result.get('document_summary', ''),
+                'key_points': result.get('key_points', []),
+            })
+            return result
+        except Exception as e:
+            logger.warning(f"[JOB] Preliminary summary failed for job {job_id}: {e}")
+            return None
+
+    async def on_page(index: int, page_count: int, text: str):
+        await job_queue.record_page(job_id, index, page_count, text, progress_start, progress_end)
+        if early_summary or not job or not EARLY_SUMMARY_PAGES or page_count <= EARLY_SUMMARY_PAGES:
+            return
+        if len(job.ready_pages()) >= EARLY_SUMMARY_PAGES:
+            early_summary.append(asyncio.create_task(preliminary_summary(page_count)))
+
+    try:
+        text, extraction_success = await extract_text_from_file_async(local_path, file_name, on_page=on_page)
+        summary = None
+        if early_summary and extraction_success and summarized and summarized[0] == text:
+            summary = await early_summary[0]
+        return text, extraction_success, summary
+    finally:
+        if early_summary and not early_summary[0].done():
+            early_summary[0].cancel()
+
+
+async def _process_direct_upload(job_id: str, bucket: str, storage_path: str, file_name: str,
+                                 document_type: str, doc_id: str, case_id: str):
+    """Background task: OCR and summarize a directly uploaded document, then store the analysis on its row."""
+    from .supabase_client import storage_fetch_file
+    from .dashboard_document_summarizer import summarize_dashboard_document
+
+    job_queue = get_job_queue()
+    try:
+        await job_queue.update_job_progress(job_id, 10, 'Downloading document')
+        local_path = await asyncio.to_thread(storage_fetch_file, bucket, storage_path)
+
+        await job_queue.update_job_progress(job_id, 30, 'Extracting text')
+        text, extraction_success, summary_result = await _stream_ocr_to_job(
+            job_id, local_path, file_name, document_type
+        )
+
+        analysis = {'processing': 'completed', 'document_summary': None, 'key_points': [], 'is_relevant': True}
+        if extraction_success and text:
+            if summary_result is None:
+                await job_queue.update_job_progress(job_id, 70, 'Summarizing document')
+                summary_result = await asyncio.to_thread(
+                    summarize_dashboard_document, text, document_name=file_name, document_type=document_type
+                )
+            analysis.update({
+                'document_summary': summary_result.get('document_summary', ''),
+                'key_points': summary_result.get('key_points', []),
+                'is_relevant': summary_result.get('is_relevant', True),
+            })
+        else:
+            logger.warning(f"[UPLOAD] No text extracted from {bucket}/{storage_path}")
+
+        await job_queue.update_job_progress(job_id, 90, 'Saving analysis')
+        await supabase_async.patch_case_document_metadata(doc_id, analysis)
+
+        try:
+            updated_case = await supabase_async.get_case(case_id)
+            if updated_case:
+                new_status = await asyncio.to_thread(update_case_status, case_id, updated_case[0])
+                logger.info(f"[UPLOAD] Updated case status after direct upload: {new_status}")
+        except Exception as e:
+            logger.warning(f"[UPLOAD] Failed to update case status after direct upload: {e}")
+
+        return {'document_id': doc_id, **analysis}
+    except Exception:
+        await supabase_async.patch_case_document_metadata(doc_id, {'processing': 'failed'})
+        raise
+
+
+@app.post('/storage/upload-url')
+async def create_direct_upload_url(payload: SignedUploadRequest, user = Depends(require_auth)):
+    """Issue a signed URL for uploading a document straight to Supabase Storage.
+
+    The client PUTs the file to `signed_url`, then calls /storage/upload-complete
+    with `upload_ticket` (valid for `expires_in` seconds) to register it.
+    """
+    from . import direct_upload
+
+    if payload.bucket not in direct_upload.DIRECT_UPLOAD_BUCKETS:
+        raise HTTPException(status_code=400, detail='invalid_bucket')
+    if Path(payload.file_name).suffix.lower() not in direct_upload.ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail='invalid_file_type_only_pdf_and_images_allowed')
+    if payload.file_size and payload.file_size > direct_upload.DIRECT_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail='file_too_large')
+
+    await _get_accessible_case(payload.case_id, user)
+
+    storage_path = direct_upload.object_path(payload.bucket, payload.case_id, user['id'], payload.file_name)
+    try:
+        signed = await supabase_async.storage_create_signed_upload_url(payload.bucket, storage_path)
+    except Exception:
+        raise HTTPException(status_code=502, detail='signed_upload_url_failed')
+
+    ticket = direct_upload.issue_ticket(
+        payload.bucket, storage_path, payload.case_id, user['id'],
+        payload.file_name, payload.content_type, payload.document_type
+    )
+    logger.info(f"[UPLOAD] Issued signed upload URL for {payload.bucket}/{storage_path}")
+    return JSONResponse({
+        'status': 'ok',
+        'bucket': payload.bucket,
+        'storage_path': storage_path,
+        'signed_url': signed['signed_url'],
+        'token': signed['token'],
+        'upload_ticket': ticket,
+        'expires_in': direct_upload.DIRECT_UPLOAD_TTL,
+        'max_bytes': direct_upload.DIRECT_UPLOAD_MAX_BYTES
+    })
+
+
+@app.post('/storage/upload-complete')
+async def complete_direct_upload(payload: UploadCompleteRequest, user = Depends(require_auth)):
+    """Register a finished direct upload and queue OCR + summarization.
+
+    Creates the case_documents row (once per object), marks the requested
+    document as uploaded when document_id/document_name is given, and returns
+    a job_id to poll at /jobs/{job_id}. Repeated calls return the existing
+    row; while its processing is still 'queued' or has 'failed' they redo the
+    marking and attach to (or start) its processing job, so a call that died
+    half way can simply be retried.
+    """
+    from . import direct_upload
+
+    try:
+        ticket = direct_upload.verify_ticket(payload.upload_ticket, user['id'])
+    except direct_upload.UploadTicketError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    bucket, storage_path, case_id = ticket['bucket'], ticket['path'], ticket['case_id']
+    file_name = ticket['file_name']
+    document_type = ticket.get('document_type') or 'general'
+
+    info = await supabase_async.storage_object_info(bucket, storage_path)
+    if not info:
+        raise HTTPException(status_code=409, detail='upload_not_found')
+    if info['size'] and info['size'] > direct_upload.DIRECT_UPLOAD_MAX_BYTES:
+        await supabase_async.storage_delete_file(bucket, storage_path)
+        raise HTTPException(status_code=413, detail='file_too_large')
+
+    storage_url = supabase_async._storage_public_url(bucket, storage_path)
+
+    existing = await supabase_async.postgrest_get(
+        'case_documents', {'case_id': f'eq.{case_id}', 'file_path': f'eq.{storage_path}', 'limit': 1}
+    )
+    if existing:
+        doc_record = existing[0]
+        if (doc_record.get('metadata') or {}).get('processing') not in ('queued', 'failed'):
+            return JSONResponse({'status': 'ok', 'document': doc_record, 'storage_url': storage_url, 'job_id': None})
+        # A previous call registered the row but did not get the document processed
+        # (it failed after the insert, the worker died, or OCR failed): finish the job
+        logger.info(f"[UPLOAD] Resuming direct upload {bucket}/{storage_path} (document {doc_record.get('id')})")
+    else:
+        try:
+            doc_record = await supabase_async.insert_case_document(
+                case_id=case_id,
+                file_path=storage_path,
+                file_name=file_name,
+                file_type=ticket.get('content_type') or info.get('content_type'),
+                file_size=info['size'],
+                document_type=document_type,
+                uploaded_by=user['profile']['id'],
+                metadata={
+                    'upload_source': 'direct_upload',
+                    'bucket': bucket,
+                    'processing': 'queued'
+                },
+                storage_bucket=bucket
+            )
+        except Exception:
+            raise HTTPException(status_code=500, detail='register_document_failed')
+    doc_id = doc_record.get('id') if isinstance(doc_record, dict) else None
+
+    if payload.document_id or payload.document_name:
+        try:
+            await _mark_requested_document_uploaded(
+                case_id, payload.document_id, payload.document_name, doc_id, storage_url
+            )
+        except Exception as e:
+            logger.exception(f"CRITICAL: Failed to update call_summary with document info: {e}")
+            raise HTTPException(status_code=500, detail=f'Failed to persist document update to database: {str(e)}')
+
+    job_queue = get_job_queue()
+    job_id = await job_queue.create_job_once(
+        job_type='document_processing',
+        metadata={
+            'case_id': case_id,
+            'user_id': user['id'],
+            'document_id': doc_id,
+            'bucket': bucket,
+            'storage_path': storage_path
+        },
+        # Retries of this call attach to the job already processing the object
+        idempotency_key=idempotency_key('document_processing', case_id, storage_path)
+    )
+    # The document row already says 'queued', so this job waits instead of being rejected
+    await submit_job(
+        job_id,
+        _process_direct_upload,
+        job_id,
+        bucket,
+        storage_path,
+        file_name,
+        document_type,
+        doc_id,
+        case_id,
+        reject_when_full=False
+    )
+    logger.info(f"[UPLOAD] Registered direct upload {bucket}/{storage_path} as document {doc_id}; job {job_id}")
+
+    return JSONResponse({
+        'status': 'ok',
+        'document': doc_record,
+        'storage_url': storage_url,
+        'job_id': job_id,
+        'message': f'Document processing queued. Poll /jobs/{job_id} for status.'
+    })
+
+
 # ===========================
 # AGENT PROMPTS MANAGEMENT
 # ===========================
@@ -2880,7 +2768,7 @@ async def get_agent(agent_id: str, user = Depends(require_admin)):
 async def update_agent(agent_id: str, payload: Dict[str, Any] = Body(...), user = Depends(require_admin)):
     """Update an agent prompt."""
     try:
-        from .supabase_client import _supabase_admin
+        from .supabase_client import _supabase_admin, clear_agent_cache
         
         prompt = payload.get('prompt')
         model = payload.get('model')
@@ -2907,6 +2795,8 @@ async def update_agent(agent_id: str, payload: Dict[str, Any] = Body(...), user
         if not response.data or len(response.data) == 0:
             raise HTTPException(status_code=404, detail='agent_not_found')
         
+        clear_agent_cache(response.data[0].get('name'))
+        
         return JSONResponse({
             'status': 'ok',
             'agent': response.data[0]
@@ -2922,7 +2812,7 @@ async def update_agent(agent_id: str, payload: Dict[str, Any] = Body(...), user
 async def create_agent(payload: Dict[str, Any] = Body(...), user = Depends(require_admin)):
     """Create a new agent prompt."""
     try:
-        from .supabase_client import _supabase_admin
+        from .supabase_client import _supabase_admin, clear_agent_cache
         
         name = payload.get('name')
         prompt = payload.get('prompt')
@@ -2945,6 +2835,9 @@ async def create_agent(payload: Dict[str, Any] = Body(...), user = Depends(requi
         if not response.data or len(response.data) == 0:
             raise HTTPException(status_code=400, detail='failed_to_create_agent')
         
+        # Drop any cached "not found" entry for this name
+        clear_agent_cache(name)
+        
         return JSONResponse({
             'status': 'ok',
             'agent': response.data[0]
@@ -2996,10 +2889,17 @@ async def get_agent_by_name(agent_name: str):
 async def delete_agent(agent_id: str, user = Depends(require_admin)):
     """Delete an agent prompt."""
     try:
-        from .supabase_client import _supabase_admin
+        from .supabase_client import _supabase_admin, clear_agent_cache
         
         response = _supabase_admin.table('agents').delete().eq('id', agent_id).execute()
         
+        deleted = response.data or []
+        if deleted:
+            for row in deleted:
+                clear_agent_cache(row.get('name'))
+        else:
+            clear_agent_cache()
+        
         return JSONResponse({
             'status': 'ok',
             'deleted': True
@@ -3012,88 +2912,41 @@ async def delete_agent(agent_id: str, user = Depends(require_admin)):
 @app.get('/admin/cases/work-disability')
 async def get_work_disability_cases(
     page: int = 1,
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    count: str = 'exact'
 ):
     """
     Get cases with 'Work Disability' product type for the admin dashboard.
     Returns paginated list of work disability cases with relevant data.
+
+    The product filter runs in the database, so every page is full. Use
+    `page` for offset paging or pass `next_cursor` back as `cursor`.
     """
     try:
-        from .supabase_client import _postgrest_headers
-        
-        logger.info(f"Fetching work disability cases: page={page}, limit={limit}")
-        
-        # Get all cases
-        offset = (page - 1) * limit
-        cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases?order=created_at.desc&limit={limit}&offset={offset}"
-        
-        logger.info(f"Calling Supabase: {cases_url}")
-        cases_resp = requests.get(cases_url, headers=_postgrest_headers(), timeout=15)
-        logger.info(f"Supabase response status: {cases_resp.status_code}")
-        
-        if not cases_resp.ok:
-            logger.error(f"Supabase error: {cases_resp.text}")
-            cases_resp.raise_for_status()
-        
-        cases = cases_resp.json()
-        logger.info(f"Fetched {len(cases)} cases from Supabase")
-        
-        # Log sample case structure to debug field names
-        if cases:
-            logger.info(f"Sample case fields: {cases[0].keys()}")
+        logger.info(f"Fetching work disability cases: page={page}, limit={limit}, cursor={'yes' if cursor else 'no'}")
         
-        # Fetch all user profiles to get email data
-        profiles_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile?limit=500"
-        profiles_resp = requests.get(profiles_url, headers=_postgrest_headers(), timeout=15)
-        profiles_resp.raise_for_status()
-        profiles = profiles_resp.json()
-        
-        # Create a map of user_id to profile for quick lookup
-        user_profiles = {profile.get('user_id'): profile for profile in profiles}
-        logger.info(f"Loaded {len(user_profiles)} user profiles")
+        result = await supabase_async.list_work_disability_cases(
+            limit=limit,
+            offset=(page - 1) * limit,
+            cursor=cursor,
+            count=supabase_async.count_mode(count),
+        )
         
-        # Filter for Work Disability cases
-        work_disability_cases = []
-        for case in cases:
-            try:
-                call_summary = case.get('call_summary', {})
-                if isinstance(call_summary, str):
-                    call_summary = json.loads(call_summary)
-                
-                products = call_summary.get('products', [])
-                if isinstance(products, str):
-                    products = json.loads(products)
-                
-                # Check if Work Disability is in the products
-                if products and 'Work Disability' in products:
-                    # Extract eligibility data
-                    eligibility_raw = case.get('eligibility_raw', {})
-                    if isinstance(eligibility_raw, str):
-                        eligibility_raw = json.loads(eligibility_raw)
-                    
-                    # Get user profile to fetch email
-                    user_id = case.get('user_id')
-                    user_profile = user_profiles.get(user_id) if user_id else None
-                    client_email = user_profile.get('email') if user_profile else ''
-                    client_name = user_profile.get('full_name') or user_profile.get('name') if user_profile else case.get('client_name', 'Unknown')
-                    client_phone = user_profile.get('phone_number') if user_profile else case.get('client_phone', '')
-                    
-                    # Build case response object
-                    case_obj = {
-                        'id': case.get('id'),
-                        'client_name': client_name,
-                        'client_email': client_email,
-                        'client_phone': client_phone,
-                        'status': case.get('status', 'new'),
-                        'created_at': case.get('created_at'),
-                        'updated_at': case.get('updated_at'),
-                        'eligibility_score': eligibility_raw.get('eligibility_score', 0),
-                        'potential_fee': call_summary.get('estimated_claim_amount', 0),
-                    }
-                    work_disability_cases.append(case_obj)
-            except Exception as parse_err:
-                logger.warning(f'Failed to parse case {case.get("id")}: {parse_err}')
-                continue
+        work_disability_cases = [
+            {
+                'id': row.get('case_id'),
+                'client_name': row.get('client_name') or 'Unknown',
+                'client_email': row.get('client_email') or '',
+                'client_phone': row.get('client_phone') or '',
+                'status': row.get('status') or 'new',
+                'created_at': row.get('created_at'),
+                'updated_at': row.get('updated_at'),
+                'eligibility_score': row.get('ai_score', 0),
+                'potential_fee': row.get('estimated_claim_amount', 0),
+            }
+            for row in result['rows']
+        ]
         
         logger.info(f"Found {len(work_disability_cases)} work disability cases")
         
@@ -3101,10 +2954,14 @@ async def get_work_disability_cases(
             'status': 'ok',
             'cases': work_disability_cases,
             'count': len(work_disability_cases),
+            'total': result['total'],
             'page': page,
-            'limit': limit
+            'limit': limit,
+            'next_cursor': result['next_cursor']
         })
         
+    except supabase_async.PaginationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f'Failed to get work disability cases: {e}', exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -3195,192 +3052,199 @@ async def eligibility_check(answers: str = Form(...), file: UploadFile = File(..
         logger.warning("Invalid JSON in 'answers' form field", exc_info=True)
         raise HTTPException(status_code=400, detail='Invalid JSON in answers')
 
-    # read file content
+    # spool file content to disk
     try:
-        content = await file.read()
-        filesize = len(content)
+        spool = await spool_upload(file)
+        filesize = spool.size
         file_ext = Path(file.filename).suffix or '.pdf'
-        logger.info(f"Read uploaded file {file.filename}; size={filesize} bytes")
+        logger.info(f"Spooled uploaded file {file.filename}; size={filesize} bytes")
     except Exception:
         logger.exception("Failed to read uploaded file")
         raise HTTPException(status_code=500, detail='Failed to read uploaded file')
 
-    # Extract text using Google Vision API (works for PDFs, images, scanned docs)
     try:
-        text, extraction_success = extract_text_from_document(content, file.filename)
-        logger.info(f"Text extraction complete; success={extraction_success}; extracted_chars={len(text) if text else 0}")
-        
-        # Log OCR preview for debugging
-        if text:
-            preview = text[:500].replace('\n', ' ')
-            logger.info(f"OCR PREVIEW (first 500 chars): {preview}")
-        else:
-            logger.warning("OCR extracted NO TEXT - document may be blank or unreadable")
-    except Exception as e:
-        logger.exception("Text extraction failed using Google Vision; attempting PDF fallback if applicable")
-        # If Google Vision credentials are missing or fail, attempt a local PDF fallback
-        fallback_text = None
-        fallback_success = False
+        # Extract text using Google Vision API (works for PDFs, images, scanned docs)
         try:
-            # Only attempt fallback for PDF files (digital PDFs)
-            if file_ext.lower().endswith('.pdf'):
-                try:
-                    from .ocr import extract_text_from_pdf_bytes
-                    fallback_text, fallback_success = extract_text_from_pdf_bytes(content)
-                    if fallback_success:
-                        text = fallback_text
-                        extraction_success = True
-                        logger.info(f"Used PyPDF2 fallback extraction; extracted_chars={len(text) if text else 0}")
-                except Exception:
-                    logger.exception('PDF fallback extraction failed')
+            text, extraction_success = await extract_text_from_file_async(spool.path, file.filename, sha256=spool.sha256)
+            logger.info(f"Text extraction complete; success={extraction_success}; extracted_chars={len(text) if text else 0}")
+            
+            # Log OCR preview for debugging
+            if text:
+                preview = text[:500].replace('\n', ' ')
+                logger.info(f"OCR PREVIEW (first 500 chars): {preview}")
+            else:
+                logger.warning("OCR extracted NO TEXT - document may be blank or unreadable")
+        except Exception as e:
+            logger.exception("Text extraction failed using Google Vision; attempting PDF fallback if applicable")
+            # If Google Vision credentials are missing or fail, attempt a local PDF fallback
+            fallback_text = None
+            fallback_success = False
+            try:
+                # Only attempt fallback for PDF files (digital PDFs)
+                if file_ext.lower().endswith('.pdf'):
+                    try:
+                        fallback_text, fallback_success = await extract_text_from_pdf_bytes_async(path=spool.path)
+                        if fallback_success:
+                            text = fallback_text
+                            extraction_success = True
+                            logger.info(f"Used PyPDF2 fallback extraction; extracted_chars={len(text) if text else 0}")
+                    except Exception:
+                        logger.exception('PDF fallback extraction failed')
 
-        except Exception:
-            logger.exception('Unexpected error during fallback extraction')
+            except Exception:
+                logger.exception('Unexpected error during fallback extraction')
 
-        if not fallback_success:
-            # Re-raise the original error as an HTTP 500 if no fallback available
-            raise HTTPException(status_code=500, detail=f'Text extraction failed: {str(e)}')
+            if not fallback_success:
+                # Re-raise the original error as an HTTP 500 if no fallback available
+                raise HTTPException(status_code=500, detail=f'Text extraction failed: {str(e)}')
 
-    # Get case and user info for organizing the upload
-    case_id = answers_obj.get('case_id') if isinstance(answers_obj, dict) else None
-    user_id = answers_obj.get('user_id') if isinstance(answers_obj, dict) else None
-    
-    # Generate unique filename
-    uid = uuid.uuid4().hex
-    file_ext = Path(file.filename).suffix or '.pdf'
-    safe_filename = f"{uid}{file_ext}"
-    
-    # Upload to Supabase Storage bucket 'eligibility-documents'
-    storage_url = None
-    try:
-        from datetime import datetime
-        from .supabase_client import storage_upload_file
-        
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        # Store in bucket organized by user_id
-        storage_path = f"{user_id}/{timestamp}_{safe_filename}" if user_id else f"anonymous/{timestamp}_{safe_filename}"
-        
-        upload_result = storage_upload_file(
-            bucket='eligibility-documents',
-            path=storage_path,
-            file_bytes=content,
-            content_type=file.content_type or 'application/octet-stream',
-            upsert=True
-        )
-        storage_url = upload_result.get('public_url')
-        logger.info(f"Uploaded eligibility document to Supabase Storage: {storage_url}")
-    except Exception as e:
-        logger.exception("Failed to upload to Supabase Storage")
-        raise HTTPException(status_code=500, detail=f'Failed to upload file: {str(e)}')
-    
-    # STEP 1: Check document relevance (STRICT validation) - DO THIS FIRST before uploading
-    from .eligibility_processor import check_document_relevance, analyze_questionnaire_with_guidelines, load_eligibility_guidelines
-    
-    try:
-        logger.info("="*80)
-        logger.info("STEP 1: DOCUMENT ANALYSIS - Get summary and check relevance")
-        logger.info("="*80)
-        logger.info(f"OCR Text Length: {len(text)} characters")
-        logger.info(f"OCR Text Preview (first 1000 chars):\n{text[:1000]}")
-        logger.info("-"*80)
-        
-        relevance_result = check_document_relevance(text, provider='gpt')
-        
-        logger.info("="*80)
-        logger.info("DOCUMENT ANALYSIS RESULT:")
-        logger.info(f"  Is Relevant: {relevance_result['is_relevant']}")
-        logger.info(f"  Relevance Score: {relevance_result['relevance_score']}/100")
-        logger.info(f"  Document Type: {relevance_result['document_type']}")
-        logger.info(f"  Reason: {relevance_result['relevance_reason']}")
-        logger.info(f"  Statement: {relevance_result['statement']}")
-        if relevance_result.get('document_summary'):
-            logger.info(f"  Summary: {relevance_result['document_summary']}")
-        logger.info("="*80)
-        
-        # Extract document summary and key points
-        document_summary = relevance_result.get('document_summary', '')
-        document_key_points = relevance_result.get('key_points', [])
-        
-        # Only pass document summary to questionnaire analysis if document is relevant/medical
-        document_context_for_analysis = ''
-        if relevance_result['is_relevant']:
-            document_context_for_analysis = document_summary
-            logger.info(f"✓ DOCUMENT IS RELEVANT: Will include summary in questionnaire analysis")
-        else:
-            logger.warning(f"⚠️ DOCUMENT NOT RELEVANT: Will analyze questionnaire without document context")
-            logger.warning(f"Document will be flagged on result screen: {relevance_result['relevance_reason']}")
-        
-    except Exception as e:
-        logger.exception("❌ Document relevance check failed with exception")
-        raise HTTPException(status_code=500, detail=f'Document validation failed: {str(e)}')
-    
-    # STEP 2: Load guidelines and analyze questionnaire
-    try:
-        logger.info("STEP 2: Loading eligibility guidelines")
-        guidelines_text = load_eligibility_guidelines()
-        if not guidelines_text:
-            logger.warning("Guidelines not available, using fallback")
-            guidelines_text = "Complete written documentation required. Objective medical evidence from specialists. Work-related injury must be documented."
+        # Get case and user info for organizing the upload
+        case_id = answers_obj.get('case_id') if isinstance(answers_obj, dict) else None
+        user_id = answers_obj.get('user_id') if isinstance(answers_obj, dict) else None
         
-        logger.info(f"STEP 2: Analyzing questionnaire with guidelines")
-        if document_context_for_analysis:
-            logger.info(f"  Including document context in analysis")
-        else:
-            logger.info(f"  Analyzing questionnaire only (no valid document context)")
-        model_res = analyze_questionnaire_with_guidelines(
-            answers=answers_obj,
-            guidelines_text=guidelines_text,
-            provider='gpt',
-            document_summary=document_context_for_analysis
-        )
-        logger.info(f"Questionnaire analysis: status={model_res.get('eligibility_status')}, score={model_res.get('eligibility_score')}")
+        # Generate unique filename
+        uid = uuid.uuid4().hex
+        file_ext = Path(file.filename).suffix or '.pdf'
+        safe_filename = f"{uid}{file_ext}"
         
-    except Exception as e:
-        logger.exception("Questionnaire analysis failed")
-        raise HTTPException(status_code=500, detail=f'Questionnaire analysis failed: {str(e)}')
-
-    # Now upload to Supabase Storage with document analysis metadata (after analysis is complete)
-    if case_id and storage_url is None:
+        # Upload to Supabase Storage bucket 'eligibility-documents'
+        storage_url = None
         try:
             from datetime import datetime
-            from .supabase_client import storage_upload_file, insert_case_document
+            from .supabase_client import storage_upload_stream
             
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            safe_filename = Path(file.filename).name.replace(' ', '_')
-            storage_path = f"cases/{case_id}/documents/{timestamp}_{safe_filename}"
+            # Store in bucket organized by user_id
+            storage_path = f"{user_id}/{timestamp}_{safe_filename}" if user_id else f"anonymous/{timestamp}_{safe_filename}"
             
-            upload_result = storage_upload_file(
-                bucket='case-documents',
+            upload_result = await asyncio.to_thread(
+                storage_upload_stream,
+                bucket='eligibility-documents',
                 path=storage_path,
-                file_bytes=content,
+                source_path=spool.path,
                 content_type=file.content_type or 'application/octet-stream',
-                upsert=True
+                upsert=True,
+                size=spool.size
             )
             storage_url = upload_result.get('public_url')
             logger.info(f"Uploaded eligibility document to Supabase Storage: {storage_url}")
+        except Exception as e:
+            logger.exception("Failed to upload to Supabase Storage")
+            raise HTTPException(status_code=500, detail=f'Failed to upload file: {str(e)}')
+        
+        # STEP 1: Check document relevance (STRICT validation) - DO THIS FIRST before uploading
+        from .eligibility_processor import check_document_relevance, analyze_questionnaire_with_guidelines, load_eligibility_guidelines
+        
+        try:
+            logger.info("="*80)
+            logger.info("STEP 1: DOCUMENT ANALYSIS - Get summary and check relevance")
+            logger.info("="*80)
+            logger.info(f"OCR Text Length: {len(text)} characters")
+            logger.info(f"OCR Text Preview (first 1000 chars):\n{text[:1000]}")
+            logger.info("-"*80)
             
-            # Insert document record with analysis metadata
-            insert_case_document(
-                case_id=case_id,
-                file_path=storage_path,
-                file_name=file.filename,
-                file_type=file.content_type,
-                file_size=filesize,
-                document_type='eligibility_document',
-                uploaded_by=user_id,
-                metadata={
-                    'source': 'eligibility_check',
-                    'document_summary': document_summary,
-                    'key_points': document_key_points,
-                    'is_relevant': relevance_result['is_relevant'],
-                    'relevance_score': relevance_result['relevance_score'],
-                    'document_type': relevance_result['document_type']
-                }
+            relevance_result = check_document_relevance(text, provider='gpt')
+            
+            logger.info("="*80)
+            logger.info("DOCUMENT ANALYSIS RESULT:")
+            logger.info(f"  Is Relevant: {relevance_result['is_relevant']}")
+            logger.info(f"  Relevance Score: {relevance_result['relevance_score']}/100")
+            logger.info(f"  Document Type: {relevance_result['document_type']}")
+            logger.info(f"  Reason: {relevance_result['relevance_reason']}")
+            logger.info(f"  Statement: {relevance_result['statement']}")
+            if relevance_result.get('document_summary'):
+                logger.info(f"  Summary: {relevance_result['document_summary']}")
+            logger.info("="*80)
+            
+            # Extract document summary and key points
+            document_summary = relevance_result.get('document_summary', '')
+            document_key_points = relevance_result.get('key_points', [])
+            
+            # Only pass document summary to questionnaire analysis if document is relevant/medical
+            document_context_for_analysis = ''
+            if relevance_result['is_relevant']:
+                document_context_for_analysis = document_summary
+                logger.info(f"✓ DOCUMENT IS RELEVANT: Will include summary in questionnaire analysis")
+            else:
+                logger.warning(f"⚠️ DOCUMENT NOT RELEVANT: Will analyze questionnaire without document context")
+                logger.warning(f"Document will be flagged on result screen: {relevance_result['relevance_reason']}")
+            
+        except Exception as e:
+            logger.exception("❌ Document relevance check failed with exception")
+            raise HTTPException(status_code=500, detail=f'Document validation failed: {str(e)}')
+        
+        # STEP 2: Load guidelines and analyze questionnaire
+        try:
+            logger.info("STEP 2: Loading eligibility guidelines")
+            guidelines_text = load_eligibility_guidelines()
+            if not guidelines_text:
+                logger.warning("Guidelines not available, using fallback")
+                guidelines_text = "Complete written documentation required. Objective medical evidence from specialists. Work-related injury must be documented."
+            
+            logger.info(f"STEP 2: Analyzing questionnaire with guidelines")
+            if document_context_for_analysis:
+                logger.info(f"  Including document context in analysis")
+            else:
+                logger.info(f"  Analyzing questionnaire only (no valid document context)")
+            model_res = analyze_questionnaire_with_guidelines(
+                answers=answers_obj,
+                guidelines_text=guidelines_text,
+                provider='gpt',
+                document_summary=document_context_for_analysis
             )
-            logger.info(f"Stored eligibility document record with analysis metadata")
-        except Exception:
-            logger.exception("Failed to upload to Supabase Storage (non-fatal)")
-            # Continue even if storage upload fails
+            logger.info(f"Questionnaire analysis: status={model_res.get('eligibility_status')}, score={model_res.get('eligibility_score')}")
+            
+        except Exception as e:
+            logger.exception("Questionnaire analysis failed")
+            raise HTTPException(status_code=500, detail=f'Questionnaire analysis failed: {str(e)}')
+
+        # Now upload to Supabase Storage with document analysis metadata (after analysis is complete)
+        if case_id and storage_url is None:
+            try:
+                from datetime import datetime
+                from .supabase_client import storage_upload_stream, insert_case_document
+                
+                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+                safe_filename = Path(file.filename).name.replace(' ', '_')
+                storage_path = f"cases/{case_id}/documents/{timestamp}_{safe_filename}"
+                
+                upload_result = await asyncio.to_thread(
+                    storage_upload_stream,
+                    bucket='case-documents',
+                    path=storage_path,
+                    source_path=spool.path,
+                    content_type=file.content_type or 'application/octet-stream',
+                    upsert=True,
+                    size=spool.size
+                )
+                storage_url = upload_result.get('public_url')
+                logger.info(f"Uploaded eligibility document to Supabase Storage: {storage_url}")
+                
+                # Insert document record with analysis metadata
+                insert_case_document(
+                    case_id=case_id,
+                    file_path=storage_path,
+                    file_name=file.filename,
+                    file_type=file.content_type,
+                    file_size=filesize,
+                    document_type='eligibility_document',
+                    uploaded_by=user_id,
+                    metadata={
+                        'source': 'eligibility_check',
+                        'document_summary': document_summary,
+                        'key_points': document_key_points,
+                        'is_relevant': relevance_result['is_relevant'],
+                        'relevance_score': relevance_result['relevance_score'],
+                        'document_type': relevance_result['document_type']
+                    }
+                )
+                logger.info(f"Stored eligibility document record with analysis metadata")
+            except Exception:
+                logger.exception("Failed to upload to Supabase Storage (non-fatal)")
+                # Continue even if storage upload fails
+    finally:
+        # Done with the uploaded file
+        spool.cleanup()
 
     # Shape response with new structure including document analysis
     result = {
@@ -3485,7 +3349,7 @@ async def get_document_summary_for_vapi(
     logger.warning(f"[VAPI_INPUT] user_id={user_id}, force_refresh={force_refresh}, auth_email={current_user.get('email')}")
     
     try:
-        from .supabase_client import list_cases_for_user, get_user_eligibility
+        from .supabase_client import list_cases_for_user, get_user_eligibility, storage_fetch_file, storage_object_from_url
         from .eligibility_processor import check_document_relevance
         import httpx
         
@@ -3583,30 +3447,31 @@ async def get_document_summary_for_vapi(
             
             # No cached summary - need to download, OCR, and analyze
             try:
-                # Download file from Supabase Storage
-                file_content = None
-                
-                if uploaded_file_url.startswith('http'):
-                    # It's a Supabase Storage URL - download it
-                    logger.info(f"[VAPI_DEBUG] Downloading from Supabase Storage: {uploaded_file_url}")
-                    async with httpx.AsyncClient(timeout=30.0) as client:
-                        response = await client.get(uploaded_file_url)
-                        response.raise_for_status()
-                        file_content = response.content
-                        logger.info(f"[VAPI_DEBUG] Downloaded {len(file_content)} bytes")
-                else:
+                if not uploaded_file_url.startswith('http'):
                     logger.warning(f"[VAPI_DEBUG] Skipping non-HTTP file path: {uploaded_file_url}")
                     continue
                 
-                if not file_content:
-                    continue
-                
                 # Extract filename for logging
                 filename = uploaded_file_url.split('/')[-1]
                 
-                # Run OCR to extract text
-                logger.info(f"[VAPI_DEBUG] Running OCR on {filename}")
-                text, extraction_success = extract_text_from_document(file_content, filename)
+                storage_object = storage_object_from_url(uploaded_file_url)
+                if storage_object:
+                    # Supabase Storage object - read it through the local storage cache
+                    logger.info(f"[VAPI_DEBUG] Fetching from Supabase Storage: {uploaded_file_url}")
+                    local_path = await asyncio.to_thread(storage_fetch_file, *storage_object)
+                    logger.info(f"[VAPI_DEBUG] Running OCR on {filename}")
+                    text, extraction_success = await extract_text_from_file_async(local_path, filename)
+                else:
+                    logger.info(f"[VAPI_DEBUG] Downloading external file: {uploaded_file_url}")
+                    async with httpx.AsyncClient(timeout=30.0) as client:
+                        response = await client.get(uploaded_file_url)
+                        response.raise_for_status()
+                        file_content = response.content
+                        logger.info(f"[VAPI_DEBUG] Downloaded {len(file_content)} bytes")
+                    if not file_content:
+                        continue
+                    logger.info(f"[VAPI_DEBUG] Running OCR on {filename}")
+                    text, extraction_success = await extract_text_from_document_async(file_content, filename)
                 
                 if not extraction_success or not text:
                     logger.warning(f"[VAPI_DEBUG] OCR failed for {filename}")
@@ -3874,46 +3739,13 @@ async def get_vapi_call_details(
             try:
                 analysis_result = json.loads(existing_call_summary) if isinstance(existing_call_summary, str) else existing_call_summary
                 logger.info(f"[VAPI] 📋 Previous analysis details:")
-                logger.info(f"[VAPI]   - Risk Assessment: {analysis_result.get('risk_assessment', 'N/A')}")
-                logger.info(f"[VAPI]   - Case Summary: {analysis_result.get('case_summary', 'N/A')[:100]}...")
-            except Exception as e:
-                logger.warning(f"[VAPI] Could not parse existing call_summary: {e}")
-        
-        # Always analyze (removed early return for existing analysis)
-        # No existing analysis, check for job or create one
-        job_queue = get_job_queue()
-        
-        # Look for existing job for this call
-        existing_job = None
-        for job in job_queue.jobs.values():
-            if (job.metadata.get('call_id') == call_id and 
-                job.metadata.get('user_id') == user_id and
-                job.job_type == 'vapi_call_analysis'):
-                existing_job = job
-                break
-        
-        if existing_job:
-            # Job exists, check status
-            if existing_job.status == JobStatus.COMPLETED:
-                # Job completed, return result
-                logger.info(f"[VAPI] Job completed, returning analysis")
-                return JSONResponse({
-                    'status': 'ok',
-                    'call': call_dict,
-                    'analysis': existing_job.result.get('analysis', {})
-                })
-            else:
-                # Job still running, return job info
-                logger.info(f"[VAPI] Analysis job {existing_job.job_id} still {existing_job.status.value}")
-                return JSONResponse({
-                    'status': 'analyzing',
-                    'job_id': existing_job.job_id,
-                    'job_status': existing_job.status.value,
-                    'progress': existing_job.progress,
-                    'message': f'Call analysis in progress. Poll /jobs/{existing_job.job_id} for status.'
-                })
+                logger.info(f"[VAPI]   - Risk Assessment: {analysis_result.get('risk_assessment', 'N/A')}")
+                logger.info(f"[VAPI]   - Case Summary: {analysis_result.get('case_summary', 'N/A')[:100]}...")
+            except Exception as e:
+                logger.warning(f"[VAPI] Could not parse existing call_summary: {e}")
         
-        # No job exists, create one
+        # Always analyze (removed early return for existing analysis)
+        job_queue = get_job_queue()
         transcript = call_dict.get('transcript', '')
         messages = call_dict.get('messages', [])
         
@@ -3932,38 +3764,56 @@ async def get_vapi_call_details(
                 }
             })
         
-        # Create analysis job
-        job_id = job_queue.create_job(
+        # Create analysis job; repeated polls for the same call attach to the job already
+        # running, or reuse its result for as long as the job is kept, on any worker
+        job_id = await job_queue.create_job_once(
             job_type='vapi_call_analysis',
             metadata={
                 'call_id': call_id,
                 'case_id': case_id,
                 'user_id': user_id,
                 'endpoint': 'vapi-call-details'
-            }
+            },
+            idempotency_key=idempotency_key('vapi_call_analysis', case_id, call_id, user_id, transcript, messages),
+            reuse_window=JOB_MAX_AGE_HOURS * 3600
         )
+        job = await job_queue.fetch_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=503, detail='Analysis job state unavailable, retry shortly')
+        if job.status == JobStatus.COMPLETED:
+            # Job completed, return result
+            logger.info(f"[VAPI] Job {job_id} completed, returning analysis")
+            return JSONResponse({
+                'status': 'ok',
+                'call': call_dict,
+                'analysis': (job.result or {}).get('analysis', {})
+            })
+        if job.status == JobStatus.RUNNING:
+            # Job still running, return job info
+            logger.info(f"[VAPI] Analysis job {job_id} still {job.status.value}")
+            return JSONResponse({
+                'status': 'analyzing',
+                'job_id': job_id,
+                'job_status': job.status.value,
+                'progress': job.progress,
+                'message': f'Call analysis in progress. Poll /jobs/{job_id} for status.'
+            })
         
-        logger.info(f"[VAPI] 📝 Created analysis job {job_id} for call {call_id}")
-        logger.info(f"[VAPI] 🚀 Launching background task for job execution...")
+        logger.info(f"[VAPI] 🚀 Queueing analysis job {job_id} for call {call_id}...")
         
-        # Execute job in background
-        task = asyncio.create_task(
-            job_queue.execute_job(
-                job_id,
-                _execute_vapi_call_analysis,
-                call_id,
-                case_id,
-                user_id,
-                call_dict,
-                transcript,
-                messages
-            )
+        # Queue job for background execution (a no-op when it is already queued)
+        await submit_job(
+            job_id,
+            _execute_vapi_call_analysis,
+            call_id,
+            case_id,
+            user_id,
+            call_dict,
+            transcript,
+            messages
         )
         
-        # Log if task creation succeeded
-        logger.info(f"[VAPI] ✅ Background task created successfully for job {job_id}")
-        
-        logger.info(f"[VAPI] Created analysis job {job_id} for call {call_id}")
+        logger.info(f"[VAPI] ✅ Job {job_id} queued for execution")
         logger.info(f"[VAPI] 🔙 RETURNING TO FRONTEND immediately with job_id: {job_id}")
         logger.info(f"[VAPI] 📢 Frontend should poll /jobs/{job_id} to check completion status")
         logger.info(f"[VAPI] ⚠️  Data will be saved to DB when background task completes")
@@ -3971,7 +3821,7 @@ async def get_vapi_call_details(
         return JSONResponse({
             'status': 'analyzing',
             'job_id': job_id,
-            'job_status': 'pending',
+            'job_status': job.status.value,
             'message': f'Call analysis job created. Poll /jobs/{job_id} for status.'
         })
         
@@ -4031,9 +3881,14 @@ async def _execute_vapi_call_analysis(
     logger.info(f"[VAPI] 🤖 Calling analyze_call_conversation_openai with call_details...")
     
     try:
-        analysis_result = await analyze_call_conversation_openai(transcript, messages, eligibility_records, call_dict)
+        analysis_result = await analyze_call_conversation_openai(
+            transcript, messages, eligibility_records, call_dict, raise_transient=True
+        )
         logger.info(f"[VAPI] ✅ Analysis complete. Documents requested: {len(analysis_result.get('documents_requested_list', []))}")
     except Exception as e:
+        if is_transient_error(e):
+            # Rate limit / upstream outage: the job queue retries the job instead of saving a failure summary
+            raise
         logger.exception(f"[VAPI] ❌ Analysis failed with error: {e}")
         # Create fallback analysis result
         analysis_result = {
@@ -4304,25 +4159,25 @@ async def re_analyze_call(case_id: str, current_user: dict = Depends(get_current
         
         # Create job
         job_queue = get_job_queue()
-        job_id = job_queue.create_job(
+        job_id = await job_queue.create_job_once(
             job_type='call_analysis',
             metadata={
                 'case_id': case_id,
                 'user_id': current_user['id'],
                 'endpoint': 're-analyze-call'
-            }
+            },
+            # Double clicks and retries attach to the analysis already running for this call
+            idempotency_key=idempotency_key('call_analysis', case_id, call_details)
         )
         
-        # Execute job in background
-        asyncio.create_task(
-            job_queue.execute_job(
-                job_id,
-                _execute_call_analysis,
-                case_id,
-                transcript,
-                messages,
-                call_details
-            )
+        # Queue job for background execution
+        await submit_job(
+            job_id,
+            _execute_call_analysis,
+            case_id,
+            transcript,
+            messages,
+            call_details
         )
         
         logger.info(f"[VAPI] Created job {job_id} for re-analyzing call {case_id}")
@@ -4349,7 +4204,7 @@ async def _execute_call_analysis(case_id: str, transcript: str, messages: list,
     logger.info(f"[VAPI] Starting call analysis for case {case_id}")
     
     # Run analysis
-    analysis_result = await analyze_call_conversation_openai(transcript, messages, None, call_details)
+    analysis_result = await analyze_call_conversation_openai(transcript, messages, None, call_details, raise_transient=True)
     logger.info(f"[VAPI] Analysis completed. Documents: {len(analysis_result.get('documents_requested_list', []))}")
     
     # Update call_details with new analysis
@@ -4566,24 +4421,24 @@ async def analyze_case_with_agent(case_id: str, current_user: dict = Depends(get
         
         # Create job
         job_queue = get_job_queue()
-        job_id = job_queue.create_job(
+        job_id = await job_queue.create_job_once(
             job_type='document_analysis_agent',
             metadata={
                 'case_id': case_id,
                 'user_id': current_user['id'],
                 'document_count': len(documents_with_summaries),
                 'endpoint': 'analyze-with-agent'
-            }
+            },
+            # Double clicks and retries attach to the analysis already running for these documents
+            idempotency_key=idempotency_key('document_analysis_agent', case_id, documents_with_summaries)
         )
         
-        # Execute job in background
-        asyncio.create_task(
-            job_queue.execute_job(
-                job_id,
-                _execute_agent_analysis,
-                case_id,
-                documents_with_summaries
-            )
+        # Queue job for background execution
+        await submit_job(
+            job_id,
+            _execute_agent_analysis,
+            case_id,
+            documents_with_summaries
         )
         
         logger.info(f"✅ Created job {job_id} for agent analysis of case {case_id}")
@@ -4745,7 +4600,7 @@ async def update_documents_requested(case_id: str, payload: Dict[str, List[dict]
         raise HTTPException(status_code=401, detail='Authentication required')
     
     try:
-        from .supabase_client import get_case, update_case
+        from .supabase_client import get_case
         
         recommended_documents = payload.get('recommended_documents', [])
         logger.info(f"📝 Updating documents_requested_list for case {case_id}")
@@ -4759,48 +4614,32 @@ async def update_documents_requested(case_id: str, payload: Dict[str, List[dict]
         if current_user['role'] != 'admin' and case.get('user_id') != current_user['id']:
             raise HTTPException(status_code=403, detail='Access denied')
         
-        # Get existing call_summary
-        call_summary = case.get('call_summary', {})
-        if isinstance(call_summary, str):
-            try:
-                call_summary = json.loads(call_summary)
-            except:
-                call_summary = {}
-        
-        existing_docs = call_summary.get('documents_requested_list', [])
-        
         # Convert recommended documents to documents_requested_list format
-        new_docs = []
-        for doc in recommended_documents:
-            # Check if document already exists in list (by name)
-            existing_doc = next((d for d in existing_docs if d.get('name') == doc.get('document_name')), None)
-            
-            if not existing_doc:
-                # Add new document
-                new_docs.append({
-                    'name': doc.get('document_name'),
-                    'reason': doc.get('reason'),
-                    'source': doc.get('source'),
-                    'required': doc.get('priority') == 'required',
-                    'uploaded': False
-                })
-        
-        # Merge: keep existing docs and add new ones
-        updated_docs_list = existing_docs + new_docs
-        
-        # Update call_summary
-        call_summary['documents_requested_list'] = updated_docs_list
+        new_docs = [
+            {
+                'name': doc.get('document_name'),
+                'reason': doc.get('reason'),
+                'source': doc.get('source'),
+                'required': doc.get('priority') == 'required',
+                'uploaded': False
+            }
+            for doc in recommended_documents
+        ]
         
-        # Save to database - serialize as JSON string
-        update_case(case_id, {
-            'call_summary': json.dumps(call_summary, ensure_ascii=False)
-        })
+        # Append atomically; documents already in the list (by name) are skipped
+        existing_docs = parse_json_field(case.get('call_summary')).get('documents_requested_list') or []
+        updated_docs_list = existing_docs
+        if new_docs:
+            updated_docs_list = await supabase_async.case_json_append(
+                case_id, 'call_summary', ['documents_requested_list'], new_docs, unique_key='name'
+            )
+        documents_added = max(0, len(updated_docs_list) - len(existing_docs))
         
-        logger.info(f"✅ Updated documents_requested_list - added {len(new_docs)} new documents, total now {len(updated_docs_list)}")
+        logger.info(f"✅ Updated documents_requested_list - added {documents_added} new documents, total now {len(updated_docs_list)}")
         
         return {
             'status': 'success',
-            'documents_added': len(new_docs),
+            'documents_added': documents_added,
             'total_documents': len(updated_docs_list),
             'updated_list': updated_docs_list
         }
@@ -5199,8 +5038,7 @@ async def process_case_documents(case_id: str, current_user: dict = Depends(get_
         raise HTTPException(status_code=401, detail='Authentication required')
     
     try:
-        from .supabase_client import get_case, update_case, _supabase_admin, storage_download_file
-        from .ocr import extract_text_from_document
+        from .supabase_client import get_case, update_case, _supabase_admin, storage_fetch_file
         from .gemini_client import call_gemini
         
         # Get case and verify access
@@ -5236,14 +5074,17 @@ async def process_case_documents(case_id: str, current_user: dict = Depends(get_
                 if not file_path:
                     continue
                 
-                # Download file from storage
-                file_bytes = storage_download_file('case-documents', file_path)
-                if not file_bytes:
+                # Local copy from the storage cache (downloaded only if missing or changed)
+                try:
+                    local_path = await asyncio.to_thread(
+                        storage_fetch_file, doc.get('storage_bucket') or 'case-documents', file_path
+                    )
+                except FileNotFoundError:
                     logger.warning(f"Could not download document: {file_path}")
                     continue
                 
                 # Extract text with OCR
-                text = extract_text_from_document(file_bytes, doc.get('file_name', ''))
+                text, _ = await extract_text_from_file_async(local_path, doc.get('file_name', ''))
                 if text:
                     document_texts.append({
                         'filename': doc.get('file_name'),
@@ -5701,15 +5542,16 @@ async def eligibility_submit(
                 detail=f'Unsupported file type. Only PDF and image files (JPG, PNG, etc.) are allowed.'
             )
         
+        spool = None
         try:
-            # Read file content
-            content = await file.read()
-            filesize = len(content)
-            logger.info(f"Read file: {filesize} bytes")
+            # Spool file content to disk
+            spool = await spool_upload(file)
+            filesize = spool.size
+            logger.info(f"Spooled file: {filesize} bytes")
             
             # Extract text using OCR
             try:
-                ocr_text, extraction_success = extract_text_from_document(content, file.filename)
+                ocr_text, extraction_success = await extract_text_from_file_async(spool.path, file.filename, sha256=spool.sha256)
                 if not extraction_success or not ocr_text:
                     logger.warning("OCR extraction returned empty result")
                     raise Exception("No text could be extracted from the document")
@@ -5775,13 +5617,16 @@ async def eligibility_submit(
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
             storage_path = f"{user_id}/{timestamp}_{safe_filename}" if user_id else f"anonymous/{timestamp}_{safe_filename}"
             
+            from .supabase_client import storage_upload_stream
             try:
-                upload_result = storage_upload_file(
+                upload_result = await asyncio.to_thread(
+                    storage_upload_stream,
                     bucket='eligibility-documents',
                     path=storage_path,
-                    file_bytes=content,
+                    source_path=spool.path,
                     content_type=file.content_type or 'application/octet-stream',
-                    upsert=True
+                    upsert=True,
+                    size=spool.size
                 )
                 storage_url = upload_result.get('public_url')
                 logger.info(f"Uploaded eligibility document to Supabase Storage: {storage_url}")
@@ -5794,12 +5639,14 @@ async def eligibility_submit(
                 try:
                     case_storage_path = f"cases/{case_id}/eligibility/{timestamp}_{safe_filename}"
                     
-                    case_upload_result = storage_upload_file(
+                    case_upload_result = await asyncio.to_thread(
+                        storage_upload_stream,
                         bucket='case-documents',
                         path=case_storage_path,
-                        file_bytes=content,
+                        source_path=spool.path,
                         content_type=file.content_type or 'application/octet-stream',
-                        upsert=True
+                        upsert=True,
+                        size=spool.size
                     )
                     logger.info(f"Also uploaded to case-documents bucket")
                     
@@ -5841,6 +5688,9 @@ async def eligibility_submit(
         except Exception as e:
             logger.exception("File processing failed")
             raise HTTPException(status_code=500, detail=f'File processing failed: {str(e)}')
+        finally:
+            if spool:
+                spool.cleanup()
     else:
         logger.info("No file uploaded - proceeding with questionnaire only")
         document_analysis = {
@@ -5980,32 +5830,7 @@ async def admin_request_document(
     Returns the updated documents_requested_list array.
     """
     try:
-        from .supabase_client import get_case, update_case
-        
-        # Verify case exists
-        case_list = get_case(case_id)
-        if not case_list:
-            raise HTTPException(status_code=404, detail='case_not_found')
-        
-        case = case_list[0]
-        
-        # Get current call_summary
-        call_summary = case.get('call_summary', {})
-        
-        # Parse call_summary if it's a string (JSON)
-        if isinstance(call_summary, str):
-            try:
-                call_summary = json.loads(call_summary)
-            except json.JSONDecodeError:
-                call_summary = {}
-        
-        # Ensure call_summary is a dict
-        if not isinstance(call_summary, dict):
-            call_summary = {}
-        
-        # Ensure documents_requested_list exists
-        if 'documents_requested_list' not in call_summary:
-            call_summary['documents_requested_list'] = []
+        import httpx
         
         # Create document request object
         document_request = {
@@ -6019,18 +5844,22 @@ async def admin_request_document(
             'uploaded': False
         }
         
-        # Add to documents_requested_list
-        call_summary['documents_requested_list'].append(document_request)
-        
-        # Update case with new call_summary
-        update_case(case_id, {'call_summary': call_summary})
+        # Append to documents_requested_list in one atomic update (404s if the case is missing)
+        try:
+            documents = await supabase_async.case_json_append(
+                case_id, 'call_summary', ['documents_requested_list'], [document_request]
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response is not None and e.response.status_code == 404:
+                raise HTTPException(status_code=404, detail='case_not_found')
+            raise
         
         logger.info(f"Added document request to case {case_id}: {document_request['name']}")
         
         return JSONResponse({
             'status': 'ok',
             'document': document_request,
-            'documents': call_summary.get('documents_requested_list', [])
+            'documents': documents
         })
         
     except HTTPException:
@@ -6471,11 +6300,51 @@ async def health():
     return {'status': 'ok'}
 
 
+@app.get('/admin/supabase/metrics')
+async def supabase_metrics(user = Depends(require_admin)):
+    """Retry / circuit breaker counters for Supabase calls, per endpoint, plus local storage and OCR cache usage."""
+    from .storage_cache import get_storage_cache
+    from .ocr_cache import get_ocr_cache
+    ocr_cache = get_ocr_cache()
+    return JSONResponse({
+        'status': 'ok',
+        'endpoints': supabase_async.get_resilience_metrics(),
+        'storage_cache': await asyncio.to_thread(lambda: get_storage_cache().stats()),
+        'ocr_cache': await asyncio.to_thread(ocr_cache.stats) if ocr_cache else None
+    })
+
+
+@app.get('/admin/jobs/scheduler')
+async def job_scheduler_stats(user = Depends(require_admin)):
+    """Running and queued jobs per job type against their concurrency limits (this worker only)."""
+    return JSONResponse({'status': 'ok', **get_job_queue().scheduler_stats()})
+
+
+@app.get('/admin/jobs/dead-letter')
+async def list_dead_letter_jobs(user = Depends(require_admin)):
+    """Jobs that failed for good (retries exhausted, permanent error or timeout) on any worker."""
+    dead = await get_job_queue().list_dead_letters()
+    return JSONResponse({'status': 'ok', 'jobs': dead, 'count': len(dead)})
+
+
+@app.post('/admin/jobs/dead-letter/{job_id}/retry')
+async def retry_dead_letter_job(job_id: str, user = Depends(require_admin)):
+    """Run a dead-lettered job again with its original inputs, as a new job."""
+    new_job_id = await get_job_queue().retry_dead_letter(job_id)
+    if not new_job_id:
+        raise HTTPException(status_code=404, detail='Job was not dead-lettered by this worker, so it cannot be resubmitted here')
+    return JSONResponse({'status': 'accepted', 'job_id': new_job_id, 'poll_url': f'/jobs/{new_job_id}'})
+
+
 @app.get('/jobs/{job_id}')
-async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+async def get_job_status(job_id: str, include_text: bool = False, current_user: dict = Depends(get_current_user)):
     """
     Poll for job status and results.
     
+    Jobs that extract documents page by page report `partial` while running
+    (page_count, pages_done, ready_pages); with include_text=true it also
+    carries the text of the ready pages, in page order.
+    
     Returns:
         - job_id: Job identifier
         - status: 'pending', 'running', 'completed', or 'failed'
@@ -6489,7 +6358,7 @@ async def get_job_status(job_id: str, current_user: dict = Depends(get_current_u
         raise HTTPException(status_code=401, detail='Authentication required')
     
     job_queue = get_job_queue()
-    job = job_queue.get_job(job_id)
+    job = await job_queue.fetch_job(job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail='Job not found')
@@ -6499,7 +6368,66 @@ async def get_job_status(job_id: str, current_user: dict = Depends(get_current_u
     if current_user['role'] != 'admin' and job_user_id and job_user_id != current_user['id']:
         raise HTTPException(status_code=403, detail='Access denied')
     
-    return JSONResponse(job.to_dict())
+    return JSONResponse(job.to_dict(include_partial_text=include_text))
+
+
+@app.get('/jobs/{job_id}/events')
+async def stream_job_events(job_id: str, include_text: bool = False, token: Optional[str] = None,
+                            current_user: dict = Depends(get_current_user)):
+    """
+    Server-Sent Events stream of a job's progress, instead of polling /jobs/{job_id}.
+    
+    The first `job` event carries the full job (same shape as /jobs/{job_id}); later
+    events carry only the changed fields (status, progress, progress_message,
+    partial, result, error) plus job_id. The stream ends after the job completes or
+    fails. The user is authenticated once per stream; browsers' EventSource cannot
+    send headers, so the access token may be passed as ?token=.
+    """
+    from sse_starlette.sse import EventSourceResponse
+    
+    if not current_user and token:
+        current_user = await get_current_user(f'Bearer {token}')
+    if not current_user:
+        raise HTTPException(status_code=401, detail='Authentication required')
+    
+    job_queue = get_job_queue()
+    job = await job_queue.fetch_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Job not found')
+    
+    job_user_id = job.metadata.get('user_id')
+    if current_user['role'] != 'admin' and job_user_id and job_user_id != current_user['id']:
+        raise HTTPException(status_code=403, detail='Access denied')
+    
+    async def events():
+        async for delta in job_queue.watch_job(job_id, include_partial_text=include_text):
+            yield {'event': 'job', 'data': json.dumps(delta, ensure_ascii=False, default=str)}
+    
+    return EventSourceResponse(events(), ping=15)
+
+
+@app.post('/jobs/{job_id}/cancel')
+async def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel a pending or running job. The job ends as failed with error 'Cancelled'."""
+    if not current_user:
+        raise HTTPException(status_code=401, detail='Authentication required')
+    
+    job_queue = get_job_queue()
+    job = await job_queue.fetch_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Job not found')
+    
+    job_user_id = job.metadata.get('user_id')
+    if current_user['role'] != 'admin' and job_user_id and job_user_id != current_user['id']:
+        raise HTTPException(status_code=403, detail='Access denied')
+    
+    if job.status not in (JobStatus.PENDING, JobStatus.RUNNING):
+        raise HTTPException(status_code=409, detail=f'Job already {job.status.value}')
+    if not await job_queue.cancel_job(job_id):
+        # Jobs run in the worker that created them
+        raise HTTPException(status_code=409, detail=f'Job runs on another worker ({job.owner}); retry the request')
+    
+    return JSONResponse({'status': 'ok', 'job_id': job_id, 'message': 'Job cancelled'})
 
 
 @app.get('/jobs')
@@ -6513,14 +6441,9 @@ async def list_jobs(current_user: dict = Depends(get_current_user)):
     
     job_queue = get_job_queue()
     
-    # Filter jobs based on user permissions
-    user_jobs = []
-    for job in job_queue.jobs.values():
-        job_user_id = job.metadata.get('user_id')
-        
-        # Include job if user is admin or job belongs to user
-        if current_user['role'] == 'admin' or (job_user_id and job_user_id == current_user['id']):
-            user_jobs.append(job.to_dict())
+    # Filter jobs based on user permissions (admins see every job)
+    user_filter = None if current_user['role'] == 'admin' else current_user['id']
+    user_jobs = [job.to_dict() for job in await job_queue.list_jobs(user_id=user_filter)]
     
     return JSONResponse({
         'jobs': user_jobs,
@@ -7230,6 +7153,7 @@ async def user_logout(token: Dict[str, Any] = Body(...), response: Response = No
     if not access_token:
         raise HTTPException(status_code=400, detail='missing_access_token')
     try:
+        jwt_auth.revoke_token(access_token)
         logout_token(access_token)
         # clear cookies if present
         if response is not None:
@@ -7398,6 +7322,7 @@ async def patch_user_profile(payload: Dict[str, Any] = Body(...), request: Reque
             # Use admin_upsert_profile helper to upsert profile row by user_id
             from .supabase_client import admin_upsert_profile
             res = admin_upsert_profile(user_id=str(user_id), fields=payload)
+            jwt_auth.invalidate_profile(user_id)
             return JSONResponse({'status': 'ok', 'profile': res})
         except Exception as e:
             logger.exception('patch_user_profile failed')
@@ -7502,21 +7427,20 @@ async def upload_id_card(
     if not is_image(file.filename):
         raise HTTPException(status_code=400, detail='invalid_file_type_only_images_allowed')
     
+    spool = None
     try:
-        # Read file content
-        content = await file.read()
-        filesize = len(content)
-        
-        # Validate file size (max 10MB)
+        # Spool file content to disk, rejecting it once it passes the size limit
         MAX_SIZE = 10 * 1024 * 1024  # 10MB
-        if filesize > MAX_SIZE:
+        try:
+            spool = await spool_upload(file, max_bytes=MAX_SIZE)
+        except UploadTooLarge:
             raise HTTPException(status_code=400, detail='file_too_large_max_10mb')
+        filesize = spool.size
         
         logger.info(f"📸 Processing ID card upload for user {user_id}, type: {id_type}, size: {filesize} bytes")
         
         # Step 1: Extract text using Google Vision OCR
-        from .ocr import extract_text_from_document
-        ocr_text, ocr_success = extract_text_from_document(content, file.filename)
+        ocr_text, ocr_success = await extract_text_from_file_async(spool.path, file.filename, sha256=spool.sha256)
         
         logger.info(f"🔍 Google Vision OCR Response:")
         logger.info(f"   - Success: {ocr_success}")
@@ -7547,7 +7471,7 @@ async def upload_id_card(
         logger.info(f"✅ ID card validation successful for user {user_id}")
         
         # Step 3: Upload image to Supabase Storage 'id_cards' bucket
-        from .supabase_client import storage_upload_file
+        from .supabase_client import storage_upload_stream
         from datetime import datetime
         
         ext = Path(file.filename).suffix or '.jpg'
@@ -7555,12 +7479,14 @@ async def upload_id_card(
         object_path = f"{user_id}/{timestamp}_{id_type}{ext}"
         
         try:
-            storage_result = storage_upload_file(
+            storage_result = await asyncio.to_thread(
+                storage_upload_stream,
                 bucket='id_cards',
                 path=object_path,
-                file_bytes=content,
+                source_path=spool.path,
                 content_type=file.content_type or 'image/jpeg',
-                upsert=True
+                upsert=True,
+                size=spool.size
             )
             image_url = storage_result.get('public_url') if isinstance(storage_result, dict) else None
             logger.info(f"✅ ID card image uploaded to storage: {image_url}")
@@ -7598,6 +7524,9 @@ async def upload_id_card(
             'status': 'error',
             'error_message': 'An unexpected error occurred. Please try again.'
         }, status_code=500)
+    finally:
+        if spool:
+            spool.cleanup()
 
 
 @app.post('/user/profile/photo')
@@ -7994,10 +7923,10 @@ async def upload_letter_document(case_id: str, payload: Dict[str, Any] = Body(..
         text = ''
         try:
             try:
-                text, _ = extract_text_from_document(file_bytes, file_name)
+                text, _ = await extract_text_from_document_async(file_bytes, file_name)
             except Exception:
                 logger.exception('[LETTER_UPLOAD] Vision OCR failed; attempting PDF text fallback')
-                text, success_pdf = extract_text_from_pdf_bytes(file_bytes)
+                text, success_pdf = await extract_text_from_pdf_bytes_async(file_bytes)
                 if not success_pdf:
                     text = text or ''
             analysis = _summarize_letter_document(text, file_name=file_name, document_type='letter')
@@ -8076,10 +8005,9 @@ async def upload_letter_document(case_id: str, payload: Dict[str, Any] = Body(..
                 logger.exception('[LETTER_UPLOAD] DB insert failed')
                 return skip_response('db_failed', _err_str, analysis)
 
-        # Attempt to update the letters registry so download_url points to Supabase
+        # Attempt to update the letters registry so download_url points to Supabase.
+        # Applied as one atomic patch so concurrent letter uploads don't drop each other's entries.
         try:
-            letters_state = (case_obj or {}).get('letters') or {}
-            dates = letters_state.get('dates') or {}
             date_key = str((letter_meta or {}).get('date') or (letter_meta or {}).get('letter_date') or 'unknown').strip() or 'unknown'
             idx = None
             try:
@@ -8087,19 +8015,17 @@ async def upload_letter_document(case_id: str, payload: Dict[str, Any] = Body(..
             except Exception:
                 idx = None
 
-            entry = dates.get(date_key) or {'items': [], 'seen_indices': []}
-            updated = False
+            now = datetime.utcnow().isoformat()
+            ops = []
             if idx is not None:
-                entry['seen_indices'] = sorted(set(entry.get('seen_indices') or []) | {idx})
-                for item in entry.get('items', []):
-                    if item.get('index') == idx:
-                        item['download_url'] = storage_url
-                        item['stored_path'] = storage_path
-                        item['analyzed'] = True
-                        updated = True
-                        break
-                if not updated:
-                    new_item = {
+                ops.append({'op': 'append', 'path': ['dates', date_key, 'seen_indices'], 'value': [idx], 'distinct': True})
+                ops.append({
+                    'op': 'update_element',
+                    'path': ['dates', date_key, 'items'],
+                    'match_key': 'index',
+                    'match_value': idx,
+                    'value': {'download_url': storage_url, 'stored_path': storage_path, 'analyzed': True},
+                    'insert': {
                         'index': idx,
                         'date': date_key,
                         'download_url': storage_url,
@@ -8108,13 +8034,13 @@ async def upload_letter_document(case_id: str, payload: Dict[str, Any] = Body(..
                         'title': letter_meta.get('title'),
                         'category': letter_meta.get('category'),
                         'row_text': letter_meta.get('row_text'),
-                        'captured_at': letter_meta.get('captured_at') or datetime.utcnow().isoformat()
+                        'captured_at': letter_meta.get('captured_at') or now
                     }
-                    entry.setdefault('items', []).append(new_item)
-            entry['last_updated_at'] = datetime.utcnow().isoformat()
-            dates[date_key] = entry
-            letters_state['dates'] = dates
-            update_case(case_id, {'letters': letters_state, 'updated_at': datetime.utcnow().isoformat()})
+                })
+            ops.append({'op': 'set', 'path': ['dates', date_key, 'last_updated_at'], 'value': now})
+            await supabase_async.patch_case_json(
+                case_id, 'letters', ops, return_path=['dates', date_key, 'last_updated_at'], touch=True
+            )
         except Exception:
             logger.exception('[LETTER_UPLOAD] Failed to attach storage URL to letters state')
 
@@ -8645,7 +8571,7 @@ async def get_case_endpoint(case_id: str, request: Request):
         user, token = _get_user_from_request_auth(auth)
         user_id = user.get('id')
         try:
-            rows = get_case(case_id)
+            rows = await supabase_async.get_case(case_id)
             if not rows:
                 raise HTTPException(status_code=404, detail='case_not_found')
             case = rows[0]
@@ -8654,7 +8580,9 @@ async def get_case_endpoint(case_id: str, request: Request):
             
             # Also fetch user_profile to get id_card, phone, and payments data
             try:
-                user_profile_rows = _supabase_admin.table('user_profile').select('id_card, phone, payments').eq('user_id', user_id).execute().data
+                user_profile_rows = await supabase_async.postgrest_get(
+                    'user_profile', {'select': 'id_card,phone,payments', 'user_id': f'eq.{user_id}'}
+                )
                 if user_profile_rows:
                     user_profile = user_profile_rows[0]
                     case['user_profile'] = user_profile
@@ -8769,7 +8697,7 @@ async def get_notifications(
         if not user_id:
             raise HTTPException(status_code=401, detail='user_not_authenticated')
         
-        notifications = list_notifications(
+        notifications = await supabase_async.list_notifications(
             user_id=user_id,
             limit=limit,
             unread_only=unread_only
@@ -8798,7 +8726,7 @@ async def update_notification(
         read = payload.get('read', True)
         
         # Update the notification
-        result = mark_notification_read(notification_id=notification_id, read=read)
+        result = await supabase_async.mark_notification_read(notification_id=notification_id, read=read)
         
         return {'success': True, 'notification': result}
     except HTTPException:
@@ -9225,7 +9153,6 @@ async def check_document_relevance_endpoint(
         }
     """
     from .eligibility_processor import check_document_relevance
-    from .ocr import extract_text_from_document
     
     logger.info(f"Received /eligibility/check-document-relevance; file={file.filename}, provider={provider}")
     
@@ -9248,15 +9175,14 @@ async def check_document_relevance_endpoint(
     
     # Extract text using OCR
     try:
-        text, extraction_success = extract_text_from_document(content, file.filename)
+        text, extraction_success = await extract_text_from_document_async(content, file.filename)
         logger.info(f"OCR extraction complete; success={extraction_success}; extracted_chars={len(text) if text else 0}")
         
         if not extraction_success or not text or len(text.strip()) < 20:
             # Try PDF fallback for digital PDFs
             if file_ext.lower() == '.pdf':
                 try:
-                    from .ocr import extract_text_from_pdf_bytes
-                    fallback_text, fallback_success = extract_text_from_pdf_bytes(content)
+                    fallback_text, fallback_success = await extract_text_from_pdf_bytes_async(content)
                     if fallback_success and fallback_text:
                         text = fallback_text
                         extraction_success = True
@@ -9473,165 +9399,16 @@ async def re_analyze_call(case_id: str, current_user: dict = Depends(get_current
         raise HTTPException(status_code=500, detail=f'Failed to re-analyze call: {str(e)}')
 
 
-@app.get('/admin/analytics')
-async def get_analytics(
-    time_range: str = "30days"
-):
-    """
-    Get analytics and metrics for admin dashboard.
-    time_range: 7days, 30days, 90days, year
-    """
-    try:
-        from datetime import datetime, timedelta
-        from .supabase_client import _postgrest_headers
-        
-        # Calculate date range
-        end_date = datetime.now()
-        if time_range == "7days":
-            start_date = end_date - timedelta(days=7)
-        elif time_range == "90days":
-            start_date = end_date - timedelta(days=90)
-        elif time_range == "year":
-            start_date = end_date - timedelta(days=365)
-        else:  # 30days default
-            start_date = end_date - timedelta(days=30)
-        
-        # Get cases in the time range
-        cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases?created_at.gte.{start_date.isoformat()}&created_at.lte.{end_date.isoformat()}&limit=500"
-        cases_resp = requests.get(cases_url, headers=_postgrest_headers(), timeout=15)
-        cases_resp.raise_for_status()
-        cases = cases_resp.json()
-        
-        total_cases = len(cases)
-        
-        # Count by status
-        status_counts = {}
-        for case in cases:
-            status = case.get('status', 'Unknown')
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        # Fetch user profiles for eligibility data
-        profiles_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile?limit=500"
-        profiles_resp = requests.get(profiles_url, headers=_postgrest_headers(), timeout=15)
-        profiles_resp.raise_for_status()
-        profiles = profiles_resp.json()
-        
-        # Calculate metrics
-        avg_ai_score = 0
-        if profiles:
-            total_score = 0
-            count = 0
-            for profile in profiles:
-                try:
-                    eligibility_raw = profile.get('eligibility_raw', {})
-                    if isinstance(eligibility_raw, str):
-                        eligibility_raw = json.loads(eligibility_raw)
-                    score = eligibility_raw.get('eligibility_score', 0)
-                    if score:
-                        total_score += score
-                        count += 1
-                except:
-                    pass
-            avg_ai_score = int(total_score / count) if count > 0 else 0
-        
-        # Calculate claim amounts and extract disability types
-        total_claim_amount = 0
-        disability_type_counts = {}
-        
-        for case in cases:
-            try:
-                call_summary = case.get('call_summary', {})
-                if isinstance(call_summary, str):
-                    call_summary = json.loads(call_summary)
-                
-                # Extract claim amount
-                amount = call_summary.get('estimated_claim_amount', 0)
-                if amount:
-                    total_claim_amount += amount
-                
-                # Extract disability types from products field
-                products = call_summary.get('products', [])
-                if isinstance(products, str):
-                    products = json.loads(products)
-                
-                if products:
-                    for product in products:
-                        disability_type_counts[product] = disability_type_counts.get(product, 0) + 1
-                else:
-                    # Default to 'General Disability' if no products specified
-                    disability_type_counts['General Disability'] = disability_type_counts.get('General Disability', 0) + 1
-            except Exception as parse_err:
-                logger.warning(f'Failed to parse call_summary for case: {parse_err}')
-                disability_type_counts['General Disability'] = disability_type_counts.get('General Disability', 0) + 1
-        
-        # Stage distribution
-        stage_distribution = {}
-        for status, count in status_counts.items():
-            percentage = int((count / total_cases) * 100) if total_cases > 0 else 0
-            stage_distribution[status] = {
-                'count': count,
-                'percentage': percentage
-            }
-        
-        # Calculate previous period for comparison
-        if time_range == "7days":
-            prev_start = start_date - timedelta(days=7)
-        elif time_range == "90days":
-            prev_start = start_date - timedelta(days=90)
-        elif time_range == "year":
-            prev_start = start_date - timedelta(days=365)
-        else:
-            prev_start = start_date - timedelta(days=30)
-        
-        prev_cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases?created_at.gte.{prev_start.isoformat()}&created_at.lt.{start_date.isoformat()}&limit=500"
-        prev_cases_resp = requests.get(prev_cases_url, headers=_postgrest_headers(), timeout=15)
-        prev_cases = prev_cases_resp.json() if prev_cases_resp.ok else []
-        prev_total_cases = len(prev_cases)
-        
-        # Calculate conversion rate (cases that reached submission)
-        submitted_count = status_counts.get('Submitted', 0)
-        conversion_rate = int((submitted_count / total_cases) * 100) if total_cases > 0 else 0
-        
-        prev_submitted = sum(1 for c in prev_cases if c.get('status') == 'Submitted')
-        prev_conversion = int((prev_submitted / prev_total_cases) * 100) if prev_total_cases > 0 else 0
-        conversion_change = conversion_rate - prev_conversion
-        
-        # Calculate new cases change percentage
-        cases_change = int(((total_cases - prev_total_cases) / prev_total_cases) * 100) if prev_total_cases > 0 else 0
-        
-        # Average processing time (days)
-        total_days = 0
-        count = 0
-        for case in cases:
-            try:
-                created = datetime.fromisoformat(case.get('created_at', '').replace('Z', '+00:00'))
-                updated = datetime.fromisoformat(case.get('updated_at', '').replace('Z', '+00:00'))
-                days = (updated - created).days
-                if days >= 0:
-                    total_days += days
-                    count += 1
-            except:
-                pass
-        avg_processing_days = int(total_days / count) if count > 0 else 0
-        
-        return JSONResponse({
-            'status': 'ok',
-            'metrics': {
-                'total_cases': total_cases,
-                'cases_change': f"+{cases_change}%" if cases_change >= 0 else f"{cases_change}%",
-                'conversion_rate': conversion_rate,
-                'conversion_change': f"+{conversion_change}%" if conversion_change >= 0 else f"{conversion_change}%",
-                'avg_ai_score': avg_ai_score,
-                'avg_processing_days': avg_processing_days,
-                'total_claim_potential': total_claim_amount,
-            },
-            'stage_distribution': stage_distribution,
-            'claim_types': disability_type_counts
-        })
-        
-    except Exception as e:
-        logger.error(f'Failed to get analytics: {e}')
-        raise HTTPException(status_code=500, detail=f'Failed to get analytics: {str(e)}')
+ANALYTICS_RANGE_DAYS = {
+    '7days': 7,
+    '30days': 30,
+    '90days': 90,
+    'year': 365,
+}
+
+
+def _format_change(value: int) -> str:
+    return f"+{value}%" if value >= 0 else f"{value}%"
 
 
 @app.get('/admin/analytics')
@@ -9641,90 +9418,29 @@ async def get_analytics(
     """
     Get analytics and metrics for admin dashboard.
     time_range: 7days, 30days, 90days, year
+
+    Reads the daily case rollups (migration 018), so the cost depends on the
+    number of days in the range, not the number of cases. Periods are whole
+    UTC days ending today, compared against the preceding period of the same
+    length.
     """
     try:
-        from datetime import datetime, timedelta
-        from .supabase_client import _postgrest_headers
-        
-        # Calculate date range
-        end_date = datetime.now()
-        if time_range == "7days":
-            start_date = end_date - timedelta(days=7)
-        elif time_range == "90days":
-            start_date = end_date - timedelta(days=90)
-        elif time_range == "year":
-            start_date = end_date - timedelta(days=365)
-        else:  # 30days default
-            start_date = end_date - timedelta(days=30)
-        
-        # Get cases in the time range
-        cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases?created_at.gte.{start_date.isoformat()}&created_at.lte.{end_date.isoformat()}&limit=500"
-        cases_resp = requests.get(cases_url, headers=_postgrest_headers(), timeout=15)
-        cases_resp.raise_for_status()
-        cases = cases_resp.json()
-        
-        total_cases = len(cases)
-        
-        # Count by status
-        status_counts = {}
-        for case in cases:
-            status = case.get('status', 'Unknown')
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        # Fetch user profiles for eligibility data
-        profiles_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile?limit=500"
-        profiles_resp = requests.get(profiles_url, headers=_postgrest_headers(), timeout=15)
-        profiles_resp.raise_for_status()
-        profiles = profiles_resp.json()
-        
-        # Calculate metrics
-        avg_ai_score = 0
-        if profiles:
-            total_score = 0
-            count = 0
-            for profile in profiles:
-                try:
-                    eligibility_raw = profile.get('eligibility_raw', {})
-                    if isinstance(eligibility_raw, str):
-                        eligibility_raw = json.loads(eligibility_raw)
-                    score = eligibility_raw.get('eligibility_score', 0)
-                    if score:
-                        total_score += score
-                        count += 1
-                except:
-                    pass
-            avg_ai_score = int(total_score / count) if count > 0 else 0
-        
-        # Calculate claim amounts and extract disability types
-        total_claim_amount = 0
-        disability_type_counts = {}
-        
-        for case in cases:
-            try:
-                call_summary = case.get('call_summary', {})
-                if isinstance(call_summary, str):
-                    call_summary = json.loads(call_summary)
-                
-                # Extract claim amount
-                amount = call_summary.get('estimated_claim_amount', 0)
-                if amount:
-                    total_claim_amount += amount
-                
-                # Extract disability types from products field
-                products = call_summary.get('products', [])
-                if isinstance(products, str):
-                    products = json.loads(products)
-                
-                if products:
-                    for product in products:
-                        disability_type_counts[product] = disability_type_counts.get(product, 0) + 1
-                else:
-                    # Default to 'General Disability' if no products specified
-                    disability_type_counts['General Disability'] = disability_type_counts.get('General Disability', 0) + 1
-            except Exception as parse_err:
-                logger.warning(f'Failed to parse call_summary for case: {parse_err}')
-                disability_type_counts['General Disability'] = disability_type_counts.get('General Disability', 0) + 1
-        
+        from datetime import datetime, timedelta, timezone
+
+        days = ANALYTICS_RANGE_DAYS.get(time_range, 30)
+        end_day = datetime.now(timezone.utc).date() + timedelta(days=1)
+        start_day = end_day - timedelta(days=days)
+        prev_start_day = start_day - timedelta(days=days)
+
+        current, previous = await asyncio.gather(
+            supabase_async.case_rollup_summary(start_day, end_day),
+            supabase_async.case_rollup_summary(prev_start_day, start_day),
+        )
+
+        statuses = current['statuses']
+        status_counts = {s['status']: int(s['case_count']) for s in statuses}
+        total_cases = sum(status_counts.values())
+
         # Stage distribution
         stage_distribution = {}
         for status, count in status_counts.items():
@@ -9733,63 +9449,50 @@ async def get_analytics(
                 'count': count,
                 'percentage': percentage
             }
-        
-        # Calculate previous period for comparison
-        if time_range == "7days":
-            prev_start = start_date - timedelta(days=7)
-        elif time_range == "90days":
-            prev_start = start_date - timedelta(days=90)
-        elif time_range == "year":
-            prev_start = start_date - timedelta(days=365)
-        else:
-            prev_start = start_date - timedelta(days=30)
-        
-        prev_cases_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cases?created_at.gte.{prev_start.isoformat()}&created_at.lt.{start_date.isoformat()}&limit=500"
-        prev_cases_resp = requests.get(prev_cases_url, headers=_postgrest_headers(), timeout=15)
-        prev_cases = prev_cases_resp.json() if prev_cases_resp.ok else []
-        prev_total_cases = len(prev_cases)
-        
-        # Calculate conversion rate (cases that reached submission)
+
+        ai_score_total = sum(float(s['ai_score_total']) for s in statuses)
+        ai_score_count = sum(int(s['ai_score_count']) for s in statuses)
+        avg_ai_score = int(ai_score_total / ai_score_count) if ai_score_count > 0 else 0
+
+        total_claim_amount = sum(float(s['claim_amount_total']) for s in statuses)
+        if total_claim_amount.is_integer():
+            total_claim_amount = int(total_claim_amount)
+
+        processing_days_total = sum(int(s['processing_days_total']) for s in statuses)
+        processing_days_count = sum(int(s['processing_days_count']) for s in statuses)
+        avg_processing_days = int(processing_days_total / processing_days_count) if processing_days_count > 0 else 0
+
+        # Conversion rate (cases that reached submission) vs previous period
+        prev_status_counts = {s['status']: int(s['case_count']) for s in previous['statuses']}
+        prev_total_cases = sum(prev_status_counts.values())
+
         submitted_count = status_counts.get('Submitted', 0)
         conversion_rate = int((submitted_count / total_cases) * 100) if total_cases > 0 else 0
-        
-        prev_submitted = sum(1 for c in prev_cases if c.get('status') == 'Submitted')
+        prev_submitted = prev_status_counts.get('Submitted', 0)
         prev_conversion = int((prev_submitted / prev_total_cases) * 100) if prev_total_cases > 0 else 0
         conversion_change = conversion_rate - prev_conversion
-        
-        # Calculate new cases change percentage
+
         cases_change = int(((total_cases - prev_total_cases) / prev_total_cases) * 100) if prev_total_cases > 0 else 0
-        
-        # Average processing time (days)
-        total_days = 0
-        count = 0
-        for case in cases:
-            try:
-                created = datetime.fromisoformat(case.get('created_at', '').replace('Z', '+00:00'))
-                updated = datetime.fromisoformat(case.get('updated_at', '').replace('Z', '+00:00'))
-                days = (updated - created).days
-                if days >= 0:
-                    total_days += days
-                    count += 1
-            except:
-                pass
-        avg_processing_days = int(total_days / count) if count > 0 else 0
-        
+
         return JSONResponse({
             'status': 'ok',
             'metrics': {
                 'total_cases': total_cases,
-                'cases_change': f"+{cases_change}%" if cases_change >= 0 else f"{cases_change}%",
+                'cases_change': _format_change(cases_change),
                 'conversion_rate': conversion_rate,
-                'conversion_change': f"+{conversion_change}%" if conversion_change >= 0 else f"{conversion_change}%",
+                'conversion_change': _format_change(conversion_change),
                 'avg_ai_score': avg_ai_score,
                 'avg_processing_days': avg_processing_days,
                 'total_claim_potential': total_claim_amount,
             },
             'stage_distribution': stage_distribution,
-            'claim_types': disability_type_counts
+            'claim_types': {k: int(v) for k, v in current['products'].items()},
+            'period': {
+                'start': start_day.isoformat(),
+                'end': (end_day - timedelta(days=1)).isoformat(),
+            }
         })
-        
+
     except Exception as e:
         logger.error(f'Failed to get analytics: {e}')
         raise HTTPException(status_code=500, detail=f'Failed to get analytics: {str(e)}')
@@ -10341,31 +10044,29 @@ async def interview_chat(
             agent_prompt=cached_agent_prompt  # Pass cached prompt if available
         )
         
-        # Save chat history to call_details after each message
+        # Save this exchange to call_details: one atomic patch appends the two
+        # messages and updates the status fields without rewriting the history
         try:
             from datetime import datetime
             
-            # Build complete message history including current exchange
-            all_messages = [
-                {"role": msg.role, "content": msg.content, "timestamp": datetime.utcnow().isoformat()}
-                for msg in chat_history
+            now = datetime.utcnow().isoformat()
+            new_messages = [
+                {"role": "user", "content": message, "timestamp": now},
+                {"role": "assistant", "content": response.message, "timestamp": now},
             ]
-            all_messages.append({"role": "user", "content": message, "timestamp": datetime.utcnow().isoformat()})
-            all_messages.append({"role": "assistant", "content": response.message, "timestamp": datetime.utcnow().isoformat()})
-            
-            call_details_update = {
-                "messages": all_messages,
+            status_fields = {
                 "language": language,
                 "is_complete": response.done,  # True when AI detects completion
-                "last_updated": datetime.utcnow().isoformat()
+                "last_updated": now
             }
-            
             if response.confidence_score:
-                call_details_update["confidence_score"] = response.confidence_score
+                status_fields["confidence_score"] = response.confidence_score
             
-            # Pass dict directly - Supabase handles JSONB serialization
-            update_case(case_id, {'call_details': call_details_update})
-            logger.info(f"💾 Saved {len(all_messages)} messages to call_details (done={response.done})")
+            await supabase_async.patch_case_json(case_id, 'call_details', [
+                {'op': 'append', 'path': ['messages'], 'value': new_messages},
+                {'op': 'merge', 'path': [], 'value': status_fields},
+            ], return_path=['is_complete'])
+            logger.info(f"💾 Appended {len(new_messages)} messages to call_details (done={response.done})")
             
         except Exception as e:
             logger.exception(f"❌ Error saving chat history: {str(e)}")
@@ -3,9 +3,12 @@ import io
 import base64
 import logging
 import requests
-from typing import Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
 
+from . import doc_pool, ocr_cache, ocr_engine
+from .utils import map_file
+
 # Load .env from the backend folder if present so this module works
 # even when imported standalone (e.g., in tests or CLI helpers).
 try:
@@ -79,39 +82,25 @@ def ocr_image_with_vision(image_bytes: bytes, filename: str = "image") -> str:
         raise Exception(f"OCR failed: {str(e)}")
 
 
-def ocr_pdf_with_vision(pdf_bytes: bytes, filename: str = "document.pdf") -> str:
-    """Convert PDF pages to images using PyMuPDF and OCR them with Google Vision."""
+async def ocr_pdf_with_vision_async(pdf_bytes: bytes, filename: str = "document.pdf", path: Optional[str] = None) -> str:
+    """Extract PDF text page by page: the embedded text layer where it is usable,
+    Google Vision OCR (several pages at a time) for scanned or image-only pages.
+
+    When `path` is given the PDF is opened from disk and `pdf_bytes` is ignored,
+    so MuPDF reads pages on demand instead of needing the whole file in memory.
+    Page order is preserved in the joined output (see ocr_engine).
+    """
     try:
-        import fitz  # PyMuPDF
+        import fitz  # noqa: F401  PyMuPDF
     except ImportError:
         logger.error("PyMuPDF (fitz) not installed. Install with: pip install PyMuPDF")
         raise Exception("PyMuPDF not available for PDF processing")
     
     try:
-        # Open PDF from bytes
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        all_text = []
-        
-        page_count = len(doc)
-        logger.info(f"Processing PDF {filename} with {page_count} pages")
-        
-        for i, page in enumerate(doc, start=1):
-            logger.info(f"OCR page {i}/{page_count}...")
-            
-            # Render page to PNG image bytes at 200 DPI
-            pix = page.get_pixmap(dpi=200)
-            image_bytes = pix.tobytes("png")
-            
-            # OCR the image
-            text = ocr_image_with_vision(image_bytes, f"{filename}_page_{i}")
-            
-            if text:
-                all_text.append(text)
-        
-        doc.close()
-        full_text = "\n\n--- PAGE BREAK ---\n\n".join(all_text)
+        pages = await ocr_engine.ocr_pdf_pages(pdf_bytes, path=path, filename=filename)
+        full_text = ocr_engine.join_pages(pages)
         
-        logger.info(f"Successfully extracted {len(full_text)} chars from {page_count} pages of {filename}")
+        logger.info(f"Successfully extracted {len(full_text)} chars from {len(pages)} pages of {filename}")
         return full_text
         
     except Exception as e:
@@ -119,12 +108,12 @@ def ocr_pdf_with_vision(pdf_bytes: bytes, filename: str = "document.pdf") -> str
         raise Exception(f"PDF processing failed: {str(e)}")
 
 
-def extract_text_from_document(file_bytes: bytes, filename: str = "document") -> Tuple[str, bool]:
-    """
-    Extract text from PDF or image files using Google Vision API.
-    Only supports PDF and image formats (JPG, PNG, etc.).
-    Returns (text, success)
-    """
+def ocr_pdf_with_vision(pdf_bytes: bytes, filename: str = "document.pdf", path: Optional[str] = None) -> str:
+    """Sync wrapper around ocr_pdf_with_vision_async."""
+    return ocr_engine.run_sync(ocr_pdf_with_vision_async(pdf_bytes, filename, path=path))
+
+
+def _check_extractable(file_bytes, filename: str):
     # Check API key
     API_KEY = os.getenv("GOOGLE_VISION_API_KEY")
     if not API_KEY:
@@ -135,39 +124,118 @@ def extract_text_from_document(file_bytes: bytes, filename: str = "document") ->
     if not is_pdf(file_bytes, filename) and not is_image(filename):
         logger.error(f"Unsupported file type: {filename}. Only PDF and image files are allowed.")
         raise Exception(f"Unsupported file type. Only PDF and image files (JPG, PNG, etc.) are allowed.")
+
+
+async def _extract_pages_async(file_bytes, filename: str, path: Optional[str],
+                               on_page: Optional[ocr_engine.PageCallback] = None) -> List[str]:
+    if is_pdf(file_bytes, filename):
+        logger.info(f"Processing PDF file: {filename}")
+        try:
+            import fitz  # noqa: F401  PyMuPDF
+        except ImportError:
+            logger.error("PyMuPDF (fitz) not installed. Install with: pip install PyMuPDF")
+            raise Exception("PyMuPDF not available for PDF processing")
+        return await ocr_engine.ocr_pdf_pages(file_bytes, path=path, filename=filename, on_page=on_page)
+    logger.info(f"Processing image file: {filename}")
+    text = await ocr_engine.ocr_image(file_bytes, filename)
+    if on_page is not None:
+        await on_page(0, 1, text)
+    return [text]
+
+
+def _extract_pages(file_bytes, filename: str, path: Optional[str]) -> List[str]:
+    if is_pdf(file_bytes, filename):
+        logger.info(f"Processing PDF file: {filename}")
+        return ocr_engine.run_sync(ocr_engine.ocr_pdf_pages(file_bytes, path=path, filename=filename))
+    logger.info(f"Processing image file: {filename}")
+    return [ocr_image_with_vision(file_bytes, filename)]
+
+
+async def extract_text_from_document_async(file_bytes: bytes, filename: str = "document", path: Optional[str] = None,
+                                           sha256: Optional[str] = None,
+                                           on_page: Optional[ocr_engine.PageCallback] = None) -> Tuple[str, bool]:
+    """Async version of extract_text_from_document; also consults the shared OCR result table.
+
+    `on_page(index, page_count, text)` is awaited as each page becomes
+    available (all at once on a cache hit), for streaming progress.
+    """
+    _check_extractable(file_bytes, filename)
     
     try:
-        # Handle PDFs
-        if is_pdf(file_bytes, filename):
-            logger.info(f"Processing PDF file: {filename}")
-            text = ocr_pdf_with_vision(file_bytes, filename)
-            return text, True
-        
-        # Handle images
-        elif is_image(filename):
-            logger.info(f"Processing image file: {filename}")
-            text = ocr_image_with_vision(file_bytes, filename)
-            return text, True
-        
+        digest = sha256 or ocr_cache.hash_bytes(file_bytes)
+        engine = ocr_engine.engine_version()
+        pages = await ocr_cache.lookup_async(digest, engine)
+        if pages is not None:
+            logger.info(f"OCR cache hit for {filename} ({digest[:12]}, {len(pages)} pages)")
+            if on_page is not None:
+                for index, text in enumerate(pages):
+                    await on_page(index, len(pages), text)
+        else:
+            pages = await _extract_pages_async(file_bytes, filename, path, on_page)
+            await ocr_cache.store_async(digest, engine, pages)
+        return ocr_engine.join_pages(pages), True
+            
+    except Exception as e:
+        logger.exception(f"Text extraction failed for {filename}: {e}")
+        raise Exception(f"Text extraction failed: {str(e)}")
+
+
+def extract_text_from_document(file_bytes: bytes, filename: str = "document", path: Optional[str] = None,
+                               sha256: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Extract text from PDF or image files using Google Vision API.
+    PDF pages that carry a usable text layer are read directly and skip OCR.
+    Results are cached by content hash (see ocr_cache); pass `sha256` when
+    the caller already knows it.
+    Only supports PDF and image formats (JPG, PNG, etc.).
+    `file_bytes` may be any bytes-like object (e.g. an mmap); `path`, when
+    given, lets PDFs be opened from disk.
+    Returns (text, success)
+    """
+    _check_extractable(file_bytes, filename)
+    
+    try:
+        digest = sha256 or ocr_cache.hash_bytes(file_bytes)
+        engine = ocr_engine.engine_version()
+        pages = ocr_cache.lookup(digest, engine)
+        if pages is not None:
+            logger.info(f"OCR cache hit for {filename} ({digest[:12]}, {len(pages)} pages)")
         else:
-            raise Exception("File type not recognized as PDF or image")
+            pages = _extract_pages(file_bytes, filename, path)
+            ocr_cache.store(digest, engine, pages)
+        return ocr_engine.join_pages(pages), True
             
     except Exception as e:
         logger.exception(f"Text extraction failed for {filename}: {e}")
         raise Exception(f"Text extraction failed: {str(e)}")
 
 
+async def extract_text_from_file_async(path: str, filename: str = None, sha256: Optional[str] = None,
+                                       on_page: Optional[ocr_engine.PageCallback] = None) -> Tuple[str, bool]:
+    """Async version of extract_text_from_file."""
+    with map_file(path) as view:
+        return await extract_text_from_document_async(view, filename or os.path.basename(path), path=path,
+                                                      sha256=sha256, on_page=on_page)
+
+
+def extract_text_from_file(path: str, filename: str = None, sha256: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Extract text from a PDF or image on disk without reading it into memory.
+    PDFs are opened by path; images are passed to Vision from a memory map.
+    Returns (text, success)
+    """
+    with map_file(path) as view:
+        return extract_text_from_document(view, filename or os.path.basename(path), path=path, sha256=sha256)
+
+
 # Legacy function for backward compatibility (now uses Google Vision)
 def extract_text_from_pdf(path: str) -> Tuple[str, bool]:
     """
-    Legacy function - reads file from path and extracts text using Google Vision.
+    Legacy function - extracts text from a file on disk using Google Vision.
     Returns (text, ocr_used) for backward compatibility.
     """
     try:
-        with open(path, 'rb') as f:
-            file_bytes = f.read()
-        
-        text, success = extract_text_from_document(file_bytes, os.path.basename(path))
+        text, success = extract_text_from_file(path)
         return text, success
         
     except Exception as e:
@@ -179,6 +247,7 @@ def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> Tuple[str, bool]:
     """
     Fallback PDF text extraction using PyPDF2 (digital PDFs only).
     Does NOT use OCR - only extracts embedded text.
+    Also accepts an open binary file object.
     Returns (text, success) tuple.
     """
     try:
@@ -189,7 +258,8 @@ def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> Tuple[str, bool]:
             return "", False
         
         # Create a PDF reader object from bytes
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        stream = pdf_bytes if hasattr(pdf_bytes, 'read') else io.BytesIO(pdf_bytes)
+        pdf_reader = PyPDF2.PdfReader(stream)
         all_text = []
         
         for page_num in range(len(pdf_reader.pages)):
@@ -214,3 +284,24 @@ def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> Tuple[str, bool]:
     except Exception as e:
         logger.exception(f"PyPDF2 fallback extraction failed: {e}")
         return "", False
+
+
+def extract_text_from_pdf_file(path: str) -> Tuple[str, bool]:
+    """extract_text_from_pdf_bytes for a PDF on disk."""
+    with open(path, 'rb') as f:
+        return extract_text_from_pdf_bytes(f)
+
+
+async def extract_text_from_pdf_bytes_async(pdf_bytes=None, path: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    extract_text_from_pdf_bytes run in the document process pool, so PyPDF2
+    parsing does not block the event loop. Pass `path` for files on disk.
+    Returns (text, success) tuple.
+    """
+    try:
+        if path:
+            return await doc_pool.run(extract_text_from_pdf_file, path)
+        return await doc_pool.run(extract_text_from_pdf_bytes, bytes(pdf_bytes))
+    except Exception as e:
+        logger.exception(f"PyPDF2 fallback extraction failed: {e}")
+        return "", False
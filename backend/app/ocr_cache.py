@@ -0,0 +1,231 @@
+"""
+Content-hash cache for OCR results.
+
+One upload is typically OCRed several times: at /eligibility-check, again at
+/eligibility-submit, in process-documents and in /vapi/document-summary.
+Results are now cached per page under (sha256 of the file bytes, OCR engine
+version), so a file is only sent to Vision once per engine version:
+
+- Locally in SQLite at `<OCR_CACHE_DIR>/ocr.sqlite3`, page text stored
+  zlib-compressed, bounded by `OCR_CACHE_MAX_BYTES` (least recently used
+  documents evicted first). Shared safely between worker processes on the
+  same host. The text is claimants' documents, so the directory is kept at
+  mode 0700 and the database at 0600.
+- Optionally (`OCR_CACHE_DB=true`) in the `ocr_results` table (migration
+  021), so other hosts and fresh containers reuse results too. Only the
+  async lookups consult the database; they run the SQLite work in a worker
+  thread so it never blocks the event loop.
+
+Bump `ocr_engine.OCR_ENGINE_VERSION` whenever extraction output changes so
+stale entries stop matching.
+"""
+import os
+import time
+import asyncio
+import zlib
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from .utils import ensure_private_dir, ensure_private_file
+
+logger = logging.getLogger('ocr_cache')
+
+OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'ocr-cache')
+OCR_CACHE_MAX_BYTES = int(os.environ.get('OCR_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+OCR_CACHE_DB = os.environ.get('OCR_CACHE_DB', 'false').lower() in ('1', 'true', 'yes')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+  sha256 TEXT NOT NULL,
+  engine TEXT NOT NULL,
+  page_count INTEGER NOT NULL,
+  size INTEGER NOT NULL,
+  created_at REAL NOT NULL,
+  last_used REAL NOT NULL,
+  PRIMARY KEY (sha256, engine)
+);
+CREATE TABLE IF NOT EXISTS pages (
+  sha256 TEXT NOT NULL,
+  engine TEXT NOT NULL,
+  page_index INTEGER NOT NULL,
+  text BLOB NOT NULL,
+  PRIMARY KEY (sha256, engine, page_index)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_last_used ON documents (last_used);
+"""
+
+
+def hash_bytes(data) -> str:
+    """sha256 hex digest of any bytes-like object (bytes, memoryview, mmap)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class OcrCache:
+    """Per-page OCR text in SQLite; see the module docstring."""
+
+    def __init__(self, root: str = OCR_CACHE_DIR, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        ensure_private_dir(root)
+        self._db_path = ensure_private_file(os.path.join(root, 'ocr.sqlite3'))
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sha256: str, engine: str) -> Optional[List[str]]:
+        """Cached per-page text, or None on a miss."""
+        conn = self._conn()
+        doc = conn.execute(
+            'SELECT page_count FROM documents WHERE sha256 = ? AND engine = ?', (sha256, engine)
+        ).fetchone()
+        if doc is None:
+            return None
+        rows = conn.execute(
+            'SELECT page_index, text FROM pages WHERE sha256 = ? AND engine = ? ORDER BY page_index',
+            (sha256, engine)
+        ).fetchall()
+        if len(rows) != doc['page_count']:
+            self.invalidate(sha256, engine)
+            return None
+        conn.execute(
+            'UPDATE documents SET last_used = ? WHERE sha256 = ? AND engine = ?', (time.time(), sha256, engine)
+        )
+        return [zlib.decompress(row['text']).decode('utf-8') for row in rows]
+
+    def put(self, sha256: str, engine: str, pages: List[str]):
+        compressed = [zlib.compress(text.encode('utf-8')) for text in pages]
+        size = sum(len(blob) for blob in compressed)
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM pages WHERE sha256 = ? AND engine = ?', (sha256, engine))
+            conn.executemany(
+                'INSERT INTO pages (sha256, engine, page_index, text) VALUES (?, ?, ?, ?)',
+                [(sha256, engine, index, blob) for index, blob in enumerate(compressed)]
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO documents (sha256, engine, page_count, size, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (sha256, engine, len(pages), size, now, now)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self.evict(keep=(sha256, engine))
+
+    def invalidate(self, sha256: str, engine: Optional[str] = None):
+        conn = self._conn()
+        if engine is None:
+            conn.execute('DELETE FROM pages WHERE sha256 = ?', (sha256,))
+            conn.execute('DELETE FROM documents WHERE sha256 = ?', (sha256,))
+        else:
+            conn.execute('DELETE FROM pages WHERE sha256 = ? AND engine = ?', (sha256, engine))
+            conn.execute('DELETE FROM documents WHERE sha256 = ? AND engine = ?', (sha256, engine))
+
+    def evict(self, keep: Optional[tuple] = None):
+        """Drop least recently used documents until the cache fits in max_bytes."""
+        conn = self._conn()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM documents').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for doc in conn.execute('SELECT sha256, engine, size FROM documents ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            if (doc['sha256'], doc['engine']) == keep:
+                continue
+            self.invalidate(doc['sha256'], doc['engine'])
+            total -= doc['size']
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._conn().execute(
+            'SELECT COUNT(*) AS documents, COALESCE(SUM(page_count), 0) AS pages, '
+            'COALESCE(SUM(size), 0) AS bytes FROM documents'
+        ).fetchone()
+        return {**dict(row), 'max_bytes': self.max_bytes, 'db_persistence': OCR_CACHE_DB}
+
+
+_cache: Optional[OcrCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Get or create the process-wide cache instance (None when disabled or unusable)"""
+    global _cache, _cache_failed
+    if not OCR_CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = OcrCache()
+                except Exception as e:
+                    logger.error(f"Could not open OCR cache at {OCR_CACHE_DIR}, caching disabled: {e}")
+                    _cache_failed = True
+    return _cache
+
+
+def lookup(sha256: str, engine: str) -> Optional[List[str]]:
+    """Local-only lookup for sync callers."""
+    cache = get_ocr_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(sha256, engine)
+    except Exception as e:
+        logger.warning(f"OCR cache lookup failed for {sha256[:12]}: {e}")
+        return None
+
+
+def store(sha256: str, engine: str, pages: List[str]):
+    cache = get_ocr_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(sha256, engine, pages)
+    except Exception as e:
+        logger.warning(f"OCR cache store failed for {sha256[:12]}: {e}")
+
+
+async def lookup_async(sha256: str, engine: str) -> Optional[List[str]]:
+    """Local lookup, then the ocr_results table when OCR_CACHE_DB is on."""
+    pages = await asyncio.to_thread(lookup, sha256, engine)
+    if pages is not None or not OCR_CACHE_DB or not OCR_CACHE_ENABLED:
+        return pages
+    from . import supabase_async
+    try:
+        row = await supabase_async.get_ocr_result(sha256, engine)
+    except Exception as e:
+        logger.warning(f"OCR result lookup in database failed for {sha256[:12]}: {e}")
+        return None
+    if not row:
+        return None
+    pages = row.get('pages') or []
+    await asyncio.to_thread(store, sha256, engine, pages)
+    return pages
+
+
+async def store_async(sha256: str, engine: str, pages: List[str]):
+    await asyncio.to_thread(store, sha256, engine, pages)
+    if not OCR_CACHE_DB or not OCR_CACHE_ENABLED:
+        return
+    from . import supabase_async
+    try:
+        await supabase_async.upsert_ocr_result(sha256, engine, pages)
+    except Exception as e:
+        logger.warning(f"OCR result store in database failed for {sha256[:12]}: {e}")
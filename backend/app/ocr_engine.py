@@ -0,0 +1,431 @@
+"""
+Concurrent PDF OCR engine.
+
+`ocr_pdf_with_vision` used to render a page, wait for its Vision round trip,
+then move on to the next page. Here pages are rendered in the shared
+document process pool (`doc_pool`) and sent to Vision concurrently, at most `OCR_CONCURRENCY` requests in flight
+(which also bounds how many rendered images are held in memory at once).
+Results come back in page order whatever order the requests finish in.
+
+Pages are grouped into Vision requests according to `OCR_VISION_MODE`:
+
+- `page`:  one image per `images:annotate` request.
+- `batch`: up to `OCR_BATCH_PAGES` rendered pages per `images:annotate`
+  request (Vision allows 16), split further if the body would exceed
+  `OCR_BATCH_MAX_BYTES`.
+- `pdf`:   the PDF itself, cut into sub-documents of up to 5 pages, sent
+  natively to `files:annotate` (no rasterizing on our side).
+
+Responses are demultiplexed back to their pages, so callers see the same
+per-page results whichever mode is used.
+
+Before any of that, each page's embedded text layer is read with PyMuPDF
+(`OCR_TEXT_LAYER`). Born-digital pages (most BTL letters, discharge
+summaries) whose text looks usable are taken as-is; only scanned or
+image-only pages are rendered and sent to Vision. See `usable_text_layer`.
+
+Pages that do need OCR are rendered by `render_page` with the
+`OCR_RENDER_PROFILE`: `adaptive` (default) picks the DPI per page (see
+`adaptive_dpi`) and sends grayscale JPEG/WebP; `legacy` is the old 200 DPI
+colour PNG. `scripts/ocr_benchmark.py` compares the two.
+
+`ocr.py` keeps the public sync API and wraps these coroutines with
+`run_sync`; async callers can await them directly.
+"""
+import os
+import asyncio
+import base64
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional
+
+import httpx
+
+from . import doc_pool
+
+logger = logging.getLogger('ocr_engine')
+
+OCR_CONCURRENCY = int(os.environ.get('OCR_CONCURRENCY', '6'))
+OCR_RENDER_DPI = int(os.environ.get('OCR_RENDER_DPI', '200'))
+OCR_RENDER_PROFILE = os.environ.get('OCR_RENDER_PROFILE', 'adaptive')  # adaptive | legacy
+OCR_IMAGE_FORMAT = os.environ.get('OCR_IMAGE_FORMAT', 'jpeg')  # jpeg | webp | png
+OCR_IMAGE_QUALITY = int(os.environ.get('OCR_IMAGE_QUALITY', '80'))
+OCR_MIN_DPI = int(os.environ.get('OCR_MIN_DPI', '120'))
+OCR_MAX_DPI = int(os.environ.get('OCR_MAX_DPI', '300'))
+# Pixels along the page's long edge before text-size adjustments (A4 at ~190 DPI)
+OCR_TARGET_LONG_EDGE = int(os.environ.get('OCR_TARGET_LONG_EDGE', '2200'))
+# Smallest glyph height, in pixels, Vision should get for small print
+OCR_MIN_GLYPH_PX = int(os.environ.get('OCR_MIN_GLYPH_PX', '18'))
+VISION_TIMEOUT = float(os.environ.get('VISION_TIMEOUT', '90'))
+VISION_RETRIES = int(os.environ.get('VISION_RETRIES', '2'))
+OCR_VISION_MODE = os.environ.get('OCR_VISION_MODE', 'batch')
+OCR_BATCH_PAGES = min(16, int(os.environ.get('OCR_BATCH_PAGES', '8')))
+OCR_BATCH_MAX_BYTES = int(os.environ.get('OCR_BATCH_MAX_BYTES', str(8 * 1024 * 1024)))
+VISION_ANNOTATE_URL = 'https://vision.googleapis.com/v1/images:annotate'
+VISION_FILES_URL = 'https://vision.googleapis.com/v1/files:annotate'
+VISION_FILE_MAX_PAGES = 5
+OCR_TEXT_LAYER = os.environ.get('OCR_TEXT_LAYER', 'true').lower() in ('1', 'true', 'yes')
+OCR_TEXT_MIN_CHARS = int(os.environ.get('OCR_TEXT_MIN_CHARS', '40'))
+OCR_TEXT_MAX_GARBLED = float(os.environ.get('OCR_TEXT_MAX_GARBLED', '0.05'))
+# A page mostly covered by images needs this much text before its layer is trusted
+OCR_IMAGE_COVERAGE = float(os.environ.get('OCR_IMAGE_COVERAGE', '0.5'))
+OCR_IMAGE_PAGE_MIN_CHARS = int(os.environ.get('OCR_IMAGE_PAGE_MIN_CHARS', '400'))
+
+# Part of the OCR cache key (ocr_cache.py); bump when extraction output changes
+OCR_ENGINE_VERSION = 'vision-4'
+
+PAGE_BREAK = "\n\n--- PAGE BREAK ---\n\n"
+
+PageCallback = Callable[[int, int, str], Awaitable[None]]
+
+
+class VisionError(Exception):
+    """Vision returned an error for a request."""
+
+
+def _vision_api_key() -> str:
+    api_key = os.getenv("GOOGLE_VISION_API_KEY")
+    if not api_key:
+        logger.error("GOOGLE_VISION_API_KEY not set in environment")
+        raise Exception("Google Vision API key not configured")
+    return api_key
+
+
+def _open_pdf(pdf_bytes=None, path: Optional[str] = None):
+    import fitz  # PyMuPDF
+    if path:
+        return fitz.open(path, filetype="pdf")
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+def pdf_page_count(pdf_bytes=None, path: Optional[str] = None) -> int:
+    doc = _open_pdf(pdf_bytes, path)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def usable_text_layer(page) -> Optional[str]:
+    """The page's embedded text if it can stand in for OCR, else None.
+
+    Rejected: pages with almost no text (scans), text that is mostly
+    unmappable glyphs (broken font encodings come out as U+FFFD or control
+    characters), and pages dominated by images with only a little text on
+    top (a typed header over a scanned body).
+    """
+    import fitz  # PyMuPDF
+    text = page.get_text("text")
+    stripped = "".join(text.split())
+    if len(stripped) < OCR_TEXT_MIN_CHARS:
+        return None
+    garbled = sum(1 for ch in stripped if ch == "\ufffd" or not ch.isprintable())
+    if garbled / len(stripped) > OCR_TEXT_MAX_GARBLED:
+        return None
+    if len(stripped) < OCR_IMAGE_PAGE_MIN_CHARS:
+        page_area = abs(page.rect) or 1
+        image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+        if image_area / page_area >= OCR_IMAGE_COVERAGE:
+            return None
+    return text.strip()
+
+
+def read_text_layers(pdf_bytes=None, path: Optional[str] = None) -> List[Optional[str]]:
+    """usable_text_layer for every page; None marks pages that need OCR."""
+    doc = _open_pdf(pdf_bytes, path)
+    try:
+        layers = []
+        for page in doc:
+            try:
+                layers.append(usable_text_layer(page))
+            except Exception as e:
+                logger.warning(f"Text layer check failed on page {page.number + 1}: {e}")
+                layers.append(None)
+        return layers
+    finally:
+        doc.close()
+
+
+def adaptive_dpi(page) -> int:
+    """Render resolution for one page.
+
+    Starts from the DPI that puts OCR_TARGET_LONG_EDGE pixels on the page's
+    long edge (so oversized pages are not blown up), then:
+    - caps it at the native resolution of a scan covering most of the page,
+      since rendering above it only adds bytes;
+    - raises it so the smallest text span on the page is at least
+      OCR_MIN_GLYPH_PX tall.
+    Clamped to OCR_MIN_DPI..OCR_MAX_DPI.
+    """
+    import fitz  # PyMuPDF
+    rect = page.rect
+    dpi = OCR_TARGET_LONG_EDGE * 72 / (max(rect.width, rect.height) or 1)
+
+    page_area = abs(rect) or 1
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & rect
+        if abs(bbox) / page_area >= OCR_IMAGE_COVERAGE and bbox.width > 0:
+            native_dpi = info["width"] * 72 / bbox.width
+            dpi = min(dpi, native_dpi)
+            break
+
+    sizes = [
+        span["size"]
+        for block in page.get_text("dict").get("blocks", [])
+        for line in block.get("lines", [])
+        for span in line.get("spans", [])
+        if span.get("text", "").strip() and span.get("size", 0) > 0
+    ]
+    if sizes:
+        dpi = max(dpi, OCR_MIN_GLYPH_PX * 72 / min(sizes))
+
+    return int(min(max(dpi, OCR_MIN_DPI), OCR_MAX_DPI))
+
+
+def encode_pixmap(pix, image_format: str = OCR_IMAGE_FORMAT, quality: int = OCR_IMAGE_QUALITY) -> bytes:
+    if image_format == 'webp':
+        return pix.pil_tobytes(format="WEBP", quality=quality)
+    if image_format in ('jpeg', 'jpg'):
+        return pix.tobytes("jpeg", jpg_quality=quality)
+    return pix.tobytes("png")
+
+
+def render_page(index: int, pdf_bytes=None, path: Optional[str] = None, profile: str = OCR_RENDER_PROFILE,
+                image_format: str = OCR_IMAGE_FORMAT, quality: int = OCR_IMAGE_QUALITY) -> bytes:
+    """Render one page for Vision. Opens its own document handle so pages can render in parallel."""
+    import fitz  # PyMuPDF
+    doc = _open_pdf(pdf_bytes, path)
+    try:
+        page = doc[index]
+        if profile == 'legacy':
+            return page.get_pixmap(dpi=OCR_RENDER_DPI).tobytes("png")
+        pix = page.get_pixmap(dpi=adaptive_dpi(page), colorspace=fitz.csGRAY, alpha=False)
+        return encode_pixmap(pix, image_format, quality)
+    finally:
+        doc.close()
+
+
+def render_pdf_chunk(indices: List[int], pdf_bytes=None, path: Optional[str] = None) -> bytes:
+    """The given pages (0-based) as a standalone PDF, in that order."""
+    import fitz  # PyMuPDF
+    src = _open_pdf(pdf_bytes, path)
+    try:
+        chunk = fitz.open()
+        for index in indices:
+            chunk.insert_pdf(src, from_page=index, to_page=index)
+        try:
+            return chunk.tobytes(garbage=3, deflate=True)
+        finally:
+            chunk.close()
+    finally:
+        src.close()
+
+
+def _image_request(image_bytes: bytes) -> dict:
+    return {
+        "image": {"content": base64.b64encode(image_bytes).decode("utf-8")},
+        "features": [{"type": "DOCUMENT_TEXT_DETECTION"}]
+    }
+
+
+async def _post_vision(client: httpx.AsyncClient, url: str, payload: dict, label: str) -> dict:
+    """POST to Vision, retrying 429/5xx and transport errors."""
+    url = f"{url}?key={_vision_api_key()}"
+    for attempt in range(VISION_RETRIES + 1):
+        try:
+            resp = await client.post(url, json=payload)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                resp.raise_for_status()
+            break
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if attempt == VISION_RETRIES:
+                raise
+            logger.warning(f"Vision request for {label} failed (attempt {attempt + 1}): {e}")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _response_text(response: dict, label: str) -> str:
+    if response.get("error"):
+        raise VisionError(f"{label}: {response['error'].get('message')}")
+    text = response.get("fullTextAnnotation", {}).get("text", "")
+    if text:
+        logger.info(f"Extracted {len(text)} chars from {label} via Vision API")
+    else:
+        logger.warning(f"No text extracted from {label}")
+    return text
+
+
+async def vision_annotate(client: httpx.AsyncClient, image_bytes: bytes, label: str = "image") -> str:
+    """DOCUMENT_TEXT_DETECTION for one image."""
+    result = await _post_vision(client, VISION_ANNOTATE_URL, {"requests": [_image_request(image_bytes)]}, label)
+    return _response_text(result["responses"][0], label)
+
+
+async def vision_annotate_batch(client: httpx.AsyncClient, images: List[bytes], labels: List[str]) -> List[str]:
+    """DOCUMENT_TEXT_DETECTION for several images in one request; texts come back in input order.
+
+    A batch whose encoded size would pass OCR_BATCH_MAX_BYTES is split in half.
+    """
+    if len(images) == 1:
+        return [await vision_annotate(client, images[0], labels[0])]
+    encoded_size = sum(len(img) for img in images) * 4 // 3
+    if encoded_size > OCR_BATCH_MAX_BYTES:
+        mid = len(images) // 2
+        return (await vision_annotate_batch(client, images[:mid], labels[:mid])
+                + await vision_annotate_batch(client, images[mid:], labels[mid:]))
+    label = f"{labels[0]}..{labels[-1]}"
+    result = await _post_vision(client, VISION_ANNOTATE_URL, {"requests": [_image_request(img) for img in images]}, label)
+    responses = result.get("responses", [])
+    if len(responses) != len(images):
+        raise VisionError(f"{label}: expected {len(images)} responses, got {len(responses)}")
+    return [_response_text(r, l) for r, l in zip(responses, labels)]
+
+
+async def vision_annotate_pdf(client: httpx.AsyncClient, pdf_chunk: bytes, page_total: int, labels: List[str]) -> List[str]:
+    """DOCUMENT_TEXT_DETECTION on a PDF of up to 5 pages via files:annotate."""
+    payload = {
+        "requests": [{
+            "inputConfig": {"content": base64.b64encode(pdf_chunk).decode("utf-8"), "mimeType": "application/pdf"},
+            "features": [{"type": "DOCUMENT_TEXT_DETECTION"}],
+            "pages": list(range(1, page_total + 1)),
+        }]
+    }
+    label = f"{labels[0]}..{labels[-1]}"
+    result = await _post_vision(client, VISION_FILES_URL, payload, label)
+    file_response = result["responses"][0]
+    if file_response.get("error"):
+        raise VisionError(f"{label}: {file_response['error'].get('message')}")
+    texts = [""] * page_total
+    for position, response in enumerate(file_response.get("responses", [])):
+        page_number = response.get("context", {}).get("pageNumber", position + 1)
+        if 1 <= page_number <= page_total:
+            texts[page_number - 1] = _response_text(response, labels[page_number - 1])
+    return texts
+
+
+def page_groups(indices: List[int], mode: str = OCR_VISION_MODE) -> List[List[int]]:
+    """Page indices grouped into one list per Vision request."""
+    size = {'pdf': VISION_FILE_MAX_PAGES, 'batch': max(1, OCR_BATCH_PAGES)}.get(mode, 1)
+    return [indices[i:i + size] for i in range(0, len(indices), size)]
+
+
+async def ocr_image(image_bytes: bytes, filename: str = "image") -> str:
+    async with httpx.AsyncClient(timeout=VISION_TIMEOUT) as client:
+        return await vision_annotate(client, image_bytes, filename)
+
+
+async def ocr_pdf_pages(pdf_bytes=None, path: Optional[str] = None, filename: str = "document.pdf",
+                        on_page: Optional[PageCallback] = None, mode: str = None,
+                        text_layer: bool = OCR_TEXT_LAYER) -> List[str]:
+    """Extract every page of a PDF; returns per-page text in page order.
+
+    Pages with a usable text layer are read directly (when `text_layer`);
+    the rest are OCRed concurrently. `on_page(index, page_count, text)` is
+    awaited as each page finishes (completion order, not page order).
+
+    PDF work runs in worker processes, which open the file by path; PDFs
+    given only as bytes are written to a temp file first rather than being
+    pickled into every render task.
+    """
+    spill = None
+    if doc_pool.uses_processes():
+        if path is None:
+            spill = path = await asyncio.to_thread(_spill_to_temp, pdf_bytes)
+        pdf_bytes = None  # workers open the path; mmaps cannot be pickled anyway
+    try:
+        return await _ocr_pdf_pages(pdf_bytes, path, filename, on_page, mode or OCR_VISION_MODE, text_layer)
+    finally:
+        if spill:
+            os.unlink(spill)
+
+
+def _spill_to_temp(pdf_bytes) -> str:
+    fd, path = tempfile.mkstemp(prefix='ocr_', suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf_bytes)
+    return path
+
+
+async def _ocr_pdf_pages(pdf_bytes, path: Optional[str], filename: str, on_page: Optional[PageCallback],
+                         mode: str, text_layer: bool) -> List[str]:
+    if text_layer:
+        layers = await doc_pool.run(read_text_layers, pdf_bytes, path)
+    else:
+        layers = [None] * await doc_pool.run(pdf_page_count, pdf_bytes, path)
+    page_count = len(layers)
+    pages: List[str] = [layer or "" for layer in layers]
+    ocr_indices = [i for i, layer in enumerate(layers) if layer is None]
+    groups = page_groups(ocr_indices, mode)
+    logger.info(f"Processing PDF {filename} with {page_count} pages: {page_count - len(ocr_indices)} from text layer, "
+                f"{len(ocr_indices)} to OCR in {len(groups)} Vision request(s) (mode={mode}, concurrency={OCR_CONCURRENCY})")
+
+    if on_page is not None:
+        for index, layer in enumerate(layers):
+            if layer is not None:
+                await on_page(index, page_count, layer)
+    if not groups:
+        return pages
+
+    semaphore = asyncio.Semaphore(OCR_CONCURRENCY)
+
+    async with httpx.AsyncClient(timeout=VISION_TIMEOUT) as client:
+        async def ocr_group(indices: List[int]):
+            labels = [f"{filename}_page_{i + 1}" for i in indices]
+            async with semaphore:
+                logger.info(f"OCR pages {', '.join(str(i + 1) for i in indices)}/{page_count}...")
+                if mode == 'pdf':
+                    chunk = await doc_pool.run(render_pdf_chunk, indices, pdf_bytes, path)
+                    texts = await vision_annotate_pdf(client, chunk, len(indices), labels)
+                else:
+                    images = await asyncio.gather(*(
+                        doc_pool.run(render_page, i, pdf_bytes, path) for i in indices
+                    ))
+                    texts = await vision_annotate_batch(client, list(images), labels)
+                    del images
+            for index, text in zip(indices, texts):
+                pages[index] = text
+                if on_page is not None:
+                    await on_page(index, page_count, text)
+
+        tasks = [asyncio.ensure_future(ocr_group(group)) for group in groups]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+    return pages
+
+
+def engine_version() -> str:
+    """Cache key component for the current extraction settings.
+
+    Ends with a short hash of every setting that changes the extracted text
+    (rendering, Vision mode, text-layer thresholds), so retuning any of them
+    misses the cache instead of serving text produced under the old values.
+    """
+    settings = (
+        OCR_VISION_MODE, OCR_RENDER_DPI, OCR_IMAGE_FORMAT, OCR_IMAGE_QUALITY, OCR_MIN_DPI, OCR_MAX_DPI,
+        OCR_TARGET_LONG_EDGE, OCR_MIN_GLYPH_PX, OCR_TEXT_MIN_CHARS, OCR_TEXT_MAX_GARBLED,
+        OCR_IMAGE_COVERAGE, OCR_IMAGE_PAGE_MIN_CHARS,
+    )
+    digest = hashlib.sha256(repr(settings).encode()).hexdigest()[:8]
+    return f"{OCR_ENGINE_VERSION}-{OCR_RENDER_PROFILE}{'+text' if OCR_TEXT_LAYER else ''}-{digest}"
+
+
+def join_pages(pages: List[str]) -> str:
+    return PAGE_BREAK.join(text for text in pages if text)
+
+
+def run_sync(coro):
+    """Run a coroutine from sync code, including sync code called on an event loop thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
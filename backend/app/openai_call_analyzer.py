@@ -326,7 +326,14 @@ async def analyze_call_conversation_openai(
     messages: list,
     eligibility_records: list | None = None,
     call_details: Dict[str, Any] | None = None,
+    raise_transient: bool = False,
 ) -> Dict[str, Any]:
+    """
+    Analyze a call transcript; on any error a placeholder "Analysis failed" result
+    is returned instead. With raise_transient=True, errors that are likely to pass
+    (OpenAI rate limits, 5xx, dropped connections) are raised so a background job
+    can retry them rather than saving the placeholder.
+    """
 
     try:
         logger.info("[AGENT] ═══════════════════════════════════════════")
@@ -447,6 +454,10 @@ async def analyze_call_conversation_openai(
         return result
 
     except Exception as e:
+        from .job_queue import is_transient_error
+        if raise_transient and is_transient_error(e):
+            logger.warning(f"[AGENT] ⚠️  Transient error, leaving it to the caller to retry: {type(e).__name__}: {e}")
+            raise
         logger.error("\033[91m" + "="*80)
         logger.error("[AGENT] 🔴 EXCEPTION CAUGHT:")
         logger.error(f"[AGENT] Exception type: {type(e).__name__}")
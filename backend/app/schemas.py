@@ -113,3 +113,21 @@ class InterviewChatResponse(BaseModel):
     is_complete: bool = False
     confidence_score: Optional[float] = None
     eligibility_raw: Optional[Dict[str, Any]] = None  # Include in response so frontend can cache it
+
+
+# Direct-to-storage upload Schemas
+class SignedUploadRequest(BaseModel):
+    """Schema for requesting a signed direct upload URL"""
+    case_id: str
+    file_name: str
+    content_type: Optional[str] = None
+    file_size: Optional[int] = Field(None, ge=0, description="Declared size in bytes; checked again on completion")
+    document_type: str = 'general'
+    bucket: str = Field('case-documents', description="'case-documents' or 'eligibility-documents'")
+
+
+class UploadCompleteRequest(BaseModel):
+    """Schema for registering a finished direct upload"""
+    upload_ticket: str
+    document_id: Optional[str] = Field(None, description="documents_requested_list id this upload satisfies")
+    document_name: Optional[str] = Field(None, description="documents_requested_list name this upload satisfies")
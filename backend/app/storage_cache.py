@@ -0,0 +1,226 @@
+"""
+Content-addressed local cache for Supabase Storage objects.
+
+Document analysis (process-documents, direct-upload processing, the Vapi
+document summary) used to download the same case PDFs from Storage on every
+run. Downloaded objects are now kept on local disk:
+
+- Blobs live at `<STORAGE_CACHE_DIR>/objects/<sha256[:2]>/<sha256>`, so the
+  same bytes stored under two paths are kept once.
+- A SQLite index maps (bucket, path) to the object's ETag, sha256 and size.
+  An entry is trusted for `STORAGE_CACHE_REVALIDATE_SECONDS`; after that the
+  ETag is re-checked with a HEAD request before the cached copy is reused.
+- Total blob size is bounded by `STORAGE_CACHE_MAX_BYTES`; the least recently
+  used blobs are evicted first.
+- `storage_fetch_file` hands out blob paths that callers open later, so a
+  blob used in the last `STORAGE_CACHE_PIN_SECONDS` is never deleted: it is
+  skipped by eviction, and a blob replaced or invalidated in that window is
+  parked in `retired` and deleted by a later eviction pass. The cache may
+  exceed its budget while everything in it is pinned.
+
+The index is shared safely between worker processes on the same host. The
+blobs are claimants' documents, so the cache directory is kept at mode 0700.
+"""
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from .utils import hash_file, ensure_private_dir, ensure_private_file
+
+logger = logging.getLogger('storage_cache')
+
+STORAGE_CACHE_DIR = os.environ.get('STORAGE_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'storage-cache')
+STORAGE_CACHE_MAX_BYTES = int(os.environ.get('STORAGE_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+STORAGE_CACHE_REVALIDATE_SECONDS = int(os.environ.get('STORAGE_CACHE_REVALIDATE_SECONDS', '300'))
+STORAGE_CACHE_PIN_SECONDS = int(os.environ.get('STORAGE_CACHE_PIN_SECONDS', '1800'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+  bucket TEXT NOT NULL,
+  path TEXT NOT NULL,
+  etag TEXT,
+  sha256 TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  checked_at REAL NOT NULL,
+  last_used REAL NOT NULL,
+  PRIMARY KEY (bucket, path)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_sha256 ON entries (sha256);
+CREATE TABLE IF NOT EXISTS retired (
+  sha256 TEXT PRIMARY KEY,
+  last_used REAL NOT NULL
+);
+"""
+
+
+class StorageCache:
+    """On-disk blob store plus SQLite index; see the module docstring."""
+
+    def __init__(self, root: str = STORAGE_CACHE_DIR, max_bytes: int = STORAGE_CACHE_MAX_BYTES,
+                 pin_seconds: int = STORAGE_CACHE_PIN_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.pin_seconds = pin_seconds
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        ensure_private_dir(root)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._db_path = ensure_private_file(os.path.join(root, 'index.sqlite3'))
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def new_temp_path(self, suffix: str = '') -> str:
+        """A fresh temp file path on the cache's filesystem (so `add` can rename it)."""
+        fd, path = tempfile.mkstemp(prefix='dl_', suffix=suffix, dir=self.tmp_dir)
+        os.close(fd)
+        return path
+
+    def lookup(self, bucket: str, path: str) -> Optional[Dict[str, Any]]:
+        """Index entry for (bucket, path) whose blob is still on disk, else None."""
+        row = self._conn().execute(
+            'SELECT * FROM entries WHERE bucket = ? AND path = ?', (bucket, path)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['local_path'] = self.blob_path(entry['sha256'])
+        if not os.path.exists(entry['local_path']):
+            self._conn().execute('DELETE FROM entries WHERE bucket = ? AND path = ?', (bucket, path))
+            return None
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry['checked_at'] < STORAGE_CACHE_REVALIDATE_SECONDS
+
+    def touch(self, bucket: str, path: str, validated: bool = False):
+        now = time.time()
+        if validated:
+            self._conn().execute(
+                'UPDATE entries SET last_used = ?, checked_at = ? WHERE bucket = ? AND path = ?',
+                (now, now, bucket, path)
+            )
+        else:
+            self._conn().execute(
+                'UPDATE entries SET last_used = ? WHERE bucket = ? AND path = ?', (now, bucket, path)
+            )
+
+    def add(self, bucket: str, path: str, etag: Optional[str], src_path: str) -> str:
+        """Move a downloaded file into the store and index it. Returns the blob path."""
+        sha256 = hash_file(src_path)
+        size = os.path.getsize(src_path)
+        blob = self.blob_path(sha256)
+        if os.path.exists(blob):
+            os.unlink(src_path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(src_path, blob)
+        previous = self._conn().execute(
+            'SELECT sha256, last_used FROM entries WHERE bucket = ? AND path = ?', (bucket, path)
+        ).fetchone()
+        now = time.time()
+        self._conn().execute(
+            'INSERT INTO entries (bucket, path, etag, sha256, size, checked_at, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (bucket, path) DO UPDATE SET etag = excluded.etag, sha256 = excluded.sha256, '
+            'size = excluded.size, checked_at = excluded.checked_at, last_used = excluded.last_used',
+            (bucket, path, etag, sha256, size, now, now)
+        )
+        if previous and previous['sha256'] != sha256:
+            self._drop_if_unreferenced(previous['sha256'], previous['last_used'])
+        self.evict(keep=sha256)
+        return blob
+
+    def _unlink_blob(self, sha256: str):
+        try:
+            os.unlink(self.blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def _drop_if_unreferenced(self, sha256: str, last_used: float):
+        still_used = self._conn().execute('SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1', (sha256,)).fetchone()
+        if still_used:
+            return
+        if time.time() - last_used < self.pin_seconds:
+            # A caller may still be about to open it; evict() deletes it once the pin expires
+            self._conn().execute(
+                'INSERT INTO retired (sha256, last_used) VALUES (?, ?) '
+                'ON CONFLICT (sha256) DO UPDATE SET last_used = MAX(last_used, excluded.last_used)',
+                (sha256, last_used)
+            )
+        else:
+            self._unlink_blob(sha256)
+
+    def invalidate(self, bucket: str, path: str):
+        row = self._conn().execute(
+            'SELECT sha256, last_used FROM entries WHERE bucket = ? AND path = ?', (bucket, path)
+        ).fetchone()
+        self._conn().execute('DELETE FROM entries WHERE bucket = ? AND path = ?', (bucket, path))
+        if row:
+            self._drop_if_unreferenced(row['sha256'], row['last_used'])
+
+    def _purge_retired(self, cutoff: float):
+        conn = self._conn()
+        for row in conn.execute('SELECT sha256 FROM retired WHERE last_used < ?', (cutoff,)).fetchall():
+            conn.execute('DELETE FROM retired WHERE sha256 = ?', (row['sha256'],))
+            if not conn.execute('SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1', (row['sha256'],)).fetchone():
+                self._unlink_blob(row['sha256'])
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used blobs until the store fits in max_bytes (pinned blobs stay)."""
+        conn = self._conn()
+        cutoff = time.time() - self.pin_seconds
+        self._purge_retired(cutoff)
+        blobs = conn.execute(
+            'SELECT sha256, MAX(size) AS size, MAX(last_used) AS last_used '
+            'FROM entries GROUP BY sha256 ORDER BY last_used'
+        ).fetchall()
+        total = sum(b['size'] for b in blobs)
+        for blob in blobs:
+            if total <= self.max_bytes or blob['last_used'] >= cutoff:
+                break
+            if blob['sha256'] == keep:
+                continue
+            conn.execute('DELETE FROM entries WHERE sha256 = ?', (blob['sha256'],))
+            self._unlink_blob(blob['sha256'])
+            total -= blob['size']
+            logger.debug(f"Evicted cached object {blob['sha256'][:12]} ({blob['size']} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._conn().execute(
+            'SELECT COUNT(*) AS entries, COUNT(DISTINCT sha256) AS blobs FROM entries'
+        ).fetchone()
+        size = self._conn().execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries GROUP BY sha256)'
+        ).fetchone()[0]
+        return {'entries': row['entries'], 'blobs': row['blobs'], 'bytes': size, 'max_bytes': self.max_bytes}
+
+
+_cache: Optional[StorageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_storage_cache() -> StorageCache:
+    """Get or create the process-wide cache instance"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StorageCache()
+    return _cache
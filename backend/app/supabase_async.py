@@ -0,0 +1,1495 @@
+"""
+Async data-access layer for Supabase (PostgREST, Storage and Auth HTTP APIs).
+
+Every helper in `supabase_client.py` opens a fresh blocking `requests` call,
+which stalls the event loop when used from `async def` FastAPI handlers.
+This module exposes awaitable versions of those helpers, all sharing one
+long-lived `httpx.AsyncClient` (HTTP/2 when available, keep-alive, pooled
+connections, bounded timeouts).
+
+Usage from request handlers:
+
+    from . import supabase_async
+    rows = await supabase_async.get_case(case_id)
+
+Helpers that only exist on top of the supabase-py SDK (phone OTP, admin
+user deletion, ...) are exposed as awaitables that run the sync helper in a
+worker thread, so callers never block the loop either way.
+"""
+import os
+import json
+import base64
+import time
+import random
+import asyncio
+import re
+import logging
+import urllib.parse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from . import supabase_client as _sync
+from .supabase_client import (
+    SUPABASE_URL,
+    SUPABASE_ANON_KEY,
+    SUPABASE_SERVICE_ROLE_KEY,
+    _admin_headers,
+    _postgrest_headers,
+)
+
+logger = logging.getLogger('supabase_async')
+
+# Pool sizing. The client only ever talks to the Supabase project host, so
+# the pool-wide limits below are effectively per-host limits.
+HTTP_MAX_CONNECTIONS = int(os.environ.get('SUPABASE_HTTP_MAX_CONNECTIONS', '100'))
+HTTP_MAX_KEEPALIVE = int(os.environ.get('SUPABASE_HTTP_MAX_KEEPALIVE', '20'))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('SUPABASE_HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('SUPABASE_HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_TIMEOUT = float(os.environ.get('SUPABASE_HTTP_TIMEOUT', '15'))
+HTTP_POOL_TIMEOUT = float(os.environ.get('SUPABASE_HTTP_POOL_TIMEOUT', '10'))
+STORAGE_TIMEOUT = float(os.environ.get('SUPABASE_STORAGE_TIMEOUT', '60'))
+
+# HTTP/2 needs the optional `h2` package (pulled in by httpx[http2])
+try:
+    import h2  # noqa: F401
+    _has_h2 = os.environ.get('SUPABASE_HTTP2', '1') == '1'
+except ImportError:
+    _has_h2 = False
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _retire_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]):
+    """Close a client left behind on another event loop, on that loop.
+
+    Its connections belong to that loop, so aclose() is scheduled there. A
+    loop that is already closed has torn down its transports; the client is
+    just dropped.
+    """
+    if client.is_closed:
+        return
+    if loop is None or loop.is_closed():
+        logger.debug('Dropping Supabase HTTP client of a closed event loop')
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    except RuntimeError as e:
+        logger.debug(f'Could not close the previous Supabase HTTP client: {e}')
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use.
+
+    The client is bound to the running event loop; if it was created on a
+    different loop (scripts calling asyncio.run repeatedly) a new one is made
+    and the old one is closed on its own loop.
+    """
+    global _client, _client_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if _client is None or _client.is_closed or (loop is not None and _client_loop is not loop):
+        if _client is not None:
+            _retire_client(_client, _client_loop)
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            HTTP_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        )
+        _client = httpx.AsyncClient(http2=_has_h2, limits=limits, timeout=timeout)
+        _client_loop = loop
+        logger.info(f'Created shared Supabase HTTP client (http2={_has_h2}, max_connections={HTTP_MAX_CONNECTIONS})')
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client. Call from the application shutdown hook."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info('Closed shared Supabase HTTP client')
+    _client = None
+    _client_loop = None
+
+
+def _require_config(service_role: bool = True):
+    if not SUPABASE_URL or (service_role and not SUPABASE_SERVICE_ROLE_KEY):
+        raise RuntimeError('Supabase config missing')
+
+
+def _rest_url(table: str) -> str:
+    return f"{SUPABASE_URL.rstrip('/')}/rest/v1/{table}"
+
+
+def _storage_public_url(bucket: str, path: str) -> str:
+    return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{bucket}/{urllib.parse.quote(path)}"
+
+
+def _storage_headers(content_type: str = None) -> dict:
+    hdr = {
+        'Authorization': f'Bearer {SUPABASE_SERVICE_ROLE_KEY}',
+        'apikey': SUPABASE_SERVICE_ROLE_KEY,
+    }
+    if content_type:
+        hdr['Content-Type'] = content_type
+    return hdr
+
+
+def _content_range_total(resp: httpx.Response) -> int:
+    """Parse the total from a PostgREST `Content-Range: 0-9/100` header."""
+    content_range = resp.headers.get('Content-Range')
+    if content_range:
+        parts = content_range.split('/')
+        if len(parts) > 1:
+            try:
+                return int(parts[1])
+            except (ValueError, IndexError):
+                pass
+    return 0
+
+
+def _json_or_status(resp: httpx.Response):
+    try:
+        return resp.json()
+    except Exception:
+        return {'status_text': resp.text}
+
+
+def _first(result):
+    return result[0] if isinstance(result, list) and len(result) > 0 else result
+
+
+# ========================================
+# Retries and circuit breaking
+# ========================================
+#
+# Every request goes through a per-endpoint circuit breaker (endpoint =
+# service + first path segment, e.g. "rest/cases" or "auth/user"). After
+# SUPABASE_BREAKER_FAILURES consecutive failures (transport errors or 5xx)
+# the breaker opens and calls fail fast with CircuitOpenError for
+# SUPABASE_BREAKER_RESET_SECONDS; then one trial request is let through.
+# Retries use jittered exponential backoff on asyncio.sleep, so a flaky
+# connection only delays the request that hit it.
+
+RETRY_ATTEMPTS = int(os.environ.get('SUPABASE_RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.environ.get('SUPABASE_RETRY_BASE_DELAY', '0.2'))
+RETRY_MAX_DELAY = float(os.environ.get('SUPABASE_RETRY_MAX_DELAY', '2.0'))
+BREAKER_FAILURES = int(os.environ.get('SUPABASE_BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.environ.get('SUPABASE_BREAKER_RESET_SECONDS', '30'))
+
+_IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+_RETRY_STATUSES = {502, 503, 504}
+# Raised before the request reached the server, so safe to retry for any method
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised without sending when the endpoint's circuit breaker is open.
+
+    Subclasses httpx.TransportError so callers that already treat Supabase
+    as unreachable on transport errors handle it the same way.
+    """
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed."""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURES,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0 or self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = 'half_open'
+            self._trial_in_flight = False
+        if self.state == 'half_open' and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        """Give back the half-open trial slot of a call that ended without an outcome (e.g. cancelled)."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        if self.state != 'closed':
+            logger.info(f'Circuit breaker for {self.name} closed')
+        self.state = 'closed'
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this call tripped the breaker."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failure_threshold > 0 and (
+            self.state == 'half_open' or
+            (self.state == 'closed' and self.failures >= self.failure_threshold)
+        ):
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            logger.warning(f'Circuit breaker for {self.name} opened after {self.failures} failure(s)')
+            return True
+        return False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_metrics: Dict[str, Dict[str, int]] = {}
+
+
+def _endpoint_key(url: str) -> str:
+    """Breaker/metrics key for a Supabase URL, e.g. 'rest/cases' or 'storage/object'."""
+    parts = [p for p in urllib.parse.urlsplit(url).path.split('/') if p]
+    # /rest/v1/<table>, /auth/v1/<resource>, /storage/v1/<resource>/...
+    if len(parts) >= 3 and parts[1].startswith('v'):
+        return f'{parts[0]}/{parts[2]}'
+    return '/'.join(parts[:2]) or 'root'
+
+
+def _breaker(key: str) -> CircuitBreaker:
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = CircuitBreaker(key)
+    return breaker
+
+
+def _count(key: str, metric: str):
+    counters = _metrics.setdefault(key, {'requests': 0, 'retries': 0, 'failures': 0, 'trips': 0, 'rejected': 0})
+    counters[metric] += 1
+
+
+def get_resilience_metrics() -> Dict[str, Any]:
+    """Per-endpoint request/retry/failure/trip counters and breaker states."""
+    return {
+        key: {**counters, 'state': _breakers[key].state if key in _breakers else 'closed'}
+        for key, counters in sorted(_metrics.items())
+    }
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given 0-based retry attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def _is_retryable(method: str, exc: Exception) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, _NOT_SENT_ERRORS):
+        return True
+    return method.upper() in _IDEMPOTENT_METHODS and isinstance(exc, httpx.TransportError)
+
+
+async def request(method: str, url: str, raise_for_status: bool = True, retries: int = None, **kwargs) -> httpx.Response:
+    """Issue a request on the shared client. Raises for non-2xx statuses
+    unless `raise_for_status=False`.
+
+    Transient failures (transport errors, and 502/503/504 for idempotent
+    methods) are retried up to `retries` attempts (default
+    SUPABASE_RETRY_ATTEMPTS). The endpoint's circuit breaker is consulted
+    before each attempt; when it is open CircuitOpenError is raised without
+    sending anything.
+    """
+    key = _endpoint_key(url)
+    breaker = _breaker(key)
+    attempts = max(1, RETRY_ATTEMPTS if retries is None else retries)
+
+    for attempt in range(attempts):
+        if not breaker.allow():
+            _count(key, 'rejected')
+            raise CircuitOpenError(f'Supabase endpoint {key} is unavailable (circuit open)')
+        _count(key, 'requests')
+        last_attempt = attempt >= attempts - 1
+        try:
+            resp = await get_http_client().request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            _count(key, 'failures')
+            if breaker.record_failure():
+                _count(key, 'trips')
+            if last_attempt or not _is_retryable(method, e):
+                raise
+            reason = repr(e)
+        except BaseException:
+            # Cancelled, or failed before reaching Supabase: says nothing about the
+            # endpoint, but a half-open trial must not keep its slot forever
+            breaker.release_trial()
+            raise
+        else:
+            if resp.status_code < 500:
+                # 4xx means Supabase answered; only server/transport errors count against it
+                breaker.record_success()
+            else:
+                _count(key, 'failures')
+                if breaker.record_failure():
+                    _count(key, 'trips')
+            retry = (
+                resp.status_code in _RETRY_STATUSES
+                and method.upper() in _IDEMPOTENT_METHODS
+                and not last_attempt
+            )
+            if not retry:
+                if raise_for_status:
+                    resp.raise_for_status()
+                return resp
+            reason = f'HTTP {resp.status_code}'
+
+        delay = _backoff_delay(attempt)
+        _count(key, 'retries')
+        logger.warning(f'{method} {key} failed on attempt {attempt + 1}/{attempts}: {reason}. Retrying in {delay:.2f}s')
+        await asyncio.sleep(delay)
+
+
+async def postgrest_get(table: str, params=None, headers: dict = None) -> list:
+    """GET rows from a PostgREST table/view."""
+    resp = await request('GET', _rest_url(table), params=params, headers=headers or _postgrest_headers())
+    return resp.json()
+
+
+async def postgrest_get_with_count(table: str, params=None, count: Optional[str] = 'exact') -> dict:
+    """GET rows plus the total count reported in Content-Range.
+
+    `count` is a PostgREST count mode ('exact', 'planned', 'estimated'); with
+    None no count is requested and `total` is None.
+    """
+    headers = _postgrest_headers()
+    if count:
+        headers['Prefer'] = f'count={count}'
+    else:
+        headers.pop('Prefer', None)
+    resp = await request('GET', _rest_url(table), params=params, headers=headers)
+    return {'rows': resp.json(), 'total': _content_range_total(resp) if count else None}
+
+
+# ========================================
+# Keyset pagination
+# ========================================
+#
+# Listing endpoints page on their sort key (e.g. created_at, id) instead of
+# OFFSET, so page N costs the same index range scan as page 1. The position
+# is handed to clients as an opaque cursor: base64url of the last row's key
+# values.
+
+COUNT_MODES = ('exact', 'planned', 'estimated')
+
+
+class PaginationError(ValueError):
+    """Invalid pagination input (undecodable cursor, unknown count mode)."""
+
+
+def count_mode(value: Optional[str]) -> Optional[str]:
+    """Normalize a `count` query param; 'none' (or empty) disables counting."""
+    if not value or value == 'none':
+        return None
+    if value not in COUNT_MODES:
+        raise PaginationError('invalid_count_mode')
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise PaginationError('invalid_cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError('invalid_cursor')
+    return values
+
+
+def _quote(value) -> str:
+    """Quote a value for a PostgREST logic tree (`or=(...)`)."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def keyset_filter(columns: List[str], values: list) -> str:
+    """`and=` expression selecting rows after `values` in `columns DESC NULLS FIRST` order.
+
+    For (a, b, c) this is a < va OR (a = va AND b < vb) OR (a = va AND b = vb AND c < vc).
+    A NULL cursor value compares with `is.null`, and everything non-NULL comes
+    after it; `lt` never matches NULLs, which sort before any value.
+    """
+    def same(column, value):
+        return f'{column}.is.null' if value is None else f'{column}.eq.{_quote(value)}'
+
+    def after(column, value):
+        return f'{column}.not.is.null' if value is None else f'{column}.lt.{_quote(value)}'
+
+    branches = []
+    for i, column in enumerate(columns):
+        conds = [same(columns[j], values[j]) for j in range(i)]
+        conds.append(after(column, values[i]))
+        branches.append(conds[0] if len(conds) == 1 else f"and({','.join(conds)})")
+    return f"(or({','.join(branches)}))"
+
+
+async def postgrest_page(
+    table: str,
+    params=None,
+    key_columns: List[str] = None,
+    limit: int = 50,
+    cursor: str = None,
+    offset: int = 0,
+    count: Optional[str] = 'exact',
+) -> dict:
+    """Fetch one page of `table` ordered by `key_columns` (all descending).
+
+    With a cursor the page starts right after the cursor row (offset is
+    ignored); without one it starts at `offset`, so existing offset-based
+    clients keep working and can switch to `next_cursor` from any page.
+
+    The total is only counted on offset pages: under a cursor it would count
+    just the remaining rows, and skipping it keeps deep pages as cheap as the
+    first. Clients should keep the total from their first page.
+
+    Returns {'rows', 'total', 'next_cursor'}; next_cursor is None on the
+    last page and total is None when not counted.
+    """
+    key_columns = key_columns or ['created_at', 'id']
+    if isinstance(params, dict):
+        params = list(params.items())
+    params = [p for p in (params or []) if p[0] not in ('order', 'limit', 'offset')]
+    params.append(('order', ','.join(f'{c}.desc.nullsfirst' for c in key_columns)))
+    # One extra row tells us whether another page exists
+    params.append(('limit', str(limit + 1)))
+    if cursor:
+        params.append(('and', keyset_filter(key_columns, decode_cursor(cursor, len(key_columns)))))
+    elif offset:
+        params.append(('offset', str(offset)))
+
+    page = await postgrest_get_with_count(table, params, count=None if cursor else count)
+    rows = page['rows']
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].get(c) for c in key_columns])
+    return {'rows': rows, 'total': page['total'], 'next_cursor': next_cursor}
+
+
+async def postgrest_rpc(function: str, args: dict = None) -> Any:
+    """Call a Postgres function exposed through PostgREST (`/rest/v1/rpc/<fn>`)."""
+    resp = await request('POST', _rest_url(f'rpc/{function}'), json=args or {}, headers=_postgrest_headers())
+    return _json_or_status(resp)
+
+
+# ========================================
+# Auth
+# ========================================
+
+async def create_auth_user(email: str, password: str, phone: str = None, email_confirm: bool = True) -> dict:
+    """Async version of `supabase_client.create_auth_user`."""
+    _require_config()
+    url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/admin/users"
+    payload = {'email': email, 'password': password}
+    if phone and phone.strip():
+        payload['phone'] = phone.strip()
+    if email_confirm:
+        payload['email_confirm'] = True
+    try:
+        resp = await request('POST', url, headers=_admin_headers(), json=payload)
+        logger.info(f"Created auth user for {email} (email_confirm={email_confirm})")
+        return resp.json()
+    except httpx.HTTPStatusError as e:
+        error_detail = None
+        try:
+            error_body = e.response.json()
+            if error_body.get('error_code', '') == 'email_exists':
+                error_detail = f'email_exists: {email}'
+            elif error_body.get('msg', ''):
+                error_detail = error_body.get('msg')
+        except Exception:
+            error_detail = e.response.text
+        logger.error(f'Failed to create auth user: {e.response.status_code} - {error_detail}')
+        raise ValueError(f'Failed to create auth user: {error_detail}')
+
+
+async def sign_in(email: str, password: str) -> dict:
+    """Async version of `supabase_client.sign_in` (password grant over HTTP)."""
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise RuntimeError('Supabase config missing')
+    url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/token"
+    headers = {
+        'apikey': SUPABASE_ANON_KEY,
+        'Authorization': f'Bearer {SUPABASE_ANON_KEY}',
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'Accept': 'application/json'
+    }
+    data = {'grant_type': 'password', 'username': email, 'password': password}
+    try:
+        resp = await request('POST', url, headers=headers, data=data)
+        return resp.json()
+    except Exception:
+        logger.exception('Failed to sign in')
+        raise
+
+
+async def get_user_from_token(access_token: str) -> dict:
+    """Return the Supabase auth user object for a bearer token."""
+    if not SUPABASE_URL:
+        raise RuntimeError('Supabase config missing')
+    url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/user"
+    headers = {'Authorization': f'Bearer {access_token}', 'apikey': SUPABASE_ANON_KEY}
+    resp = await request('GET', url, raise_for_status=False, headers=headers)
+    if resp.status_code in (403, 404) and resp.headers.get('x-sb-error-code') == 'user_not_found':
+        # The JWT's `sub` user id does not exist in auth.users
+        raise ValueError('user_not_found')
+    if resp.status_code >= 400:
+        logger.warning(f"get_user_from_token HTTP {resp.status_code} x-sb-error-code={resp.headers.get('x-sb-error-code')}")
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def logout_token(access_token: str) -> dict:
+    """Async version of `supabase_client.logout_token`. Never fails the caller."""
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise RuntimeError('Supabase config missing')
+    url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/logout"
+    headers = {'Authorization': f'Bearer {access_token}', 'apikey': SUPABASE_ANON_KEY}
+    try:
+        resp = await request('POST', url, raise_for_status=False, headers=headers)
+        if resp.status_code in (401, 403):
+            logger.info(f"Token already invalid/expired (status {resp.status_code}), treating logout as successful")
+        elif resp.status_code >= 400:
+            logger.error(f"Failed to logout: HTTP {resp.status_code}")
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to logout: {e}")
+    return {'status': 'ok'}
+
+
+async def refresh_session(refresh_token: str) -> dict:
+    """Refresh an access token using a refresh token via the token endpoint."""
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise RuntimeError('Supabase config missing')
+    url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/token"
+    headers = {'apikey': SUPABASE_ANON_KEY, 'Content-Type': 'application/x-www-form-urlencoded'}
+    data = {'grant_type': 'refresh_token', 'refresh_token': refresh_token}
+    try:
+        resp = await request('POST', url, headers=headers, data=data)
+        result = resp.json()
+        return {
+            'access_token': result.get('access_token'),
+            'refresh_token': result.get('refresh_token'),
+            'user': result.get('user'),
+            'expires_in': result.get('expires_in')
+        }
+    except Exception:
+        logger.exception('Failed to refresh token')
+        raise
+
+
+async def send_password_reset(email: str) -> dict:
+    """Trigger Supabase password recovery email (recover endpoint)."""
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise RuntimeError('Supabase config missing')
+    url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/recover"
+    headers = {'apikey': SUPABASE_ANON_KEY, 'Content-Type': 'application/json'}
+    try:
+        await request('POST', url, headers=headers, json={'email': email})
+        return {'status': 'ok'}
+    except Exception:
+        logger.exception('Failed to request password reset')
+        raise
+
+
+# ========================================
+# user_profile
+# ========================================
+
+async def get_profile_by_user_id(user_id: str) -> list:
+    """Fetch user_profile rows matching a given user_id."""
+    try:
+        return await postgrest_get('user_profile', {'user_id': f'eq.{user_id}'})
+    except Exception:
+        logger.exception('Failed to fetch profile by user_id')
+        raise
+
+
+async def get_profile_by_email(email: str) -> list:
+    """Fetch user_profile rows matching a given email."""
+    try:
+        return await postgrest_get('user_profile', {'email': f'eq.{email}'})
+    except Exception:
+        logger.exception('Failed to fetch profile by email')
+        raise
+
+
+async def get_profile_by_phone(phone: str) -> list:
+    """Fetch user_profile rows matching a given phone number."""
+    try:
+        return await postgrest_get('user_profile', {'phone': f'eq.{phone}'})
+    except Exception:
+        logger.exception('Failed to fetch profile by phone')
+        raise
+
+
+def _invalidate_profile_cache(user_id: str):
+    """Drop jwt_auth's cached copy of a profile after writing it."""
+    from . import jwt_auth
+    jwt_auth.invalidate_profile(user_id)
+
+
+async def _patch_profile(filter_qs: str, body: dict, timeout: float = None):
+    url = f"{_rest_url('user_profile')}?{filter_qs}"
+    kwargs = {'timeout': timeout} if timeout else {}
+    try:
+        resp = await request('PATCH', url, headers=_postgrest_headers(), json=body, **kwargs)
+        return _json_or_status(resp)
+    finally:
+        if filter_qs.startswith('user_id=eq.'):
+            _invalidate_profile_cache(filter_qs[len('user_id=eq.'):])
+        if body.get('user_id'):
+            _invalidate_profile_cache(body['user_id'])
+
+
+async def update_onboarding_state(user_id: str, onboarding_state: dict) -> dict:
+    """Patch the onboarding_state JSONB on the user_profile for the given user_id."""
+    try:
+        return await _patch_profile(f'user_id=eq.{user_id}', {'onboarding_state': json.dumps(onboarding_state)})
+    except Exception:
+        logger.exception('Failed to update onboarding state')
+        raise
+
+
+async def update_user_profile_fields(user_id: str, fields: dict) -> dict:
+    """Patch arbitrary columns on user_profile for the given user_id."""
+    if not user_id or not fields:
+        return {}
+    try:
+        return await _patch_profile(f'user_id=eq.{user_id}', fields)
+    except Exception:
+        logger.exception('Failed to update user_profile fields for user_id=%s', user_id)
+        raise
+
+
+async def mark_profile_verified_by_email(email: str) -> dict:
+    """Mark the profile as verified without checking OTP. (Dev/testing helper)"""
+    _require_config()
+    try:
+        return await _patch_profile(f'email=eq.{email}', {'verified': True, 'email_otp': None})
+    except Exception:
+        logger.exception('Failed to mark profile verified (dev)')
+        raise
+
+
+async def verify_profile_otp(email: str, otp: str) -> dict:
+    """Verify OTP stored in user_profile and mark verified."""
+    profiles = await get_profile_by_email(email)
+    if not profiles:
+        raise ValueError('profile_not_found')
+    profile = profiles[0]
+    if profile.get('email_otp') != otp:
+        raise ValueError('invalid_otp')
+    expires = profile.get('otp_expires_at')
+    if expires and datetime.utcnow() > datetime.fromisoformat(expires):
+        raise ValueError('otp_expired')
+    try:
+        return await _patch_profile(f'email=eq.{email}', {'verified': True, 'email_otp': None})
+    except Exception:
+        logger.exception('Failed to mark profile verified')
+        raise
+
+
+async def update_profile_otp(email: str, otp: str, otp_expires_at: datetime) -> dict:
+    """Update the OTP and expiry for a profile (used for resend)."""
+    _require_config()
+    try:
+        return await _patch_profile(f'email=eq.{email}', {'email_otp': otp, 'otp_expires_at': otp_expires_at.isoformat()})
+    except Exception:
+        logger.exception('Failed to update profile OTP')
+        raise
+
+
+async def update_profile_user_id(email: str, user_id: str) -> dict:
+    """Set the Supabase auth user_id on a profile after creating the auth user."""
+    _require_config()
+    try:
+        return await _patch_profile(f'email=eq.{email}', {'user_id': user_id})
+    except Exception:
+        logger.exception('Failed to update profile user_id')
+        raise
+
+
+async def admin_update_profile(user_id: str, fields: dict) -> dict:
+    """Patch the user_profile row for a given user_id."""
+    _require_config()
+    try:
+        return await _patch_profile(f'user_id=eq.{user_id}', fields)
+    except Exception:
+        logger.exception('Failed to update profile')
+        raise
+
+
+async def update_subadmin_permissions(user_id: str, permissions: dict) -> dict:
+    """Update subadmin permissions in admin_permissions JSONB column."""
+    _require_config()
+    try:
+        await _patch_profile(f'user_id=eq.{user_id}', {'admin_permissions': permissions})
+        return {'status': 'ok'}
+    except Exception:
+        logger.exception(f'Failed to update subadmin permissions for {user_id}')
+        raise
+
+
+async def delete_user_profile(user_id: str) -> dict:
+    """Delete a user profile from user_profile table."""
+    _require_config()
+    url = f"{_rest_url('user_profile')}?user_id=eq.{user_id}"
+    resp = await request('DELETE', url, raise_for_status=False, headers=_postgrest_headers())
+    _invalidate_profile_cache(user_id)
+    if resp.status_code in (200, 204, 404):
+        return {'status': 'ok', 'status_code': resp.status_code}
+    resp.raise_for_status()
+    return {'status': 'ok', 'status_code': resp.status_code}
+
+
+async def admin_list_profiles(limit: int = 100) -> list:
+    """Return up to `limit` user_profile rows for admin dashboards."""
+    _require_config()
+    try:
+        return await postgrest_get('user_profile', {'select': '*', 'order': 'created_at.desc', 'limit': str(limit)})
+    except Exception:
+        logger.exception('Failed to list profiles for admin')
+        return []
+
+
+async def admin_list_users(limit: int = 100) -> list:
+    """List regular users (exclude admin/superadmin/subadmin)."""
+    _require_config()
+    params = {'select': '*', 'or': '(role.is.null,role.not.in.(admin,superadmin,subadmin))', 'limit': str(limit)}
+    try:
+        return await postgrest_get('user_profile', params)
+    except Exception:
+        logger.exception('Failed to list regular users')
+        return []
+
+
+async def admin_list_subadmins(limit: int = 100) -> list:
+    """List subadmin profiles (role = 'subadmin')."""
+    _require_config()
+    try:
+        return await postgrest_get('user_profile', {'select': '*', 'role': 'eq.subadmin', 'limit': str(limit)})
+    except Exception:
+        logger.exception('Failed to list subadmins')
+        return []
+
+
+async def get_admin_user_ids() -> list:
+    """Get all admin/superadmin user_ids for notifications."""
+    _require_config()
+    params = {
+        'select': 'user_id',
+        'or': '(role.eq.admin,role.eq.superadmin,is_admin.eq.true,is_superadmin.eq.true)',
+        'limit': '100'
+    }
+    try:
+        rows = await postgrest_get('user_profile', params)
+        return [row['user_id'] for row in rows if row.get('user_id')]
+    except Exception:
+        logger.exception('Failed to get admin user_ids')
+        return []
+
+
+# ========================================
+# user_eligibility
+# ========================================
+
+async def get_user_eligibilities(user_id: str) -> list:
+    """Fetch eligibility audit rows for user_id from user_eligibility."""
+    try:
+        return await postgrest_get('user_eligibility', {'user_id': f'eq.{user_id}'})
+    except Exception:
+        logger.exception('Failed to fetch user eligibilities')
+        raise
+
+
+async def get_user_eligibility(user_id: str = None, case_id: str = None) -> list:
+    """Retrieve eligibility records, newest first, filtered by user_id and/or case_id."""
+    _require_config()
+    params = {'order': 'processed_at.desc'}
+    if user_id:
+        params['user_id'] = f'eq.{user_id}'
+    if case_id:
+        params['case_id'] = f'eq.{case_id}'
+    try:
+        return await postgrest_get('user_eligibility', params)
+    except Exception:
+        logger.exception('Failed to get user_eligibility records')
+        return []
+
+
+async def update_user_eligibility(record_id: str, fields: dict) -> dict:
+    """Update a user_eligibility record with new field values."""
+    _require_config()
+    body = {}
+    for key, value in fields.items():
+        if key == 'eligibility_raw' and isinstance(value, dict):
+            body[key] = json.dumps(value)
+        else:
+            body[key] = value
+    try:
+        resp = await request('PATCH', _rest_url('user_eligibility'), params={'id': f'eq.{record_id}'},
+                             headers=_postgrest_headers(), json=body)
+        return _first(resp.json())
+    except Exception:
+        logger.exception(f'Failed to update user_eligibility record {record_id}')
+        raise
+
+
+# ========================================
+# cases
+# ========================================
+
+async def create_case(user_id: str, title: str = None, description: str = None, metadata: dict = None) -> dict:
+    """Create a new case row for the given user_id."""
+    _require_config()
+    body = {'user_id': user_id, 'title': title, 'description': description}
+    if metadata is not None:
+        try:
+            body['metadata'] = json.dumps(metadata)
+        except Exception:
+            body['metadata'] = None
+    try:
+        resp = await request('POST', _rest_url('cases'), headers=_postgrest_headers(), json=body)
+        logger.info(f"Created case for user_id={user_id}")
+        return resp.json()
+    except Exception:
+        logger.exception('Failed to create case')
+        raise
+
+
+async def get_case(case_id: str) -> list:
+    """Fetch a case by id. Returns list (PostgREST returns array)."""
+    try:
+        return await postgrest_get('cases', {'id': f'eq.{case_id}'})
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            logger.warning(f'cases table not found (404) when fetching case_id={case_id}; returning empty list')
+            return []
+        logger.exception('Failed to fetch case')
+        raise
+    except Exception:
+        logger.exception('Failed to fetch case')
+        raise
+
+
+async def list_cases_for_user(user_id: str) -> list:
+    """List case rows for a given user_id."""
+    try:
+        return await postgrest_get('cases', {'user_id': f'eq.{user_id}'})
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            logger.warning(f'cases table not found (404) when listing cases for user_id={user_id}; returning empty list')
+            return []
+        logger.exception('Failed to list cases for user')
+        raise
+    except Exception:
+        logger.exception('Failed to list cases for user')
+        raise
+
+
+async def list_all_cases_paginated(limit: int = 10, offset: int = 0, filters: dict = None, search: str = None,
+                                   cursor: str = None, count: Optional[str] = 'exact') -> dict:
+    """List all cases with pagination and filters (newest first, keyset on created_at, id)."""
+    params = {}
+    if filters:
+        params.update(filters)
+    if search:
+        params['or'] = f'title.ilike.*{search}*,id.ilike.*{search}*'
+    try:
+        page = await postgrest_page('cases', params, ['created_at', 'id'], limit=limit,
+                                    cursor=cursor, offset=offset, count=count)
+        return {'cases': page['rows'], 'total': page['total'], 'next_cursor': page['next_cursor']}
+    except PaginationError:
+        raise
+    except Exception:
+        logger.exception('Failed to list all cases paginated')
+        return {'cases': [], 'total': 0, 'next_cursor': None}
+
+
+async def update_case(case_id: str, fields: dict) -> dict:
+    """Update a case row by id with provided fields."""
+    _require_config()
+    logger.info(f"[DB] Updating case {case_id} with fields: {list(fields.keys())}")
+    url = f"{_rest_url('cases')}?id=eq.{case_id}"
+    try:
+        resp = await request('PATCH', url, headers=_postgrest_headers(), json=fields)
+        result = resp.json()
+        return _first(result) if result else {}
+    except Exception as e:
+        logger.exception(f'[DB] ❌ Failed to update case: {e}')
+        raise
+
+
+async def patch_case_json(case_id: str, column: str, ops: list, return_path=None, touch: bool = False):
+    """Async version of `supabase_client.patch_case_json` (atomic JSONB patch, migration 020)."""
+    _require_config()
+    normalized = [{**op, 'path': _sync._json_path(op.get('path'))} for op in ops]
+    return await postgrest_rpc('case_jsonb_patch', {
+        'p_case_id': case_id,
+        'p_column': column,
+        'p_ops': normalized,
+        'p_return_path': _sync._json_path(return_path) if return_path is not None else None,
+        'p_touch': touch,
+    })
+
+
+async def case_json_append(case_id: str, column: str, path, items: list, unique_key: str = None) -> list:
+    """Async version of `supabase_client.case_json_append`."""
+    _require_config()
+    result = await postgrest_rpc('case_jsonb_append', {
+        'p_case_id': case_id, 'p_column': column, 'p_path': _sync._json_path(path),
+        'p_items': items, 'p_unique_key': unique_key,
+    })
+    return result or []
+
+
+async def case_json_update_element(case_id: str, column: str, path, match_key: str, match_value, patch: dict):
+    """Async version of `supabase_client.case_json_update_element`."""
+    _require_config()
+    return await postgrest_rpc('case_jsonb_update_element', {
+        'p_case_id': case_id, 'p_column': column, 'p_path': _sync._json_path(path),
+        'p_match_key': match_key, 'p_match_value': match_value, 'p_patch': patch,
+    })
+
+
+async def delete_case(case_id: str) -> dict:
+    """Delete a case by id."""
+    _require_config()
+    try:
+        await request('DELETE', f"{_rest_url('cases')}?id=eq.{case_id}", headers=_postgrest_headers())
+        return {'status': 'ok'}
+    except Exception:
+        logger.exception('Failed to delete case')
+        raise
+
+
+async def _list_rows_for_users(table: str, user_ids: List[str], order: str = None, select: str = '*') -> Dict[str, list]:
+    """Fetch rows of `table` for many users in one `user_id=in.(...)` query, grouped by user_id."""
+    grouped: Dict[str, list] = {uid: [] for uid in user_ids if uid}
+    if not grouped:
+        return grouped
+    params = {'user_id': f"in.({','.join(grouped.keys())})", 'select': select}
+    if order:
+        params['order'] = order
+    for row in await postgrest_get(table, params):
+        grouped.setdefault(row.get('user_id'), []).append(row)
+    return grouped
+
+
+async def list_cases_for_users(user_ids: List[str], order: str = 'created_at.desc') -> Dict[str, list]:
+    """Fetch cases for many users in one `user_id=in.(...)` query.
+
+    Returns a dict mapping user_id -> list of case rows (in `order`).
+    """
+    return await _list_rows_for_users('cases', user_ids, order)
+
+
+async def list_profiles_with_cases(
+    limit: int = 200,
+    offset: int = 0,
+    profile_filter: str = None,
+    cases_limit: int = None,
+    embed: str = None,
+    embed_params: dict = None,
+    count: Optional[str] = 'exact',
+    cursor: str = None,
+) -> dict:
+    """Page through user_profile rows with their cases attached.
+
+    Uses PostgREST resource embedding (`select=*,cases(*)`) so the whole page
+    is one round trip. If a relationship cannot be embedded (PostgREST
+    returns 400, e.g. schema cache not refreshed, or 300 when it is
+    ambiguous) it falls back to one `user_id=in.(...)` fetch per embedded
+    table, merged in memory. Extra `embed` resources must therefore be
+    tables with a user_id column, e.g. 'user_eligibility!hint(cols)'.
+
+    Args:
+        profile_filter: PostgREST `or=` expression applied to user_profile
+        cases_limit: Max cases embedded per profile (newest first)
+        embed: Extra embedded resources appended to the select list
+        embed_params: Extra query params for the embedded resources
+            (e.g. {'user_eligibility.limit': '1'})
+        count: PostgREST count mode for the profile total (None to skip)
+        cursor: Keyset cursor from a previous page's `next_cursor`
+
+    Returns:
+        {'profiles': [... each with a 'cases' list ...], 'total': int, 'next_cursor': str}
+    """
+    params = {
+        'select': '*,cases(*)' + (f',{embed}' if embed else ''),
+        'cases.order': 'created_at.desc',
+    }
+    if cases_limit:
+        params['cases.limit'] = str(cases_limit)
+    if profile_filter:
+        params['or'] = profile_filter
+    if embed_params:
+        params.update(embed_params)
+
+    async def _page(page_params):
+        return await postgrest_page('user_profile', page_params, ['created_at', 'id'], limit=limit,
+                                    cursor=cursor, offset=offset, count=count)
+
+    try:
+        page = await _page(params)
+        return {'profiles': page['rows'], 'total': page['total'], 'next_cursor': page['next_cursor']}
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code not in (300, 400):
+            raise
+        logger.warning(f'embedding unavailable ({e.response.text[:200]}); falling back to batched in.() fetches')
+
+    # (name, columns, order, limit) of every embedded resource
+    embedded = [('cases', '*', 'created_at.desc', cases_limit)]
+    for name, columns in re.findall(r'(\w+)(?:!\w+)?\(([^()]*)\)', embed or ''):
+        limit_param = (embed_params or {}).get(f'{name}.limit')
+        embedded.append((name, columns, (embed_params or {}).get(f'{name}.order'), int(limit_param) if limit_param else None))
+    params = {k: v for k, v in params.items() if not any(k.startswith(f'{name}.') for name, *_ in embedded)}
+    params['select'] = '*'
+    page = await _page(params)
+    profiles = page['rows']
+    user_ids = [p.get('user_id') for p in profiles]
+    for name, columns, order, limit_per_user in embedded:
+        select = columns if columns.strip() == '*' else f'{columns},user_id'
+        grouped = await _list_rows_for_users(name, user_ids, order, select)
+        for profile in profiles:
+            rows = grouped.get(profile.get('user_id'), [])
+            profile[name] = rows[:limit_per_user] if limit_per_user else rows
+    return {'profiles': profiles, 'total': page['total'], 'next_cursor': page['next_cursor']}
+
+
+async def list_claims_table(limit: int = 200, offset: int = 0, count: Optional[str] = 'exact', cursor: str = None) -> dict:
+    """Page through the `admin_claims_table` view (migration 016) in one request.
+
+    Rows are already flat: products, ai_score and estimated_claim_amount are
+    computed by the database, so no JSON parsing is needed here. Ordered by
+    client (newest profile first), then case, with a keyset cursor on
+    (profile_created_at, created_at, case_id).
+    """
+    page = await postgrest_page('admin_claims_table', {'select': '*'},
+                                ['profile_created_at', 'created_at', 'case_id'],
+                                limit=limit, cursor=cursor, offset=offset, count=count)
+    return page
+
+
+async def list_work_disability_cases(limit: int = 20, offset: int = 0, count: Optional[str] = 'exact', cursor: str = None) -> dict:
+    """Cases whose call_summary products include 'Work Disability', newest first.
+
+    Filters in the database on the `admin_case_filter` view (migration 017)
+    so pages are full and ordered on the (created_at, case_id) index.
+    """
+    params = {
+        'select': 'case_id,user_id,client_name,client_email,client_phone,status,ai_score,'
+                  'estimated_claim_amount,created_at,updated_at',
+        'products': 'cs.["Work Disability"]',
+    }
+    return await postgrest_page('admin_case_filter', params, ['created_at', 'case_id'],
+                                limit=limit, cursor=cursor, offset=offset, count=count)
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards in user input (`*` is PostgREST's wildcard alias)."""
+    value = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return value.replace('*', '')
+
+
+def build_case_filter_params(filter_params) -> list:
+    """Compile a `CaseFilterRequest` into PostgREST query params for `admin_case_filter`.
+
+    Every condition is ANDed and maps to an indexed column added in
+    migration 017. Returned as a list of tuples because the same column
+    may appear twice (e.g. ai_score gte and lte).
+    """
+    params = []
+    if filter_params.status:
+        status_list = ','.join(f'"{s}"' for s in filter_params.status)
+        params.append(('status', f'in.({status_list})'))
+    if filter_params.start_date:
+        params.append(('created_at', f'gte.{filter_params.start_date.isoformat()}'))
+    if filter_params.end_date:
+        params.append(('updated_at', f'lte.{filter_params.end_date.isoformat()}'))
+    if filter_params.min_ai_score is not None:
+        params.append(('ai_score', f'gte.{filter_params.min_ai_score}'))
+    if filter_params.max_ai_score is not None:
+        params.append(('ai_score', f'lte.{filter_params.max_ai_score}'))
+    if filter_params.min_income_potential is not None:
+        params.append(('estimated_claim_amount', f'gte.{filter_params.min_income_potential}'))
+    if filter_params.max_income_potential is not None:
+        params.append(('estimated_claim_amount', f'lte.{filter_params.max_income_potential}'))
+    if filter_params.search_query and filter_params.search_query.strip():
+        term = _escape_like(filter_params.search_query.strip().lower())
+        params.append(('search_text', f'ilike.*{term}*'))
+    return params
+
+
+async def filter_cases(filter_params, count: str = 'exact') -> dict:
+    """Run a `CaseFilterRequest` as one query against the `admin_case_filter` view."""
+    params = build_case_filter_params(filter_params)
+    params += [
+        ('select', 'case_id,user_id,client_name,client_email,client_phone,status,ai_score,'
+                   'eligibility_status,estimated_claim_amount,created_at,updated_at,products,risk_assessment'),
+        ('order', 'created_at.desc,case_id.desc'),
+        ('limit', str(filter_params.limit)),
+        ('offset', str(filter_params.offset)),
+    ]
+    page = await postgrest_get_with_count('admin_case_filter', params, count=count)
+    return {'rows': page['rows'], 'total': page['total']}
+
+
+async def case_rollup_summary(start_day, end_day) -> dict:
+    """Aggregated case stats for UTC days in [start_day, end_day) from the
+    daily rollup tables (migration 018).
+
+    Returns `{'statuses': [...], 'products': {product: count}}`; each status
+    entry carries case_count plus claim / AI score / processing-day totals.
+    """
+    result = await postgrest_rpc('case_rollup_summary', {
+        'p_from': start_day.isoformat(),
+        'p_to': end_day.isoformat(),
+    })
+    if not isinstance(result, dict):
+        return {'statuses': [], 'products': {}}
+    return {'statuses': result.get('statuses') or [], 'products': result.get('products') or {}}
+
+
+async def admin_list_cases(limit: int = 100) -> list:
+    """Return up to `limit` cases for admin dashboards."""
+    _require_config()
+    try:
+        return await postgrest_get('cases', {'select': '*', 'order': 'created_at.desc', 'limit': str(limit)})
+    except Exception:
+        logger.exception('Failed to list cases for admin')
+        return []
+
+
+# ========================================
+# Notifications
+# ========================================
+
+async def create_notification(user_id: str, notification_type: str, title: str, message: str = '', data: dict = None) -> dict:
+    """Create a notification for a user."""
+    _require_config()
+    body = {
+        'user_id': user_id,
+        'type': notification_type,
+        'title': title,
+        'message': message or '',
+        'data': data or {},
+        'read': False
+    }
+    try:
+        resp = await request('POST', _rest_url('notifications'), headers=_postgrest_headers(), json=body)
+        return _first(resp.json())
+    except Exception:
+        logger.exception('Failed to create notification')
+        raise
+
+
+async def list_notifications(user_id: str, limit: int = 50, unread_only: bool = False) -> list:
+    """List notifications for a user."""
+    _require_config()
+    params = {'select': '*', 'user_id': f'eq.{user_id}', 'order': 'created_at.desc', 'limit': str(limit)}
+    if unread_only:
+        params['read'] = 'eq.false'
+    try:
+        return await postgrest_get('notifications', params)
+    except Exception:
+        logger.exception('Failed to list notifications')
+        return []
+
+
+async def mark_notification_read(notification_id: str, read: bool = True) -> dict:
+    """Mark a notification as read/unread."""
+    _require_config()
+    url = f"{_rest_url('notifications')}?id=eq.{notification_id}"
+    try:
+        resp = await request('PATCH', url, headers=_postgrest_headers(), json={'read': read})
+        return _first(resp.json())
+    except Exception:
+        logger.exception('Failed to mark notification read')
+        raise
+
+
+# ========================================
+# Storage
+# ========================================
+
+async def storage_upload_file(bucket: str, path: str, file_bytes: bytes, content_type: str = 'application/octet-stream', upsert: bool = True) -> dict:
+    """Upload bytes to Supabase Storage. Returns a dict with `public_url`."""
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        raise RuntimeError('Supabase storage config missing')
+    norm_path = path.lstrip('/')
+    upsert_qs = 'true' if upsert else 'false'
+    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{norm_path}?upsert={upsert_qs}"
+    try:
+        resp = await request('PUT', url, raise_for_status=False, headers=_storage_headers(content_type), content=file_bytes, timeout=STORAGE_TIMEOUT)
+        if resp.status_code not in (200, 201, 204):
+            logger.warning(f'storage upload HTTP status={resp.status_code} text={resp.text}')
+            if 'Bucket not found' in resp.text:
+                raise RuntimeError('bucket_not_found')
+            resp.raise_for_status()
+        return {'public_url': _storage_public_url(bucket, norm_path), 'http_status': resp.status_code}
+    except Exception:
+        logger.exception('Failed to upload file to Supabase Storage')
+        raise
+
+
+async def storage_create_signed_upload_url(bucket: str, path: str, upsert: bool = False) -> dict:
+    """Create a signed URL the client can PUT the object to directly.
+
+    Returns {'signed_url', 'token', 'path'}. Supabase keeps these valid for
+    two hours.
+    """
+    _require_config()
+    norm_path = path.lstrip('/')
+    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/upload/sign/{bucket}/{urllib.parse.quote(norm_path)}"
+    headers = _storage_headers('application/json')
+    if upsert:
+        headers['x-upsert'] = 'true'
+    try:
+        resp = await request('POST', url, raise_for_status=False, headers=headers, json={})
+        if resp.status_code not in (200, 201):
+            logger.warning(f'storage sign upload HTTP status={resp.status_code} text={resp.text}')
+            if 'Bucket not found' in resp.text:
+                raise RuntimeError('bucket_not_found')
+            resp.raise_for_status()
+        signed = resp.json().get('url', '')
+        token = urllib.parse.parse_qs(urllib.parse.urlparse(signed).query).get('token', [None])[0]
+        return {
+            'signed_url': f"{SUPABASE_URL.rstrip('/')}/storage/v1{signed}",
+            'token': token,
+            'path': norm_path,
+        }
+    except Exception:
+        logger.exception(f'Failed to create signed upload URL for {bucket}/{norm_path}')
+        raise
+
+
+async def storage_object_info(bucket: str, path: str) -> Optional[dict]:
+    """Size and content type of a stored object, or None if it does not exist."""
+    _require_config()
+    norm_path = path.lstrip('/')
+    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{urllib.parse.quote(norm_path)}"
+    resp = await request('HEAD', url, raise_for_status=False, headers=_storage_headers())
+    if resp.status_code in (400, 404):
+        return None
+    resp.raise_for_status()
+    size = resp.headers.get('Content-Length')
+    return {
+        'size': int(size) if size is not None else None,
+        'content_type': resp.headers.get('Content-Type'),
+        'etag': resp.headers.get('ETag'),
+    }
+
+
+async def storage_delete_file(bucket: str, path: str) -> dict:
+    """Delete a file from Supabase Storage."""
+    norm_path = path.lstrip('/')
+    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{norm_path}"
+    try:
+        resp = await request('DELETE', url, headers=_storage_headers())
+        return {'status': 'deleted', 'path': norm_path, 'http_status': resp.status_code}
+    except Exception:
+        logger.exception(f'Failed to delete file from storage: {bucket}/{path}')
+        raise
+
+
+# ========================================
+# Case Document Management
+# ========================================
+
+async def insert_case_document(case_id: str, file_path: str, file_name: str, file_type: str = None,
+                               file_size: int = None, document_type: str = 'general',
+                               uploaded_by: str = None, metadata: dict = None,
+                               storage_bucket: str = 'case-documents') -> dict:
+    """Insert a document record into case_documents table."""
+    body = {
+        'case_id': case_id,
+        'file_path': file_path,
+        'storage_bucket': storage_bucket,
+        'file_name': file_name,
+        'file_type': file_type,
+        'file_size': file_size,
+        'document_type': document_type,
+        'uploaded_by': uploaded_by,
+        'uploaded_at': datetime.now(timezone.utc).isoformat(),
+        'metadata': metadata or {}
+    }
+    try:
+        resp = await request('POST', _rest_url('case_documents'), headers=_postgrest_headers(), json=body)
+        return _first(resp.json())
+    except httpx.HTTPStatusError as e:
+        logger.error(f'Failed to insert case document for case_id={case_id}, status={e.response.status_code}, error={e.response.text}')
+        raise
+    except Exception:
+        logger.exception(f'Failed to insert case document for case_id={case_id}')
+        raise
+
+
+async def get_case_documents(case_id: str) -> list:
+    """Retrieve all documents for a case, ordered by upload date descending."""
+    try:
+        return await postgrest_get('case_documents', {'case_id': f'eq.{case_id}', 'order': 'uploaded_at.desc'})
+    except Exception:
+        logger.exception(f'Failed to get case documents for case_id={case_id}')
+        return []
+
+
+async def patch_case_document_metadata(document_id: str, meta_patch: dict) -> dict:
+    """Merge meta_patch into the metadata JSONB column of a case_documents row."""
+    if not document_id or not meta_patch:
+        return {}
+    try:
+        rows = await postgrest_get('case_documents', {'id': f'eq.{document_id}', 'select': 'metadata'})
+        current_meta = (rows[0].get('metadata') or {}) if rows else {}
+    except Exception:
+        logger.warning('patch_case_document_metadata: failed to read current metadata for %s', document_id)
+        current_meta = {}
+    url = f"{_rest_url('case_documents')}?id=eq.{document_id}"
+    try:
+        await request('PATCH', url, headers=_postgrest_headers(), json={'metadata': {**current_meta, **meta_patch}})
+        return {'status': 'ok', 'document_id': document_id}
+    except Exception:
+        logger.exception('patch_case_document_metadata failed for %s', document_id)
+        raise
+
+
+async def delete_case_document(document_id: str) -> dict:
+    """Delete a document record from case_documents (the storage object is left alone)."""
+    try:
+        await request('DELETE', f"{_rest_url('case_documents')}?id=eq.{document_id}", headers=_postgrest_headers())
+        return {'status': 'deleted', 'document_id': document_id}
+    except Exception:
+        logger.exception(f'Failed to delete case document document_id={document_id}')
+        raise
+
+
+# ========================================
+# OCR results (see ocr_cache.py)
+# ========================================
+
+async def get_ocr_result(sha256: str, engine_version: str) -> Optional[dict]:
+    """Cached OCR pages for a file hash and engine version, or None."""
+    rows = await postgrest_get('ocr_results', {
+        'sha256': f'eq.{sha256}', 'engine_version': f'eq.{engine_version}', 'select': 'pages,page_count'
+    })
+    return rows[0] if rows else None
+
+
+async def upsert_ocr_result(sha256: str, engine_version: str, pages: List[str]) -> None:
+    headers = {**_postgrest_headers(), 'Prefer': 'resolution=merge-duplicates,return=minimal'}
+    body = {'sha256': sha256, 'engine_version': engine_version, 'pages': pages, 'page_count': len(pages)}
+    await request('POST', _rest_url('ocr_results'), params={'on_conflict': 'sha256,engine_version'},
+                  headers=headers, json=body)
+
+
+# ========================================
+# Jobs (see job_store.py)
+# ========================================
+
+async def upsert_jobs(records: List[dict]) -> None:
+    """Insert or update job rows in one request."""
+    if not records:
+        return
+    headers = {**_postgrest_headers(), 'Prefer': 'resolution=merge-duplicates,return=minimal'}
+    await request('POST', _rest_url('jobs'), params={'on_conflict': 'job_id'}, headers=headers, json=records)
+
+
+async def delete_finished_jobs(cutoff_iso: str) -> int:
+    """Delete completed/failed jobs created before cutoff_iso; returns how many went."""
+    resp = await request('DELETE', _rest_url('jobs'), headers=_postgrest_headers(), params={
+        'status': 'in.(completed,failed)', 'created_at': f'lt.{cutoff_iso}', 'select': 'job_id'
+    })
+    return len(resp.json() or [])
+
+
+# ========================================
+# Secrets
+# ========================================
+
+async def get_secret(provider: str) -> dict:
+    """Fetch a secret by provider name. Returns None if not found."""
+    _require_config()
+    try:
+        rows = await postgrest_get('secrets', {'provider': f'eq.{provider}', 'limit': '1'})
+        return rows[0] if isinstance(rows, list) and rows else None
+    except Exception:
+        logger.exception(f'Failed to fetch secret for provider={provider}')
+        return None
+
+
+async def list_secrets() -> list:
+    """List all secrets from the database."""
+    _require_config()
+    try:
+        return await postgrest_get('secrets')
+    except Exception:
+        logger.exception('Failed to list secrets')
+        return []
+
+
+async def update_secret(secret_id: int, key: str) -> dict:
+    """Update a secret's key value by id."""
+    _require_config()
+    try:
+        resp = await request('PATCH', _rest_url('secrets'), params={'id': f'eq.{secret_id}'},
+                             headers=_postgrest_headers(), json={'key': key})
+        return _first(resp.json())
+    except Exception:
+        logger.exception(f'Failed to update secret id={secret_id}')
+        raise
+
+
+async def create_secret(provider: str, key: str) -> dict:
+    """Create a new secret record."""
+    _require_config()
+    try:
+        resp = await request('POST', _rest_url('secrets'), headers=_postgrest_headers(), json={'provider': provider, 'key': key})
+        logger.info(f"Created secret for provider={provider}")
+        return resp.json()
+    except Exception:
+        logger.exception(f'Failed to create secret for provider={provider}')
+        raise
+
+
+# ========================================
+# SDK-only helpers (run in a worker thread)
+# ========================================
+
+def _threaded(func):
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = f"Awaitable wrapper around `supabase_client.{func.__name__}` (runs in a worker thread)."
+    return wrapper
+
+
+insert_user_profile = _threaded(_sync.insert_user_profile)
+insert_user_eligibility = _threaded(_sync.insert_user_eligibility)
+admin_create_subadmin = _threaded(_sync.admin_create_subadmin)
+admin_upsert_profile = _threaded(_sync.admin_upsert_profile)
+admin_delete_auth_user = _threaded(_sync.admin_delete_auth_user)
+admin_count_profiles = _threaded(_sync.admin_count_profiles)
+get_agent_prompt = _threaded(_sync.get_agent_prompt)
+send_phone_otp = _threaded(_sync.send_phone_otp)
+verify_phone_otp = _threaded(_sync.verify_phone_otp)
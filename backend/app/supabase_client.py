@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 import json
 import urllib.parse
 import time
-import random
+import threading
 
 logger = logging.getLogger('supabase_client')
 
@@ -104,55 +104,6 @@ def _normalize_sdk_response(res):
         return None
 
 
-def _retry_with_backoff(func, max_retries=3, base_delay=1.0, max_delay=10.0):
-    """
-    Retry a function with exponential backoff.
-    
-    Args:
-        func: The function to retry
-        max_retries: Maximum number of retry attempts
-        base_delay: Initial delay in seconds
-        max_delay: Maximum delay between retries in seconds
-    
-    Returns:
-        The function result or raises the last exception
-    """
-    last_exception = None
-    
-    for attempt in range(max_retries):
-        try:
-            return func()
-        except (ConnectionError, TimeoutError, OSError, Exception) as e:
-            # Check if it's a network-related error (getaddrinfo failed, connection refused, etc.)
-            error_msg = str(e).lower()
-            is_network_error = any([
-                'getaddrinfo' in error_msg,
-                'connect' in error_msg,
-                'timeout' in error_msg,
-                'reset by peer' in error_msg,
-                'connection refused' in error_msg,
-                'network' in error_msg,
-                'name resolution' in error_msg,
-                'httpcore.connecterror' in str(type(e)).lower()
-            ])
-            
-            if not is_network_error or attempt >= max_retries - 1:
-                # Not a network error or max retries reached - raise immediately
-                raise
-            
-            last_exception = e
-            # Exponential backoff with jitter
-            delay = min(base_delay * (2 ** attempt), max_delay)
-            jitter = random.uniform(0, delay * 0.1)
-            wait_time = delay + jitter
-            
-            logger.warning(f"Network error on attempt {attempt + 1}/{max_retries}: {e}. Retrying in {wait_time:.2f}s...")
-            time.sleep(wait_time)
-    
-    if last_exception:
-        raise last_exception
-
-
 def create_auth_user(email: str, password: str, phone: str = None, email_confirm: bool = True) -> dict:
     """Create a Supabase auth user via Admin API. Requires service role key.
 
@@ -611,6 +562,15 @@ def get_user_eligibilities(user_id: str) -> list:
         raise
 
 
+def _invalidate_profile_cache(user_id: str):
+    """Drop jwt_auth's cached copy of a profile after writing it."""
+    try:
+        from . import jwt_auth
+        jwt_auth.invalidate_profile(user_id)
+    except Exception:
+        logger.debug('Could not invalidate cached profile for user_id=%s', user_id)
+
+
 def update_onboarding_state(user_id: str, onboarding_state: dict) -> dict:
     """Patch the onboarding_state JSONB on the user_profile for the given user_id."""
     url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/user_profile?user_id=eq.{user_id}"
@@ -627,6 +587,8 @@ def update_onboarding_state(user_id: str, onboarding_state: dict) -> dict:
     except Exception:
         logger.exception('Failed to update onboarding state')
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 def update_user_profile_fields(user_id: str, fields: dict) -> dict:
@@ -650,6 +612,8 @@ def update_user_profile_fields(user_id: str, fields: dict) -> dict:
     except Exception:
         logger.exception('Failed to update user_profile fields for user_id=%s', user_id)
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 def insert_user_profile(user_id: str, name: str, email: str, phone: str, identity_code: str, otp: str = None, otp_expires_at: datetime = None, eligibility: dict = None, verified: bool = False) -> dict:
@@ -764,6 +728,8 @@ def insert_user_profile(user_id: str, name: str, email: str, phone: str, identit
     except Exception:
         logger.exception('Failed to insert user profile')
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 def get_profile_by_email(email: str) -> list:
@@ -871,6 +837,8 @@ def update_profile_user_id(email: str, user_id: str) -> dict:
     except Exception:
         logger.exception('Failed to update profile user_id')
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 def insert_user_eligibility(user_id: str, uploaded_file: str, eligibility: dict, case_id: str = None) -> dict:
@@ -1216,6 +1184,82 @@ def update_case(case_id: str, fields: dict) -> dict:
         raise
 
 
+# Atomic JSONB patches on cases (migration 020)
+#
+# Instead of get_case -> mutate call_summary in Python -> update_case, send
+# the change itself; it is applied inside one UPDATE, so concurrent writers
+# no longer overwrite each other's edits. `path` is a list of keys (or a
+# dotted string) inside `column`.
+
+def _json_path(path) -> list:
+    if path is None:
+        return []
+    if isinstance(path, str):
+        return [p for p in path.split('.') if p]
+    return [str(p) for p in path]
+
+
+def _case_jsonb_rpc(function: str, args: dict):
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        raise RuntimeError('Supabase config missing')
+    url = f"{SUPABASE_URL.rstrip('/')}/rest/v1/rpc/{function}"
+    try:
+        resp = requests.post(url, headers=_postgrest_headers(), json=args, timeout=15)
+        resp.raise_for_status()
+        return resp.json() if resp.content else None
+    except Exception as e:
+        logger.exception(f'[DB] ❌ {function} failed for case {args.get("p_case_id")}: {e}')
+        raise
+
+
+def patch_case_json(case_id: str, column: str, ops: list, return_path=None, touch: bool = False):
+    """Apply a list of JSONB patch operations to one case column atomically.
+
+    Operations (see migration 020):
+        {'op': 'set', 'path': [...], 'value': ...}
+        {'op': 'merge', 'path': [...], 'value': {...}}
+        {'op': 'append', 'path': [...], 'value': [...], 'unique_key': 'name', 'distinct': False}
+        {'op': 'update_element', 'path': [...], 'match_key': 'id', 'match_value': ..., 'value': {...}, 'insert': {...}}
+
+    Returns the value at `return_path` after the patch (the whole column when
+    None). `touch=True` also bumps cases.updated_at.
+    """
+    normalized = [{**op, 'path': _json_path(op.get('path'))} for op in ops]
+    logger.info(f"[DB] Patching case {case_id} {column} with {[op.get('op') for op in normalized]}")
+    return _case_jsonb_rpc('case_jsonb_patch', {
+        'p_case_id': case_id,
+        'p_column': column,
+        'p_ops': normalized,
+        'p_return_path': _json_path(return_path) if return_path is not None else None,
+        'p_touch': touch,
+    })
+
+
+def case_json_set(case_id: str, column: str, path, value):
+    """Set `column` at `path` to `value`. Returns the new value."""
+    return _case_jsonb_rpc('case_jsonb_set', {
+        'p_case_id': case_id, 'p_column': column, 'p_path': _json_path(path), 'p_value': value,
+    })
+
+
+def case_json_append(case_id: str, column: str, path, items: list, unique_key: str = None) -> list:
+    """Append `items` to the array at `path` (skipping items whose
+    `unique_key` value is already present). Returns the resulting array."""
+    return _case_jsonb_rpc('case_jsonb_append', {
+        'p_case_id': case_id, 'p_column': column, 'p_path': _json_path(path),
+        'p_items': items, 'p_unique_key': unique_key,
+    }) or []
+
+
+def case_json_update_element(case_id: str, column: str, path, match_key: str, match_value, patch: dict):
+    """Merge `patch` into the first element of the array at `path` whose
+    `match_key` equals `match_value`. Returns that element, or None if none matched."""
+    return _case_jsonb_rpc('case_jsonb_update_element', {
+        'p_case_id': case_id, 'p_column': column, 'p_path': _json_path(path),
+        'p_match_key': match_key, 'p_match_value': match_value, 'p_patch': patch,
+    })
+
+
 def delete_case(case_id: str) -> dict:
     """Delete a case by id."""
     if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
@@ -1373,6 +1417,8 @@ def admin_update_profile(user_id: str, fields: dict) -> dict:
     except Exception:
         logger.exception('Failed to update profile')
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 def admin_upsert_profile(user_id: str, fields: dict) -> dict:
@@ -1413,6 +1459,8 @@ def admin_upsert_profile(user_id: str, fields: dict) -> dict:
     except Exception:
         logger.exception('Failed to upsert user_profile')
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 def admin_delete_auth_user(user_id: str) -> dict:
@@ -1472,6 +1520,8 @@ def delete_user_profile(user_id: str) -> dict:
     except Exception as e:
         logger.exception(f'Failed to delete user profile {user_id}: {e}')
         raise
+    finally:
+        _invalidate_profile_cache(user_id)
 
 
 # Notification helpers
@@ -1654,6 +1704,288 @@ def storage_upload_file(bucket: str, path: str, file_bytes: bytes, content_type:
         raise
 
 
+# Files up to this size go up in one streamed PUT; larger ones use the
+# resumable (TUS) endpoint in fixed-size parts. Supabase requires 6 MB parts.
+STORAGE_RESUMABLE_THRESHOLD = int(os.environ.get('STORAGE_RESUMABLE_THRESHOLD', str(6 * 1024 * 1024)))
+STORAGE_UPLOAD_PART_SIZE = int(os.environ.get('STORAGE_UPLOAD_PART_SIZE', str(6 * 1024 * 1024)))
+STORAGE_UPLOAD_PART_RETRIES = int(os.environ.get('STORAGE_UPLOAD_PART_RETRIES', '3'))
+STORAGE_UPLOAD_TIMEOUT = int(os.environ.get('STORAGE_UPLOAD_TIMEOUT', '120'))
+
+
+def _storage_public_url(bucket: str, norm_path: str) -> str:
+    return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{bucket}/{urllib.parse.quote(norm_path)}"
+
+
+def _tus_metadata(**fields) -> str:
+    import base64
+    return ','.join(
+        f"{k} {base64.b64encode(str(v).encode('utf-8')).decode('ascii')}"
+        for k, v in fields.items() if v is not None
+    )
+
+
+# Part responses worth retrying besides 5xx: offset mismatch (resync via HEAD) and upload locked
+_TUS_RETRY_STATUSES = {409, 423}
+
+
+def _tus_retriable(exc: Exception) -> bool:
+    if isinstance(exc, HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500 or exc.response.status_code in _TUS_RETRY_STATUSES
+    return True
+
+
+def _tus_upload(bucket: str, norm_path: str, source_path: str, size: int, content_type: str, upsert: bool) -> int:
+    """Upload a file through the Storage TUS endpoint, one part in memory at a time.
+
+    A part that fails with a dropped connection, a timeout, a 5xx, 409 or
+    423 is retried after asking the server for its current offset, so the
+    upload resumes instead of restarting; other HTTP errors (auth, size
+    limits, missing upload) are raised at once. Returns the final HTTP status.
+    """
+    base_headers = {
+        'Authorization': f'Bearer {SUPABASE_SERVICE_ROLE_KEY}',
+        'apikey': SUPABASE_SERVICE_ROLE_KEY,
+        'Tus-Resumable': '1.0.0',
+    }
+    create = requests.post(
+        f"{SUPABASE_URL.rstrip('/')}/storage/v1/upload/resumable",
+        headers={
+            **base_headers,
+            'Upload-Length': str(size),
+            'Upload-Metadata': _tus_metadata(bucketName=bucket, objectName=norm_path, contentType=content_type),
+            'x-upsert': 'true' if upsert else 'false',
+        },
+        timeout=30,
+    )
+    if create.status_code != 201:
+        logger.warning(f'storage resumable create HTTP status={create.status_code} text={create.text}')
+        if 'Bucket not found' in create.text:
+            raise RuntimeError('bucket_not_found')
+        create.raise_for_status()
+    upload_url = urllib.parse.urljoin(create.url, create.headers['Location'])
+
+    offset = 0
+    status = create.status_code
+    with open(source_path, 'rb') as fh:
+        while offset < size:
+            fh.seek(offset)
+            part = fh.read(STORAGE_UPLOAD_PART_SIZE)
+            for attempt in range(1, STORAGE_UPLOAD_PART_RETRIES + 1):
+                try:
+                    resp = requests.patch(
+                        upload_url,
+                        headers={
+                            **base_headers,
+                            'Upload-Offset': str(offset),
+                            'Content-Type': 'application/offset+octet-stream',
+                        },
+                        data=part,
+                        timeout=STORAGE_UPLOAD_TIMEOUT,
+                    )
+                    resp.raise_for_status()
+                    offset = int(resp.headers.get('Upload-Offset', offset + len(part)))
+                    status = resp.status_code
+                    break
+                except (requests.ConnectionError, requests.Timeout, HTTPError) as e:
+                    if attempt == STORAGE_UPLOAD_PART_RETRIES or not _tus_retriable(e):
+                        raise
+                    logger.warning(f'storage part upload failed at offset={offset} (attempt {attempt}): {e}')
+                    time.sleep(0.5 * attempt)
+                    # The server may have stored part of the chunk; resume from its offset
+                    head = requests.head(upload_url, headers=base_headers, timeout=30)
+                    if head.ok and head.headers.get('Upload-Offset'):
+                        server_offset = int(head.headers['Upload-Offset'])
+                        if server_offset != offset:
+                            offset = server_offset
+                            break
+            del part
+    return status
+
+
+def storage_upload_stream(bucket: str, path: str, source_path: str, content_type: str = 'application/octet-stream',
+                          upsert: bool = True, size: int = None) -> dict:
+    """Upload a file from disk to Supabase Storage without reading it into memory.
+
+    Small files are streamed in a single PUT; files above
+    STORAGE_RESUMABLE_THRESHOLD go through the resumable endpoint in
+    STORAGE_UPLOAD_PART_SIZE parts. Returns a dict with `public_url`, like
+    `storage_upload_file`.
+    """
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        raise RuntimeError('Supabase storage config missing')
+
+    norm_path = path.lstrip('/')
+    if size is None:
+        size = os.path.getsize(source_path)
+    content_type = content_type or 'application/octet-stream'
+
+    try:
+        if size > STORAGE_RESUMABLE_THRESHOLD:
+            logger.debug(f'Uploading to supabase storage in parts: bucket={bucket} path={norm_path} size={size}')
+            status = _tus_upload(bucket, norm_path, source_path, size, content_type, upsert)
+        else:
+            upsert_qs = 'true' if upsert else 'false'
+            url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{norm_path}?upsert={upsert_qs}"
+            headers = {
+                'Authorization': f'Bearer {SUPABASE_SERVICE_ROLE_KEY}',
+                'apikey': SUPABASE_SERVICE_ROLE_KEY,
+                'Content-Type': content_type,
+                'Content-Length': str(size),
+            }
+            logger.debug(f'Uploading to supabase storage via streamed PUT: {url}')
+            with open(source_path, 'rb') as fh:
+                resp = requests.put(url, headers=headers, data=fh, timeout=STORAGE_UPLOAD_TIMEOUT)
+            if resp.status_code not in (200, 201, 204):
+                logger.warning(f'storage upload HTTP status={resp.status_code} text={resp.text}')
+                if 'Bucket not found' in resp.text:
+                    raise RuntimeError('bucket_not_found')
+                resp.raise_for_status()
+            status = resp.status_code
+        return {'public_url': _storage_public_url(bucket, norm_path), 'http_status': status, 'size': size}
+    except Exception:
+        logger.exception('Failed to upload file to Supabase Storage')
+        raise
+
+
+def storage_download_to_file(bucket: str, path: str, dest_path: str, chunk_size: int = 1024 * 1024) -> int:
+    """Stream an object from Supabase Storage to `dest_path`. Returns the byte count."""
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        raise RuntimeError('Supabase storage config missing')
+
+    norm_path = path.lstrip('/')
+    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{urllib.parse.quote(norm_path)}"
+    headers = {
+        'Authorization': f'Bearer {SUPABASE_SERVICE_ROLE_KEY}',
+        'apikey': SUPABASE_SERVICE_ROLE_KEY,
+    }
+    written = 0
+    try:
+        with requests.get(url, headers=headers, stream=True, timeout=STORAGE_UPLOAD_TIMEOUT) as resp:
+            resp.raise_for_status()
+            with open(dest_path, 'wb') as out:
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        out.write(chunk)
+                        written += len(chunk)
+        return written
+    except Exception:
+        logger.exception(f'Failed to download {bucket}/{norm_path} from Supabase Storage')
+        raise
+
+
+def storage_object_info(bucket: str, path: str) -> dict:
+    """Size, content type and ETag of a stored object, or None if it does not exist."""
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        raise RuntimeError('Supabase storage config missing')
+    norm_path = path.lstrip('/')
+    url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{bucket}/{urllib.parse.quote(norm_path)}"
+    headers = {
+        'Authorization': f'Bearer {SUPABASE_SERVICE_ROLE_KEY}',
+        'apikey': SUPABASE_SERVICE_ROLE_KEY,
+    }
+    resp = requests.head(url, headers=headers, timeout=10)
+    if resp.status_code in (400, 404):
+        return None
+    resp.raise_for_status()
+    size = resp.headers.get('Content-Length')
+    return {
+        'size': int(size) if size is not None else None,
+        'content_type': resp.headers.get('Content-Type'),
+        'etag': resp.headers.get('ETag'),
+    }
+
+
+def storage_fetch_file(bucket: str, path: str) -> str:
+    """Return a local file path holding the object's current bytes.
+
+    Served from the content-addressed storage cache (storage_cache.py); the
+    object is only downloaded when it is not cached or its ETag changed.
+    Raises FileNotFoundError if the object does not exist.
+    """
+    from .storage_cache import get_storage_cache
+
+    cache = get_storage_cache()
+    norm_path = path.lstrip('/')
+    entry = cache.lookup(bucket, norm_path)
+    if entry and cache.is_fresh(entry):
+        cache.touch(bucket, norm_path)
+        return entry['local_path']
+
+    try:
+        info = storage_object_info(bucket, norm_path)
+    except Exception as e:
+        if entry:
+            logger.warning(f'storage HEAD failed for {bucket}/{norm_path}; serving cached copy: {e}')
+            cache.touch(bucket, norm_path)
+            return entry['local_path']
+        raise
+    if info is None:
+        cache.invalidate(bucket, norm_path)
+        raise FileNotFoundError(f'{bucket}/{norm_path}')
+
+    etag = info.get('etag')
+    if entry and etag and entry['etag'] == etag:
+        cache.touch(bucket, norm_path, validated=True)
+        return entry['local_path']
+
+    tmp_path = cache.new_temp_path(suffix=os.path.splitext(norm_path)[1])
+    try:
+        storage_download_to_file(bucket, norm_path, tmp_path)
+        local_path = cache.add(bucket, norm_path, etag, tmp_path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    logger.info(f'Cached {bucket}/{norm_path} ({os.path.getsize(local_path)} bytes)')
+    return local_path
+
+
+def storage_open_mapped(bucket: str, path: str):
+    """Context manager yielding a read-only memory map of a (cached) storage object."""
+    from .utils import map_file
+    return map_file(storage_fetch_file(bucket, path))
+
+
+def storage_download_file(bucket: str, path: str) -> bytes:
+    """Return an object's bytes (via the storage cache), or None if it cannot be fetched.
+
+    Prefer storage_fetch_file / storage_open_mapped for large files; this
+    copies the whole object into memory.
+    """
+    try:
+        with open(storage_fetch_file(bucket, path), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        logger.warning(f'Storage object not found: {bucket}/{path}')
+        return None
+    except Exception:
+        logger.exception(f'Failed to download {bucket}/{path}')
+        return None
+
+
+def storage_object_from_url(url: str) -> tuple:
+    """Split a Supabase Storage object URL into (bucket, path), or None for other URLs."""
+    if not url or not SUPABASE_URL:
+        return None
+    parsed = urllib.parse.urlparse(url)
+    if parsed.netloc != urllib.parse.urlparse(SUPABASE_URL).netloc:
+        return None
+    parts = parsed.path.split('/storage/v1/object/', 1)
+    if len(parts) != 2:
+        return None
+    rest = parts[1]
+    for prefix in ('public/', 'authenticated/', 'sign/'):
+        if rest.startswith(prefix):
+            rest = rest[len(prefix):]
+            break
+    bucket, _, obj_path = rest.partition('/')
+    if not bucket or not obj_path:
+        return None
+    return bucket, urllib.parse.unquote(obj_path)
+
+
 def storage_delete_file(bucket: str, path: str) -> dict:
     """Delete a file from Supabase Storage.
     
@@ -1910,61 +2242,116 @@ def update_subadmin_permissions(user_id: str, permissions: dict) -> dict:
         raise
 
 
-# Agent prompt management — no caching, always fetch live from DB
+# Agent prompt management — cached in-process, keyed by name + updated_at
+#
+# Each entry holds the agent row (or None when the agent is missing/inactive)
+# and the row's updated_at as its version. The /api/agents endpoints call
+# clear_agent_cache() on every write, and refresh_agent_cache() (polled in the
+# background by main.py) compares versions so edits made through another
+# worker are picked up within AGENT_PROMPT_POLL_SECONDS.
+AGENT_PROMPT_CACHE_TTL = int(os.environ.get('AGENT_PROMPT_CACHE_TTL', '300'))
+AGENT_PROMPT_POLL_SECONDS = int(os.environ.get('AGENT_PROMPT_POLL_SECONDS', '5'))
+
+_agent_cache = {}
+_agent_cache_lock = threading.Lock()
+
+
+def _agent_fallback(fallback_prompt: str = None) -> dict:
+    return {
+        'prompt': fallback_prompt,
+        'model': 'gpt-4o',
+        'output_schema': None
+    }
+
+
+def _fetch_agent_row(agent_name: str):
+    """Return the active agents row for agent_name, or None."""
+    # Query by name only — is_active=NULL won't match .eq('is_active', True) in Postgres
+    # so we filter in Python instead to support NULL/True both being "active"
+    response = _supabase_admin.table('agents').select('*').eq('name', agent_name).execute()
+    rows = [r for r in (response.data or []) if r.get('is_active') is not False]
+    return rows[0] if rows else None
+
 
 def get_agent_prompt(agent_name: str, fallback_prompt: str = None) -> dict:
     """
-    Fetch agent configuration from database by name.
-    Always queries the DB directly — no caching — so prompt edits take effect immediately.
+    Fetch agent configuration by name, served from the in-process cache.
+    Cache entries are dropped as soon as the agent's updated_at changes (see
+    clear_agent_cache / refresh_agent_cache) and re-read after
+    AGENT_PROMPT_CACHE_TTL seconds at the latest.
     Falls back to fallback_prompt if agent not found or DB unavailable.
     """
     try:
         if not _has_supabase_py or not _supabase_admin:
             logger.warning(f"Supabase not configured, using fallback prompt for {agent_name}")
-            return {
-                'prompt': fallback_prompt,
-                'model': 'gpt-4o',
-                'output_schema': None
+            return _agent_fallback(fallback_prompt)
+
+        with _agent_cache_lock:
+            entry = _agent_cache.get(agent_name)
+        if entry is None or time.monotonic() - entry['fetched_at'] > AGENT_PROMPT_CACHE_TTL:
+            logger.info(f"[DB] 🔍 Fetching agent prompt for name='{agent_name}'")
+            agent = _fetch_agent_row(agent_name)
+            entry = {
+                'agent': agent,
+                'version': agent.get('updated_at') if agent else None,
+                'fetched_at': time.monotonic(),
             }
+            with _agent_cache_lock:
+                _agent_cache[agent_name] = entry
 
-        logger.info(f"[DB] 🔍 Fetching agent prompt for name='{agent_name}'")
-        # Query by name only — is_active=NULL won't match .eq('is_active', True) in Postgres
-        # so we filter in Python instead to support NULL/True both being "active"
-        response = _supabase_admin.table('agents').select('*').eq('name', agent_name).execute()
-        print(f"[DB] Raw query result for '{agent_name}': {response.data}", flush=True)
-
-        # Accept rows where is_active is True or NULL (not explicitly False)
-        rows = [r for r in (response.data or []) if r.get('is_active') is not False]
-
-        if rows:
-            agent = rows[0]
-            print(f"[DB] ✅ Found agent '{agent_name}' | is_active={agent.get('is_active')} | prompt_len={len(agent.get('prompt') or '')}", flush=True)
+        agent = entry['agent']
+        if agent:
             return {
                 'prompt': agent.get('prompt'),
                 'model': agent.get('model', 'gpt-4o'),
                 'output_schema': agent.get('output_schema'),
                 'meta_data': agent.get('meta_data')
             }
-        else:
-            print(f"[DB] ⚠️ Agent '{agent_name}' not found or is_active=false. All rows returned: {response.data}", flush=True)
-            logger.warning(f"[DB] ⚠️  Agent '{agent_name}' not found (check name and is_active), using fallback")
-            return {
-                'prompt': fallback_prompt,
-                'model': 'gpt-4o',
-                'output_schema': None
-            }
+        logger.warning(f"[DB] ⚠️  Agent '{agent_name}' not found (check name and is_active), using fallback")
+        return _agent_fallback(fallback_prompt)
     except Exception as e:
         logger.exception(f"[DB] ❌ Failed to fetch agent '{agent_name}': {e}")
-        return {
-            'prompt': fallback_prompt,
-            'model': 'gpt-4o',
-            'output_schema': None
-        }
+        return _agent_fallback(fallback_prompt)
 
 
-def clear_agent_cache():
-    """No-op — caching removed. Kept for backwards compatibility."""
-    logger.info("clear_agent_cache called (no-op, caching is disabled)")
+def clear_agent_cache(agent_name: str = None):
+    """Drop one cached agent (or all of them when agent_name is None)."""
+    with _agent_cache_lock:
+        if agent_name is None:
+            _agent_cache.clear()
+        else:
+            _agent_cache.pop(agent_name, None)
+    logger.info(f"Agent prompt cache cleared for {agent_name or 'all agents'}")
+
+
+def refresh_agent_cache() -> int:
+    """
+    Compare cached agents against the DB's current versions and drop stale
+    entries. Only name/updated_at/is_active are read, so this is cheap enough
+    to poll every few seconds. Returns the number of entries dropped.
+    """
+    with _agent_cache_lock:
+        if not _agent_cache:
+            return 0
+    if not _has_supabase_py or not _supabase_admin:
+        return 0
+
+    response = _supabase_admin.table('agents').select('name,updated_at,is_active').execute()
+    current = {
+        r.get('name'): r.get('updated_at')
+        for r in (response.data or [])
+        if r.get('is_active') is not False
+    }
+
+    dropped = 0
+    with _agent_cache_lock:
+        for name, entry in list(_agent_cache.items()):
+            if current.get(name) != entry['version']:
+                _agent_cache.pop(name, None)
+                dropped += 1
+    if dropped:
+        logger.info(f"[DB] 🔄 Dropped {dropped} stale agent prompt(s) from cache")
+    return dropped
 
 
 def send_phone_otp(phone: str):
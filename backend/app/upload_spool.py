@@ -0,0 +1,108 @@
+"""
+Disk-spooled uploads.
+
+Upload handlers used to `await file.read()` and then pass the whole body
+through OCR and the storage upload (plus its temp-file fallback), holding
+several copies of a multi-MB PDF per request. `spool_upload` copies the
+request body to a temp file in `UPLOAD_CHUNK_SIZE` pieces instead, hashing
+and counting as it goes, so only one chunk is ever in memory. Consumers then
+work from the file:
+
+- OCR: `ocr.extract_text_from_file(spool.path, ...)` memory-maps it.
+- Storage: `supabase_client.storage_upload_stream(..., source_path=spool.path)`
+  streams it, in resumable parts for large files.
+
+The temp file is removed by `cleanup()` (or on garbage collection as a
+safety net for early returns).
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+import weakref
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+
+logger = logging.getLogger('upload_spool')
+
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR') or None
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+
+# Enough for magic-byte checks such as ocr.is_pdf
+_HEAD_BYTES = 1024
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeded the caller's max_bytes."""
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning(f'Failed to remove upload spool file {path}', exc_info=True)
+
+
+class SpooledUpload:
+    """An uploaded file written to disk, with its size and sha256."""
+
+    def __init__(self, path: str, size: int, sha256: str, head: bytes,
+                 filename: Optional[str], content_type: Optional[str]):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.head = head
+        self.filename = filename or ''
+        self.content_type = content_type
+        self._finalizer = weakref.finalize(self, _unlink, path)
+
+    def open(self):
+        """Open the spooled file for reading (caller closes it)."""
+        return open(self.path, 'rb')
+
+    def cleanup(self):
+        """Delete the spooled file. Safe to call more than once."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+async def spool_upload(file: UploadFile, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """Stream `file` to a temp file in chunks and return a SpooledUpload.
+
+    Raises UploadTooLarge (after removing the partial file) once more than
+    `max_bytes` have been read.
+    """
+    suffix = Path(file.filename or '').suffix
+    fd, path = tempfile.mkstemp(prefix='upload_', suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f'upload exceeds {max_bytes} bytes')
+                if len(head) < _HEAD_BYTES:
+                    head += chunk[:_HEAD_BYTES - len(head)]
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        _unlink(path)
+        raise
+
+    logger.debug(f'Spooled upload {file.filename} to {path}; size={size} sha256={digest.hexdigest()[:12]}')
+    return SpooledUpload(path, size, digest.hexdigest(), head, file.filename, file.content_type)
@@ -1,6 +1,10 @@
+import os
+import mmap
 import hashlib
+import json
 import re
 import unicodedata
+from contextlib import contextmanager
 
 
 def hash_file(path: str) -> str:
@@ -11,6 +15,49 @@ def hash_file(path: str) -> str:
     return h.hexdigest()
 
 
+@contextmanager
+def map_file(path: str):
+    """Yield a read-only memory-mapped view of the file at `path` (b'' if empty)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield view
+        finally:
+            view.close()
+
+
+def ensure_private_dir(path: str) -> str:
+    """Create `path` with mode 0700, or tighten an existing one to it.
+
+    Refuses a directory owned by another user (e.g. pre-created in a shared
+    /tmp) instead of writing cached documents into it.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.stat(path)
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise PermissionError(f'{path} is owned by another user')
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+def ensure_private_file(path: str) -> str:
+    """Create `path` (if missing) readable by the owner only, before SQLite opens it.
+
+    SQLite gives its -wal/-shm files the database file's permissions.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    try:
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
+    return path
+
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename to only include ASCII characters safe for storage.
     
@@ -38,3 +85,17 @@ def sanitize_filename(filename: str) -> str:
         filename = 'document'
     
     return filename
+
+
+def parse_json_field(value) -> dict:
+    """Return a JSONB column value as a dict.
+
+    Older rows store JSON as a string; newer ones come back already decoded.
+    Anything unparseable (or null) becomes an empty dict.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            return {}
+    return value if isinstance(value, dict) else {}
@@ -0,0 +1,80 @@
+-- Migration: flat claims-table view for the admin dashboard
+-- Exposes products / estimated_claim_amount / ai_score as typed columns so
+-- /admin/claims-table can page through it with a single PostgREST request
+-- instead of fetching cases per user and re-parsing JSON in Python.
+
+-- Some rows store call_summary / eligibility_raw as a JSON *string* inside
+-- the jsonb column. Unwrap those to the underlying object. A string that
+-- looks like JSON but does not parse (truncated legacy rows) yields NULL
+-- rather than an error: the function backs stored generated columns
+-- (migration 017), so raising here would block every UPDATE of the row.
+CREATE OR REPLACE FUNCTION public.jsonb_unwrap(j jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+BEGIN
+  IF j IS NULL THEN
+    RETURN NULL;
+  END IF;
+  IF jsonb_typeof(j) = 'string' AND (j #>> '{}') ~ '^\s*[\[{]' THEN
+    BEGIN
+      RETURN (j #>> '{}')::jsonb;
+    EXCEPTION WHEN invalid_text_representation THEN
+      RETURN NULL;
+    END;
+  END IF;
+  RETURN j;
+END
+$$;
+
+-- Numeric value of a jsonb scalar; NULL when it is not a plain number
+-- (e.g. '"N/A"' or '"₪50,000"').
+CREATE OR REPLACE FUNCTION public.jsonb_to_numeric(j jsonb)
+RETURNS numeric
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN j IS NULL THEN NULL
+    WHEN jsonb_typeof(j) = 'number' THEN (j #>> '{}')::numeric
+    WHEN jsonb_typeof(j) = 'string' AND (j #>> '{}') ~ '^\s*-?[0-9]+(\.[0-9]+)?\s*$' THEN (j #>> '{}')::numeric
+    ELSE NULL
+  END
+$$;
+
+CREATE OR REPLACE VIEW public.admin_claims_table AS
+SELECT
+  c.id AS case_id,
+  c.user_id,
+  p.full_name AS client_name,
+  p.email AS client_email,
+  p.phone AS client_phone,
+  p.photo_url AS client_photo,
+  COALESCE(public.jsonb_unwrap(c.call_summary) -> 'products', '[]'::jsonb) AS products,
+  c.status,
+  COALESCE(public.jsonb_to_numeric(public.jsonb_unwrap(p.eligibility_raw) -> 'eligibility_score'), 0) AS ai_score,
+  COALESCE(public.jsonb_unwrap(p.eligibility_raw) ->> 'eligibility_status', 'not_rated') AS eligibility_status,
+  COALESCE(public.jsonb_to_numeric(public.jsonb_unwrap(c.call_summary) -> 'estimated_claim_amount'), 0) AS estimated_claim_amount,
+  c.created_at,
+  c.updated_at,
+  p.created_at AS profile_created_at
+FROM public.cases c
+JOIN public.user_profile p ON p.user_id = c.user_id
+-- Only non-admin and non-sub-admin users
+WHERE p.is_admin IS NOT TRUE
+  AND p.is_subadmin IS NOT TRUE
+  AND (p.role IS NULL OR p.role NOT IN ('admin', 'subadmin'));
+
+COMMENT ON VIEW public.admin_claims_table IS 'Admin claims table rows: one per case with client info and precomputed claim columns';
+
+-- Contains client PII: only the backend (service role) may read it.
+REVOKE ALL ON public.admin_claims_table FROM anon, authenticated;
+GRANT SELECT ON public.admin_claims_table TO service_role;
+
+-- Supports the join and the (profile_created_at, created_at) ordering
+CREATE INDEX IF NOT EXISTS idx_cases_user_id_created_at ON public.cases (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_user_profile_created_at ON public.user_profile (created_at DESC);
+
+-- Refresh PostgREST schema cache so the view is queryable immediately
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,166 @@
+-- Migration: indexed filter columns for /admin/cases/filter
+-- Lets CaseFilterRequest (status, AI score, income potential, dates, free-text
+-- search) compile to a single indexed PostgREST query with an exact count.
+-- Requires the jsonb_unwrap / jsonb_to_numeric helpers from migration 016.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Report JSON strings that do not parse; jsonb_unwrap maps them to NULL,
+-- so their generated columns below fall back to 0
+DO $$
+DECLARE
+  bad_cases integer;
+  bad_profiles integer;
+BEGIN
+  SELECT count(*) INTO bad_cases FROM public.cases
+  WHERE jsonb_typeof(call_summary) = 'string'
+    AND (call_summary #>> '{}') ~ '^\s*[\[{]'
+    AND public.jsonb_unwrap(call_summary) IS NULL;
+  SELECT count(*) INTO bad_profiles FROM public.user_profile
+  WHERE jsonb_typeof(eligibility_raw) = 'string'
+    AND (eligibility_raw #>> '{}') ~ '^\s*[\[{]'
+    AND public.jsonb_unwrap(eligibility_raw) IS NULL;
+  IF bad_cases > 0 OR bad_profiles > 0 THEN
+    RAISE WARNING 'Malformed JSON strings: % cases.call_summary, % user_profile.eligibility_raw (treated as empty)',
+      bad_cases, bad_profiles;
+  END IF;
+END
+$$;
+
+-- Income potential straight from call_summary.estimated_claim_amount
+ALTER TABLE public.cases
+ADD COLUMN IF NOT EXISTS estimated_claim_amount numeric
+GENERATED ALWAYS AS (
+  COALESCE(public.jsonb_to_numeric(public.jsonb_unwrap(call_summary) -> 'estimated_claim_amount'), 0)
+) STORED;
+
+-- AI score lives on the profile (eligibility_raw.eligibility_score)
+ALTER TABLE public.user_profile
+ADD COLUMN IF NOT EXISTS ai_score numeric
+GENERATED ALWAYS AS (
+  COALESCE(public.jsonb_to_numeric(public.jsonb_unwrap(eligibility_raw) -> 'eligibility_score'), 0)
+) STORED;
+
+-- Denormalized onto cases so score and search filters hit one table
+ALTER TABLE public.cases ADD COLUMN IF NOT EXISTS ai_score numeric NOT NULL DEFAULT 0;
+ALTER TABLE public.cases ADD COLUMN IF NOT EXISTS search_text text;
+
+COMMENT ON COLUMN public.cases.ai_score IS 'Copy of user_profile.ai_score, maintained by triggers';
+COMMENT ON COLUMN public.cases.search_text IS 'lower(client name, email, case id) for trigram search, maintained by triggers';
+
+CREATE OR REPLACE FUNCTION public.case_search_text(p_full_name text, p_email text, p_case_id uuid)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT lower(concat_ws(' ', p_full_name, p_email, p_case_id::text))
+$$;
+
+-- Fill ai_score / search_text when a case is created or moved to another user
+CREATE OR REPLACE FUNCTION public.cases_sync_profile_columns()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  prof record;
+BEGIN
+  SELECT full_name, email, ai_score INTO prof
+  FROM public.user_profile
+  WHERE user_id = NEW.user_id;
+
+  NEW.ai_score := COALESCE(prof.ai_score, 0);
+  NEW.search_text := public.case_search_text(prof.full_name, prof.email, NEW.id);
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_cases_sync_profile_columns ON public.cases;
+CREATE TRIGGER trg_cases_sync_profile_columns
+BEFORE INSERT OR UPDATE OF user_id ON public.cases
+FOR EACH ROW EXECUTE FUNCTION public.cases_sync_profile_columns();
+
+-- Propagate profile edits (name, email, eligibility) to the user's cases
+CREATE OR REPLACE FUNCTION public.user_profile_sync_case_columns()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.user_id IS NULL THEN
+    RETURN NEW;
+  END IF;
+  UPDATE public.cases c
+  SET ai_score = COALESCE(NEW.ai_score, 0),
+      search_text = public.case_search_text(NEW.full_name, NEW.email, c.id)
+  WHERE c.user_id = NEW.user_id;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_user_profile_sync_case_columns ON public.user_profile;
+CREATE TRIGGER trg_user_profile_sync_case_columns
+AFTER INSERT OR UPDATE OF full_name, email, eligibility_raw, user_id ON public.user_profile
+FOR EACH ROW EXECUTE FUNCTION public.user_profile_sync_case_columns();
+
+-- Backfill existing rows
+UPDATE public.cases c
+SET ai_score = COALESCE(p.ai_score, 0),
+    search_text = public.case_search_text(p.full_name, p.email, c.id)
+FROM public.user_profile p
+WHERE p.user_id = c.user_id;
+
+CREATE INDEX IF NOT EXISTS idx_cases_ai_score ON public.cases (ai_score);
+CREATE INDEX IF NOT EXISTS idx_cases_estimated_claim_amount ON public.cases (estimated_claim_amount);
+CREATE INDEX IF NOT EXISTS idx_cases_status ON public.cases (status);
+CREATE INDEX IF NOT EXISTS idx_cases_created_at_id ON public.cases (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_updated_at ON public.cases (updated_at);
+CREATE INDEX IF NOT EXISTS idx_cases_search_text_trgm ON public.cases USING gin (search_text gin_trgm_ops);
+
+-- Row shape returned by /admin/cases/filter; every filter maps to an indexed cases column
+CREATE OR REPLACE VIEW public.admin_case_filter AS
+SELECT
+  c.id AS case_id,
+  c.user_id,
+  p.full_name AS client_name,
+  p.email AS client_email,
+  p.phone AS client_phone,
+  c.status,
+  c.ai_score,
+  COALESCE(public.jsonb_unwrap(p.eligibility_raw) ->> 'eligibility_status', 'not_rated') AS eligibility_status,
+  c.estimated_claim_amount,
+  c.created_at,
+  c.updated_at,
+  COALESCE(public.jsonb_unwrap(c.call_summary) -> 'products', '[]'::jsonb) AS products,
+  public.jsonb_unwrap(c.call_summary) -> 'risk_assessment' AS risk_assessment,
+  c.search_text
+FROM public.cases c
+JOIN public.user_profile p ON p.user_id = c.user_id;
+
+COMMENT ON VIEW public.admin_case_filter IS 'Admin case filter rows backed by indexed cases columns';
+
+REVOKE ALL ON public.admin_case_filter FROM anon, authenticated;
+GRANT SELECT ON public.admin_case_filter TO service_role;
+
+-- The claims table view can now read the precomputed columns too
+CREATE OR REPLACE VIEW public.admin_claims_table AS
+SELECT
+  c.id AS case_id,
+  c.user_id,
+  p.full_name AS client_name,
+  p.email AS client_email,
+  p.phone AS client_phone,
+  p.photo_url AS client_photo,
+  COALESCE(public.jsonb_unwrap(c.call_summary) -> 'products', '[]'::jsonb) AS products,
+  c.status,
+  c.ai_score,
+  COALESCE(public.jsonb_unwrap(p.eligibility_raw) ->> 'eligibility_status', 'not_rated') AS eligibility_status,
+  c.estimated_claim_amount,
+  c.created_at,
+  c.updated_at,
+  p.created_at AS profile_created_at
+FROM public.cases c
+JOIN public.user_profile p ON p.user_id = c.user_id
+WHERE p.is_admin IS NOT TRUE
+  AND p.is_subadmin IS NOT TRUE
+  AND (p.role IS NULL OR p.role NOT IN ('admin', 'subadmin'));
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,262 @@
+-- Migration: daily case rollups for /admin/analytics
+-- The analytics endpoint used to download raw cases/profiles (capped at 500
+-- rows) and aggregate them in Python. These tables keep one row per
+-- (day, status) and (day, product), maintained by a trigger on cases, so a
+-- 365-day report reads at most a few hundred pre-aggregated rows.
+-- Requires jsonb_unwrap (016) and cases.estimated_claim_amount / ai_score (017).
+
+CREATE TABLE IF NOT EXISTS public.case_daily_stats (
+  day date NOT NULL,
+  status text NOT NULL,
+  case_count integer NOT NULL DEFAULT 0,
+  claim_amount_total numeric NOT NULL DEFAULT 0,
+  ai_score_total numeric NOT NULL DEFAULT 0,
+  ai_score_count integer NOT NULL DEFAULT 0,
+  processing_days_total bigint NOT NULL DEFAULT 0,
+  processing_days_count integer NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, status)
+);
+
+CREATE TABLE IF NOT EXISTS public.case_daily_products (
+  day date NOT NULL,
+  product text NOT NULL,
+  case_count integer NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, product)
+);
+
+COMMENT ON TABLE public.case_daily_stats IS 'Per-day, per-status case aggregates (UTC days of cases.created_at), maintained by trg_cases_rollup(_update)';
+COMMENT ON TABLE public.case_daily_products IS 'Per-day case counts by call_summary product, maintained by trg_cases_rollup(_update)';
+
+REVOKE ALL ON public.case_daily_stats FROM anon, authenticated;
+REVOKE ALL ON public.case_daily_products FROM anon, authenticated;
+GRANT SELECT ON public.case_daily_stats TO service_role;
+GRANT SELECT ON public.case_daily_products TO service_role;
+
+-- Products listed in call_summary; 'General Disability' when none are given
+CREATE OR REPLACE FUNCTION public.case_products(p_call_summary jsonb)
+RETURNS text[]
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT COALESCE(
+    (
+      SELECT array_agg(elem #>> '{}')
+      FROM jsonb_array_elements(
+        CASE
+          WHEN jsonb_typeof(public.jsonb_unwrap(public.jsonb_unwrap(p_call_summary) -> 'products')) = 'array'
+          THEN public.jsonb_unwrap(public.jsonb_unwrap(p_call_summary) -> 'products')
+          ELSE '[]'::jsonb
+        END
+      ) AS elem
+    ),
+    ARRAY['General Disability']
+  )
+$$;
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one case's contribution
+CREATE OR REPLACE FUNCTION public.case_rollup_apply(
+  p_created_at timestamptz,
+  p_updated_at timestamptz,
+  p_status text,
+  p_claim_amount numeric,
+  p_ai_score numeric,
+  p_call_summary jsonb,
+  p_sign integer
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_day date;
+  v_days integer;
+BEGIN
+  IF p_created_at IS NULL THEN
+    RETURN;
+  END IF;
+  v_day := (p_created_at AT TIME ZONE 'UTC')::date;
+  v_days := floor(extract(epoch FROM (p_updated_at - p_created_at)) / 86400);
+
+  INSERT INTO public.case_daily_stats AS s (
+    day, status, case_count, claim_amount_total, ai_score_total, ai_score_count,
+    processing_days_total, processing_days_count
+  )
+  VALUES (
+    v_day,
+    COALESCE(p_status, 'Unknown'),
+    p_sign,
+    p_sign * COALESCE(p_claim_amount, 0),
+    CASE WHEN p_ai_score > 0 THEN p_sign * p_ai_score ELSE 0 END,
+    CASE WHEN p_ai_score > 0 THEN p_sign ELSE 0 END,
+    CASE WHEN v_days >= 0 THEN p_sign * v_days ELSE 0 END,
+    CASE WHEN v_days >= 0 THEN p_sign ELSE 0 END
+  )
+  ON CONFLICT (day, status) DO UPDATE SET
+    case_count = s.case_count + EXCLUDED.case_count,
+    claim_amount_total = s.claim_amount_total + EXCLUDED.claim_amount_total,
+    ai_score_total = s.ai_score_total + EXCLUDED.ai_score_total,
+    ai_score_count = s.ai_score_count + EXCLUDED.ai_score_count,
+    processing_days_total = s.processing_days_total + EXCLUDED.processing_days_total,
+    processing_days_count = s.processing_days_count + EXCLUDED.processing_days_count;
+
+  INSERT INTO public.case_daily_products AS p (day, product, case_count)
+  SELECT v_day, product, p_sign * count(*)
+  FROM unnest(public.case_products(p_call_summary)) AS product
+  WHERE product IS NOT NULL
+  GROUP BY product
+  ON CONFLICT (day, product) DO UPDATE SET
+    case_count = p.case_count + EXCLUDED.case_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.cases_rollup_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.case_rollup_apply(OLD.created_at, OLD.updated_at, OLD.status,
+      OLD.estimated_claim_amount, OLD.ai_score, OLD.call_summary, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.case_rollup_apply(NEW.created_at, NEW.updated_at, NEW.status,
+      NEW.estimated_claim_amount, NEW.ai_score, NEW.call_summary, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_cases_rollup ON public.cases;
+CREATE TRIGGER trg_cases_rollup
+AFTER INSERT OR DELETE ON public.cases
+FOR EACH ROW EXECUTE FUNCTION public.cases_rollup_trigger();
+
+-- Most case updates (documents, agent notes, ...) do not touch the rolled-up
+-- values; skip them before the function is even called. updated_at only
+-- matters through the whole number of processing days.
+DROP TRIGGER IF EXISTS trg_cases_rollup_update ON public.cases;
+CREATE TRIGGER trg_cases_rollup_update
+AFTER UPDATE ON public.cases
+FOR EACH ROW
+WHEN (
+  OLD.created_at IS DISTINCT FROM NEW.created_at
+  OR OLD.status IS DISTINCT FROM NEW.status
+  OR OLD.estimated_claim_amount IS DISTINCT FROM NEW.estimated_claim_amount
+  OR OLD.ai_score IS DISTINCT FROM NEW.ai_score
+  OR OLD.call_summary IS DISTINCT FROM NEW.call_summary
+  OR floor(extract(epoch FROM (OLD.updated_at - OLD.created_at)) / 86400)
+     IS DISTINCT FROM floor(extract(epoch FROM (NEW.updated_at - NEW.created_at)) / 86400)
+)
+EXECUTE FUNCTION public.cases_rollup_trigger();
+
+-- Rebuild the rollups from cases for days >= p_from (all days when NULL).
+-- Used for the initial backfill and to repair drift after bulk imports that
+-- bypass triggers.
+CREATE OR REPLACE FUNCTION public.refresh_case_daily_rollup(p_from date DEFAULT NULL)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  DELETE FROM public.case_daily_stats WHERE p_from IS NULL OR day >= p_from;
+  DELETE FROM public.case_daily_products WHERE p_from IS NULL OR day >= p_from;
+
+  INSERT INTO public.case_daily_stats (
+    day, status, case_count, claim_amount_total, ai_score_total, ai_score_count,
+    processing_days_total, processing_days_count
+  )
+  SELECT
+    day,
+    status,
+    count(*),
+    sum(COALESCE(estimated_claim_amount, 0)),
+    COALESCE(sum(ai_score) FILTER (WHERE ai_score > 0), 0),
+    count(*) FILTER (WHERE ai_score > 0),
+    COALESCE(sum(days) FILTER (WHERE days >= 0), 0),
+    count(*) FILTER (WHERE days >= 0)
+  FROM (
+    SELECT
+      (created_at AT TIME ZONE 'UTC')::date AS day,
+      COALESCE(status, 'Unknown') AS status,
+      estimated_claim_amount,
+      ai_score,
+      floor(extract(epoch FROM (updated_at - created_at)) / 86400)::integer AS days
+    FROM public.cases
+    WHERE created_at IS NOT NULL
+      AND (p_from IS NULL OR (created_at AT TIME ZONE 'UTC')::date >= p_from)
+  ) c
+  GROUP BY day, status;
+
+  INSERT INTO public.case_daily_products (day, product, case_count)
+  SELECT (c.created_at AT TIME ZONE 'UTC')::date, product, count(*)
+  FROM public.cases c
+  CROSS JOIN LATERAL unnest(public.case_products(c.call_summary)) AS product
+  WHERE c.created_at IS NOT NULL
+    AND product IS NOT NULL
+    AND (p_from IS NULL OR (c.created_at AT TIME ZONE 'UTC')::date >= p_from)
+  GROUP BY 1, 2;
+END;
+$$;
+
+-- Totals for [p_from, p_to) read from the rollups: one row per status plus
+-- product counts. Called by /admin/analytics for the current and previous period.
+CREATE OR REPLACE FUNCTION public.case_rollup_summary(p_from date, p_to date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT jsonb_build_object(
+    'statuses', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object(
+        'status', status,
+        'case_count', case_count,
+        'claim_amount_total', claim_amount_total,
+        'ai_score_total', ai_score_total,
+        'ai_score_count', ai_score_count,
+        'processing_days_total', processing_days_total,
+        'processing_days_count', processing_days_count
+      ))
+      FROM (
+        SELECT
+          status,
+          sum(case_count) AS case_count,
+          sum(claim_amount_total) AS claim_amount_total,
+          sum(ai_score_total) AS ai_score_total,
+          sum(ai_score_count) AS ai_score_count,
+          sum(processing_days_total) AS processing_days_total,
+          sum(processing_days_count) AS processing_days_count
+        FROM public.case_daily_stats
+        WHERE day >= p_from AND day < p_to
+        GROUP BY status
+        HAVING sum(case_count) > 0
+      ) s
+    ), '[]'::jsonb),
+    'products', COALESCE((
+      SELECT jsonb_object_agg(product, case_count)
+      FROM (
+        SELECT product, sum(case_count) AS case_count
+        FROM public.case_daily_products
+        WHERE day >= p_from AND day < p_to
+        GROUP BY product
+        HAVING sum(case_count) > 0
+      ) p
+    ), '{}'::jsonb)
+  )
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.case_rollup_apply(timestamptz, timestamptz, text, numeric, numeric, jsonb, integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.refresh_case_daily_rollup(date) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.case_rollup_summary(date, date) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_case_daily_rollup(date) TO service_role;
+GRANT EXECUTE ON FUNCTION public.case_rollup_summary(date, date) TO service_role;
+
+-- Backfill from existing cases
+SELECT public.refresh_case_daily_rollup(NULL);
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,11 @@
+-- Migration: indexes for keyset (cursor) pagination on admin listings
+-- Admin list endpoints page with `created_at < cursor OR (created_at = cursor AND id < cursor_id)`
+-- ordered by (created_at DESC, id DESC); these indexes make every page an
+-- index range scan regardless of depth. cases (created_at DESC, id DESC)
+-- already exists as idx_cases_created_at_id (migration 017).
+
+CREATE INDEX IF NOT EXISTS idx_user_profile_created_at_id ON public.user_profile (created_at DESC, id DESC);
+
+-- Work disability listing filters admin_case_filter on call_summary products
+CREATE INDEX IF NOT EXISTS idx_cases_call_summary_products
+  ON public.cases USING gin ((COALESCE(public.jsonb_unwrap(call_summary) -> 'products', '[]'::jsonb)));
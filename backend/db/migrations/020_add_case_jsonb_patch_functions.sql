@@ -0,0 +1,272 @@
+-- Migration: atomic JSONB patches on cases
+-- Flows that edit one item inside call_summary / call_details / letters used
+-- to read the whole case, mutate the blob in Python and write it all back:
+-- two round trips and a lost-update race between concurrent writers. These
+-- functions apply the change inside a single UPDATE instead.
+--
+-- A patch is a JSON array of operations applied in order:
+--   {"op": "set",            "path": [...], "value": <any>}
+--   {"op": "merge",          "path": [...], "value": {...}}        shallow object merge
+--   {"op": "append",         "path": [...], "value": [...],        append items to an array
+--        "unique_key": "name",   -- optional: skip items whose key already exists
+--        "distinct": true}       -- optional: skip items already present (scalars)
+--   {"op": "update_element", "path": [...], "match_key": "id", "match_value": <any>,
+--        "value": {...},         -- merged into the first matching element
+--        "insert": {...}}        -- optional: appended when nothing matches
+-- Missing containers along a path are created; JSON stored as a string
+-- inside the column (legacy rows) is unwrapped and written back as JSON.
+-- Requires jsonb_unwrap (016).
+
+-- Value at path (the whole document for an empty/NULL path)
+CREATE OR REPLACE FUNCTION public.jsonb_get_path(p_doc jsonb, p_path text[])
+RETURNS jsonb
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT public.jsonb_unwrap(
+    CASE
+      WHEN p_path IS NULL OR cardinality(p_path) = 0 THEN p_doc
+      ELSE public.jsonb_unwrap(p_doc) #> p_path
+    END
+  )
+$$;
+
+-- jsonb_set that also creates missing intermediate objects
+CREATE OR REPLACE FUNCTION public.jsonb_set_path(p_doc jsonb, p_path text[], p_value jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+  i integer;
+  v_node jsonb;
+BEGIN
+  IF p_path IS NULL OR cardinality(p_path) = 0 THEN
+    RETURN p_value;
+  END IF;
+  p_doc := public.jsonb_unwrap(p_doc);
+  IF p_doc IS NULL OR jsonb_typeof(p_doc) NOT IN ('object', 'array') THEN
+    p_doc := '{}'::jsonb;
+  END IF;
+  FOR i IN 1 .. cardinality(p_path) - 1 LOOP
+    v_node := public.jsonb_unwrap(p_doc #> p_path[1:i]);
+    IF v_node IS NULL OR jsonb_typeof(v_node) NOT IN ('object', 'array') THEN
+      v_node := '{}'::jsonb;
+    END IF;
+    p_doc := jsonb_set(p_doc, p_path[1:i], v_node, true);
+  END LOOP;
+  RETURN jsonb_set(p_doc, p_path, p_value, true);
+END;
+$$;
+
+-- 0-based index of the first array element whose p_key equals p_value
+CREATE OR REPLACE FUNCTION public.jsonb_array_position(p_arr jsonb, p_key text, p_value jsonb)
+RETURNS integer
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT (e.n - 1)::integer
+  FROM jsonb_array_elements(
+    CASE WHEN jsonb_typeof(p_arr) = 'array' THEN p_arr ELSE '[]'::jsonb END
+  ) WITH ORDINALITY AS e(value, n)
+  WHERE public.jsonb_unwrap(e.value) -> p_key = p_value
+  ORDER BY e.n
+  LIMIT 1
+$$;
+
+CREATE OR REPLACE FUNCTION public.jsonb_apply_ops(p_doc jsonb, p_ops jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+  v_op jsonb;
+  v_path text[];
+  v_value jsonb;
+  v_node jsonb;
+  v_item jsonb;
+  v_key text;
+  v_idx integer;
+BEGIN
+  p_doc := COALESCE(public.jsonb_unwrap(p_doc), '{}'::jsonb);
+  IF jsonb_typeof(p_ops) <> 'array' THEN
+    RAISE EXCEPTION 'jsonb patch must be an array of operations' USING ERRCODE = '22023';
+  END IF;
+
+  FOR v_op IN SELECT value FROM jsonb_array_elements(p_ops) LOOP
+    v_path := ARRAY(SELECT jsonb_array_elements_text(COALESCE(v_op -> 'path', '[]'::jsonb)));
+    v_value := COALESCE(v_op -> 'value', 'null'::jsonb);
+    v_node := public.jsonb_get_path(p_doc, v_path);
+
+    CASE v_op ->> 'op'
+    WHEN 'set' THEN
+      p_doc := public.jsonb_set_path(p_doc, v_path, v_value);
+
+    WHEN 'merge' THEN
+      IF v_node IS NULL OR jsonb_typeof(v_node) <> 'object' THEN
+        v_node := '{}'::jsonb;
+      END IF;
+      p_doc := public.jsonb_set_path(p_doc, v_path, v_node || v_value);
+
+    WHEN 'append' THEN
+      IF v_node IS NULL OR jsonb_typeof(v_node) <> 'array' THEN
+        v_node := '[]'::jsonb;
+      END IF;
+      IF jsonb_typeof(v_value) <> 'array' THEN
+        v_value := jsonb_build_array(v_value);
+      END IF;
+      v_key := v_op ->> 'unique_key';
+      FOR v_item IN SELECT value FROM jsonb_array_elements(v_value) LOOP
+        IF v_key IS NOT NULL AND v_item -> v_key IS NOT NULL
+           AND public.jsonb_array_position(v_node, v_key, v_item -> v_key) IS NOT NULL THEN
+          CONTINUE;
+        END IF;
+        IF COALESCE((v_op ->> 'distinct')::boolean, false) AND v_node @> jsonb_build_array(v_item) THEN
+          CONTINUE;
+        END IF;
+        v_node := v_node || jsonb_build_array(v_item);
+      END LOOP;
+      p_doc := public.jsonb_set_path(p_doc, v_path, v_node);
+
+    WHEN 'update_element' THEN
+      IF v_node IS NULL OR jsonb_typeof(v_node) <> 'array' THEN
+        v_node := '[]'::jsonb;
+      END IF;
+      v_idx := public.jsonb_array_position(v_node, v_op ->> 'match_key', v_op -> 'match_value');
+      IF v_idx IS NOT NULL THEN
+        v_item := public.jsonb_unwrap(v_node -> v_idx);
+        IF jsonb_typeof(v_item) <> 'object' THEN
+          v_item := '{}'::jsonb;
+        END IF;
+        v_node := jsonb_set(v_node, ARRAY[v_idx::text], v_item || v_value);
+        p_doc := public.jsonb_set_path(p_doc, v_path, v_node);
+      ELSIF v_op ? 'insert' THEN
+        p_doc := public.jsonb_set_path(p_doc, v_path, v_node || jsonb_build_array(v_op -> 'insert'));
+      END IF;
+
+    ELSE
+      RAISE EXCEPTION 'unknown jsonb patch op: %', v_op ->> 'op' USING ERRCODE = '22023';
+    END CASE;
+  END LOOP;
+  RETURN p_doc;
+END;
+$$;
+
+-- Apply a patch to one JSONB column of a case in a single UPDATE and return
+-- the value at p_return_path (the whole column when NULL). Raises P0002
+-- (PostgREST 404) when the case does not exist.
+CREATE OR REPLACE FUNCTION public.case_jsonb_patch(
+  p_case_id uuid,
+  p_column text,
+  p_ops jsonb,
+  p_return_path text[] DEFAULT NULL,
+  p_touch boolean DEFAULT false
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_result jsonb;
+  v_rows integer;
+BEGIN
+  IF p_column NOT IN ('call_summary', 'call_details', 'letters', 'metadata', 'document_summaries', 'followups') THEN
+    RAISE EXCEPTION 'jsonb patch not allowed on cases.%', p_column USING ERRCODE = '22023';
+  END IF;
+
+  EXECUTE format(
+    'UPDATE public.cases
+        SET %1$I = public.jsonb_apply_ops(%1$I, $1),
+            updated_at = CASE WHEN $4 THEN now() ELSE updated_at END
+      WHERE id = $2
+  RETURNING public.jsonb_get_path(%1$I, $3)',
+    p_column
+  )
+  INTO v_result
+  USING p_ops, p_case_id, p_return_path, p_touch;
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  IF v_rows = 0 THEN
+    RAISE EXCEPTION 'case % not found', p_case_id USING ERRCODE = 'P0002';
+  END IF;
+  RETURN v_result;
+END;
+$$;
+
+-- Single-operation shortcuts
+
+-- Set the value at p_path; returns the new value
+CREATE OR REPLACE FUNCTION public.case_jsonb_set(p_case_id uuid, p_column text, p_path text[], p_value jsonb)
+RETURNS jsonb
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT public.case_jsonb_patch(
+    p_case_id, p_column,
+    jsonb_build_array(jsonb_build_object('op', 'set', 'path', to_jsonb(p_path), 'value', p_value)),
+    p_path
+  )
+$$;
+
+-- Append items to the array at p_path; returns the resulting array
+CREATE OR REPLACE FUNCTION public.case_jsonb_append(
+  p_case_id uuid,
+  p_column text,
+  p_path text[],
+  p_items jsonb,
+  p_unique_key text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT public.case_jsonb_patch(
+    p_case_id, p_column,
+    jsonb_build_array(jsonb_build_object(
+      'op', 'append', 'path', to_jsonb(p_path), 'value', p_items, 'unique_key', p_unique_key
+    )),
+    p_path
+  )
+$$;
+
+-- Merge p_patch into the first element of the array at p_path whose
+-- p_match_key equals p_match_value; returns that element (NULL if none matched)
+CREATE OR REPLACE FUNCTION public.case_jsonb_update_element(
+  p_case_id uuid,
+  p_column text,
+  p_path text[],
+  p_match_key text,
+  p_match_value jsonb,
+  p_patch jsonb
+)
+RETURNS jsonb
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH updated AS (
+    SELECT public.case_jsonb_patch(
+      p_case_id, p_column,
+      jsonb_build_array(jsonb_build_object(
+        'op', 'update_element', 'path', to_jsonb(p_path),
+        'match_key', p_match_key, 'match_value', p_match_value, 'value', p_patch
+      )),
+      p_path
+    ) AS arr
+  )
+  SELECT arr -> public.jsonb_array_position(arr, p_match_key, p_match_value) FROM updated
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.case_jsonb_patch(uuid, text, jsonb, text[], boolean) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.case_jsonb_set(uuid, text, text[], jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.case_jsonb_append(uuid, text, text[], jsonb, text) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.case_jsonb_update_element(uuid, text, text[], text, jsonb, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.case_jsonb_patch(uuid, text, jsonb, text[], boolean) TO service_role;
+GRANT EXECUTE ON FUNCTION public.case_jsonb_set(uuid, text, text[], jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION public.case_jsonb_append(uuid, text, text[], jsonb, text) TO service_role;
+GRANT EXECUTE ON FUNCTION public.case_jsonb_update_element(uuid, text, text[], text, jsonb, jsonb) TO service_role;
+
+NOTIFY pgrst, 'reload schema';
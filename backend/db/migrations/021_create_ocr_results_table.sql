@@ -0,0 +1,23 @@
+-- Migration: shared OCR result cache
+-- Per-page OCR text keyed by the sha256 of the file bytes and the OCR engine
+-- version, so a document is sent to Google Vision once no matter how many
+-- endpoints (eligibility check/submit, process-documents, document summary)
+-- or hosts read it. Written by the backend when OCR_CACHE_DB is enabled;
+-- each host also keeps a local SQLite copy (app/ocr_cache.py).
+
+CREATE TABLE IF NOT EXISTS public.ocr_results (
+  sha256 text NOT NULL,
+  engine_version text NOT NULL,
+  page_count integer NOT NULL,
+  pages jsonb NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (sha256, engine_version)
+);
+
+COMMENT ON TABLE public.ocr_results IS 'Per-page OCR text by file sha256 and OCR engine version (JSON array of strings, page order)';
+
+ALTER TABLE public.ocr_results ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.ocr_results FROM anon, authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.ocr_results TO service_role;
+
+NOTIFY pgrst, 'reload schema';
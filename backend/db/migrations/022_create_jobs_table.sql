@@ -0,0 +1,36 @@
+-- Migration: durable job store
+-- Background jobs (call analyses, document processing, ...) are written here
+-- by the backend when JOB_STORE=postgres, so any API worker or host can
+-- answer GET /jobs/{job_id} and jobs survive restarts. The process running a
+-- job upserts its row in batches; `owner` and `updated_at` (heartbeat) let
+-- readers spot jobs whose worker has gone away.
+
+CREATE TABLE IF NOT EXISTS public.jobs (
+  job_id text PRIMARY KEY,
+  job_type text NOT NULL,
+  status text NOT NULL,
+  user_id text,
+  metadata jsonb,
+  result jsonb,
+  error text,
+  created_at timestamptz NOT NULL,
+  started_at timestamptz,
+  completed_at timestamptz,
+  progress integer NOT NULL DEFAULT 0,
+  progress_message text,
+  partial jsonb,
+  pages jsonb,
+  owner text,
+  updated_at timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON public.jobs (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON public.jobs (status, created_at);
+
+COMMENT ON TABLE public.jobs IS 'JobQueue state shared between API workers (app/job_store.py)';
+
+ALTER TABLE public.jobs ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.jobs FROM anon, authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.jobs TO service_role;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,17 @@
+-- Migration: storage bucket of each case document
+-- Direct uploads may land in eligibility-documents as well as case-documents;
+-- readers (delete, process-documents) use this column instead of assuming
+-- case-documents.
+
+ALTER TABLE IF EXISTS public.case_documents
+ADD COLUMN IF NOT EXISTS storage_bucket text NOT NULL DEFAULT 'case-documents';
+
+-- Direct uploads registered before this column recorded the bucket in metadata
+UPDATE public.case_documents
+SET storage_bucket = metadata->>'bucket'
+WHERE metadata->>'bucket' IS NOT NULL
+  AND storage_bucket IS DISTINCT FROM metadata->>'bucket';
+
+COMMENT ON COLUMN public.case_documents.storage_bucket IS 'Supabase Storage bucket holding file_path';
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,13 @@
+-- Migration: idempotency keys on jobs
+-- JobQueue.create_job_once looks a key up here so a repeated submission
+-- (double click, frontend retry, call-details polling) landing on another
+-- API worker attaches to the existing job instead of starting a new one.
+
+ALTER TABLE IF EXISTS public.jobs
+ADD COLUMN IF NOT EXISTS idempotency_key text;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_idempotency_key
+ON public.jobs (idempotency_key, created_at DESC)
+WHERE idempotency_key IS NOT NULL;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,15 @@
+-- Migration: dead-letter state on jobs
+-- Jobs that fail for good (retries exhausted, permanent error or timeout) are
+-- flagged here with their traceback, so GET /admin/jobs/dead-letter lists them
+-- from every API worker and they survive restarts. Only the worker that ran a
+-- job can resubmit it; it keeps the function and arguments in memory.
+
+ALTER TABLE IF EXISTS public.jobs
+ADD COLUMN IF NOT EXISTS dead_letter boolean NOT NULL DEFAULT false,
+ADD COLUMN IF NOT EXISTS error_traceback text;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_dead_letter
+ON public.jobs (completed_at DESC)
+WHERE dead_letter;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Compare OCR rasterization profiles: bytes sent to Vision, render time,
+Vision latency and character-level agreement with the legacy renderer.
+
+Usage:
+  python backend/scripts/ocr_benchmark.py                      # render only
+  python backend/scripts/ocr_benchmark.py --vision             # also OCR (needs GOOGLE_VISION_API_KEY)
+  python backend/scripts/ocr_benchmark.py --vision some.pdf --max-pages 5 --json results.json
+
+With no files given it runs over backend/test_sample.pdf and the demo PDFs.
+Agreement is difflib's ratio between each variant's page text and the
+`legacy` (200 DPI colour PNG) text for the same page, whitespace-normalized.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import difflib
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from dotenv import load_dotenv
+load_dotenv(BACKEND_DIR / '.env')
+
+import httpx
+
+from app import ocr_engine
+
+DEFAULT_FILES = [
+    BACKEND_DIR / 'test_sample.pdf',
+    BACKEND_DIR / 'documents' / 'demo.pdf',
+    BACKEND_DIR / 'documents' / 'eligibility.pdf',
+    BACKEND_DIR.parent / 'extension' / 'demo.pdf',
+    BACKEND_DIR.parent / 'extension' / 'dummy2.pdf',
+]
+
+# name -> (profile, image format, quality)
+VARIANTS = {
+    'legacy': ('legacy', 'png', 0),
+    'adaptive-jpeg-80': ('adaptive', 'jpeg', 80),
+    'adaptive-jpeg-65': ('adaptive', 'jpeg', 65),
+    'adaptive-webp-75': ('adaptive', 'webp', 75),
+    'adaptive-png': ('adaptive', 'png', 0),
+}
+
+
+def b64_size(n: int) -> int:
+    return 4 * ((n + 2) // 3)
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def agreement(a: str, b: str) -> float:
+    a, b = normalize(a), normalize(b)
+    if not a and not b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+async def run_variant(client, path: Path, name: str, page_count: int, use_vision: bool) -> dict:
+    profile, image_format, quality = VARIANTS[name]
+    result = {'variant': name, 'pages': [], 'bytes': 0, 'render_s': 0.0, 'vision_s': 0.0}
+    for index in range(page_count):
+        started = time.perf_counter()
+        image = ocr_engine.render_page(index, path=str(path), profile=profile,
+                                       image_format=image_format, quality=quality)
+        render_s = time.perf_counter() - started
+        page = {'index': index, 'bytes': b64_size(len(image)), 'render_s': render_s}
+        if use_vision:
+            started = time.perf_counter()
+            page['text'] = await ocr_engine.vision_annotate(client, image, f'{path.name}_p{index + 1}_{name}')
+            page['vision_s'] = time.perf_counter() - started
+            result['vision_s'] += page['vision_s']
+        result['bytes'] += page['bytes']
+        result['render_s'] += render_s
+        result['pages'].append(page)
+    return result
+
+
+async def benchmark(files, variants, use_vision: bool, max_pages: int) -> list:
+    results = []
+    async with httpx.AsyncClient(timeout=ocr_engine.VISION_TIMEOUT) as client:
+        for path in files:
+            if not path.exists():
+                print(f'⚠️ Skipping missing file {path}')
+                continue
+            page_count = ocr_engine.pdf_page_count(path=str(path))
+            if max_pages:
+                page_count = min(page_count, max_pages)
+            runs = {name: await run_variant(client, path, name, page_count, use_vision) for name in variants}
+            if use_vision and 'legacy' in runs:
+                baseline = runs['legacy']['pages']
+                for run in runs.values():
+                    scores = [agreement(ref.get('text', ''), page.get('text', ''))
+                              for ref, page in zip(baseline, run['pages'])]
+                    run['agreement'] = sum(scores) / len(scores) if scores else None
+            results.append({'file': str(path), 'page_count': page_count, 'runs': list(runs.values())})
+    return results
+
+
+def print_report(results, use_vision: bool):
+    header = f"{'variant':<20}{'KB sent':>10}{'vs legacy':>11}{'render s':>10}"
+    if use_vision:
+        header += f"{'vision s':>10}{'agreement':>11}"
+    for item in results:
+        print(f"\n📄 {item['file']} ({item['page_count']} pages)")
+        print(header)
+        legacy_bytes = next((r['bytes'] for r in item['runs'] if r['variant'] == 'legacy'), None)
+        for run in item['runs']:
+            ratio = f"{run['bytes'] / legacy_bytes:.0%}" if legacy_bytes else '-'
+            line = f"{run['variant']:<20}{run['bytes'] / 1024:>10.0f}{ratio:>11}{run['render_s']:>10.2f}"
+            if use_vision:
+                score = run.get('agreement')
+                line += f"{run['vision_s']:>10.2f}{(f'{score:.3f}' if score is not None else '-'):>11}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OCR rasterization profiles')
+    parser.add_argument('files', nargs='*', help='PDF files (default: test_sample.pdf and demo PDFs)')
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='Comma-separated variant names')
+    parser.add_argument('--vision', action='store_true', help='Send pages to Vision to measure latency and agreement')
+    parser.add_argument('--max-pages', type=int, default=0, help='Only the first N pages of each file')
+    parser.add_argument('--json', help='Write raw results to this file')
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(unknown)} (choose from {', '.join(VARIANTS)})")
+    if args.vision and not os.getenv('GOOGLE_VISION_API_KEY'):
+        parser.error('--vision needs GOOGLE_VISION_API_KEY')
+
+    files = [Path(f) for f in args.files] or DEFAULT_FILES
+    results = asyncio.run(benchmark(files, variants, args.vision, args.max_pages))
+    print_report(results, args.vision)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Wrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
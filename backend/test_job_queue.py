@@ -5,14 +5,20 @@ Run this to ensure the job queue system is working correctly.
 Usage:
     python test_job_queue.py
 """
-import asyncio
+import os
 import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Add parent directory to path so we can import app modules
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.job_queue import get_job_queue, JobStatus
+from app.job_queue import (
+    get_job_queue, JobQueue, JobStatus, idempotency_key, RetryPolicy, TransientJobError, JOB_STALE_SECONDS
+)
+from app.job_store import JobStore, SQLiteJobStore
 
 
 async def simple_task(value: int):
@@ -127,6 +133,236 @@ async def test_job_queue():
     print(f"   Status: {job_dict['status']}")
     print(f"   Result: {job_dict['result']}")
     
+    print()
+    
+    # Test 6: Per-page partial results
+    print("Test 6: Per-page partial results")
+    job_id_6 = queue.create_job('document_processing', metadata={'test': 'value6'})
+    await queue.record_page(job_id_6, 1, 3, 'page two', 30, 70)
+    job = queue.get_job(job_id_6)
+    partial = job.to_dict(include_partial_text=True)['partial']
+    print(f"   After page 2 of 3: {partial}, progress={job.progress}%")
+    await queue.record_page(job_id_6, 0, 3, 'page one', 30, 70)
+    partial = job.to_dict(include_partial_text=True)['partial']
+    if partial['pages'] == ['page one', 'page two'] and partial['pages_done'] == 2 and job.progress == 56:
+        print(f"✅ Ready pages returned in order: {partial}")
+    else:
+        print(f"❌ Unexpected partial results: {partial}, progress={job.progress}%")
+    
+    print()
+    
+    # Test 7: Scheduler concurrency caps
+    print("Test 7: Per-type concurrency caps")
+    running = {'now': 0, 'peak': 0}
+    
+    async def tracked_task():
+        running['now'] += 1
+        running['peak'] = max(running['peak'], running['now'])
+        await asyncio.sleep(0.3)
+        running['now'] -= 1
+        return {'ok': True}
+    
+    limit = queue.concurrency_limit('call_analysis')
+    job_ids_7 = [queue.create_job('call_analysis', metadata={'test': 'value7'}) for _ in range(limit + 2)]
+    for jid in job_ids_7:
+        await queue.submit(jid, tracked_task)
+    print(f"   Last job while waiting: {queue.get_job(job_ids_7[-1]).progress_message}")
+    while any(queue.get_job(jid).status != JobStatus.COMPLETED for jid in job_ids_7):
+        await asyncio.sleep(0.1)
+    if running['peak'] == limit:
+        print(f"✅ At most {limit} call_analysis jobs ran at once")
+    else:
+        print(f"❌ Peak concurrency {running['peak']}, expected {limit}")
+    
+    print()
+    
+    # Test 8: Idempotent submission
+    print("Test 8: Idempotent submission")
+    key = idempotency_key('call_analysis', 'case-8', {'transcript': 'hello'})
+    job_id_8 = queue.create_job('call_analysis', metadata={'test': 'value8'}, idempotency_key=key)
+    await queue.submit(job_id_8, simple_task, 8)
+    duplicate = queue.create_job('call_analysis', metadata={'test': 'value8'}, idempotency_key=key)
+    await queue.submit(duplicate, simple_task, 8)
+    other = queue.create_job('call_analysis', idempotency_key=idempotency_key('call_analysis', 'case-8', {'transcript': 'bye'}))
+    if duplicate == job_id_8 and other != job_id_8 and queue.queue_depth('call_analysis') + queue._running['call_analysis'] == 1:
+        print(f"✅ Second submission attached to job {job_id_8}")
+    else:
+        print(f"❌ Duplicate submission created job {duplicate}")
+    while queue.get_job(job_id_8).status != JobStatus.COMPLETED:
+        await asyncio.sleep(0.1)
+    if queue.create_job('call_analysis', idempotency_key=key) == job_id_8:
+        print("✅ Completed result reused within the idempotency window")
+    else:
+        print("❌ Completed job was not reused")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(os.path.join(tmp, 'jobs.sqlite3'))
+        worker_a, worker_b = JobQueue(store=store), JobQueue(store=store)
+        worker_b.owner = 'other-host:1'
+        key_b = idempotency_key('call_analysis', 'case-8b', {'transcript': 'hello'})
+        job_a = await worker_a.create_job_once('call_analysis', {}, key_b)
+        await worker_a.flush()
+        job_b = await worker_b.create_job_once('call_analysis', {}, key_b)
+        if job_a == job_b and job_b not in worker_b.jobs:
+            print("✅ Submission on another worker attached through the job store")
+        else:
+            print(f"❌ Other worker created {job_b} instead of attaching to {job_a}")
+    
+    print()
+    
+    # Test 9: Streaming job changes
+    print("Test 9: Streaming job changes")
+    
+    async def stepped_task(job_id):
+        for step in (25, 50, 75):
+            await asyncio.sleep(0.1)
+            await queue.update_job_progress(job_id, step, f"Step {step}")
+        return {'done': True}
+    
+    job_id_9 = queue.create_job('call_analysis', metadata={'test': 'value9'})
+    events = []
+    
+    async def watch():
+        async for delta in queue.watch_job(job_id_9):
+            events.append(delta)
+    
+    watcher = asyncio.create_task(watch())
+    await asyncio.sleep(0)
+    await queue.submit(job_id_9, stepped_task, job_id_9)
+    await asyncio.wait_for(watcher, timeout=10)
+    progress_seen = [e['progress'] for e in events if 'progress' in e]
+    if events[-1].get('status') == 'completed' and 50 in progress_seen and 'job_type' not in events[-1]:
+        print(f"✅ Received {len(events)} events, progress {progress_seen}")
+    else:
+        print(f"❌ Unexpected events: {events}")
+    
+    async def paged_task(job_id):
+        for index in range(3):
+            await asyncio.sleep(0.1)
+            await queue.record_page(job_id, index, 3, f"page {index}")
+        return {'done': True}
+    
+    job_id_9b = queue.create_job('document_processing')
+    page_events = []
+    
+    async def watch_pages():
+        async for delta in queue.watch_job(job_id_9b, include_partial_text=True):
+            page_events.append(delta)
+    
+    watcher = asyncio.create_task(watch_pages())
+    await asyncio.sleep(0)
+    await queue.submit(job_id_9b, paged_task, job_id_9b)
+    await asyncio.wait_for(watcher, timeout=10)
+    streamed = list((page_events[0].get('partial') or {}).get('pages', []))
+    for delta in page_events[1:]:
+        streamed += (delta.get('partial') or {}).get('pages_added', [])
+    resent = any('pages' in (delta.get('partial') or {}) for delta in page_events[1:])
+    if streamed == ['page 0', 'page 1', 'page 2'] and not resent:
+        print("✅ Only newly ready pages streamed")
+    else:
+        print(f"❌ Unexpected page events: {page_events}")
+    
+    print()
+    
+    # Test 10: Retries, timeouts, cancellation and dead letters
+    print("Test 10: Retries, timeouts and cancellation")
+    calls = {'count': 0}
+    
+    async def flaky_task():
+        calls['count'] += 1
+        if calls['count'] < 3:
+            raise TransientJobError("rate limited")
+        return {'attempts': calls['count']}
+    
+    async def slow_task():
+        await asyncio.sleep(5)
+    
+    queue.policies['flaky'] = RetryPolicy(max_attempts=3, base_delay=0.05)
+    queue.policies['slow'] = RetryPolicy(max_attempts=3, timeout=0.2)
+    flaky_id = queue.create_job('flaky')
+    await queue.execute_job(flaky_id, flaky_task)
+    slow_id = queue.create_job('slow')
+    await queue.execute_job(slow_id, slow_task)
+    failing_id = queue.create_job('flaky')
+    await queue.execute_job(failing_id, failing_task)
+    if queue.get_job(flaky_id).status == JobStatus.COMPLETED and calls['count'] == 3:
+        print("✅ Transient errors retried until success")
+    else:
+        print(f"❌ Flaky job: {queue.get_job(flaky_id).status.value} after {calls['count']} calls")
+    dead = {entry['job_id']: entry for entry in await queue.list_dead_letters()}
+    if (queue.get_job(slow_id).error.startswith('timed out') and dead.get(slow_id, {}).get('attempts') == 1
+            and dead.get(failing_id, {}).get('attempts') == 1):
+        print("✅ Timeouts and permanent errors dead-lettered without retrying")
+    else:
+        print(f"❌ Unexpected dead letters: {dead}")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(os.path.join(tmp, 'jobs.sqlite3'))
+        worker_a, worker_b = JobQueue(store=store), JobQueue(store=store)
+        dead_id = worker_a.create_job('flaky')
+        await worker_a.execute_job(dead_id, failing_task)
+        await worker_a.flush()
+        listed = {entry['job_id']: entry for entry in await worker_b.list_dead_letters()}
+        entry = listed.get(dead_id, {})
+        retried = await worker_a.retry_dead_letter(dead_id)
+        await worker_a.flush()
+        if (entry.get('traceback') and entry.get('retriable') is False and retried
+                and not await worker_b.list_dead_letters()):
+            print("✅ Dead letters listed from the job store and cleared on retry")
+        else:
+            print(f"❌ Dead letter not shared through the store: {entry}, retried as {retried}")
+        if retried:
+            await worker_a.cancel_job(retried)
+    
+    cancel_id = queue.create_job('slow')
+    runner = asyncio.create_task(queue.execute_job(cancel_id, slow_task))
+    await asyncio.sleep(0.05)
+    cancelled = await queue.cancel_job(cancel_id)
+    await runner
+    if cancelled and queue.get_job(cancel_id).error == 'Cancelled':
+        print("✅ Running job cancelled")
+    else:
+        print(f"❌ Cancel failed: {queue.get_job(cancel_id).status.value}")
+    
+    print()
+    
+    # Test 11: SQLite job store
+    print("Test 11: SQLite job store")
+    try:
+        JobStore()
+        print("❌ JobStore interface could be instantiated")
+    except TypeError:
+        print("✅ JobStore is abstract")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(os.path.join(tmp, 'jobs.sqlite3'))
+        now = datetime.utcnow()
+        record = {
+            'job_id': 'round-trip', 'job_type': 'document_processing', 'status': 'completed',
+            'user_id': 'user-11', 'metadata': {'case_id': 'case-11', 'attempts': 2},
+            'result': {'pages': 2, 'summary': 'שלום'}, 'error': None,
+            'created_at': now.isoformat(), 'started_at': now.isoformat(), 'completed_at': now.isoformat(),
+            'progress': 100, 'progress_message': 'Completed', 'partial': {'page_count': 2},
+            'pages': {'0': 'one', '1': 'two'}, 'owner': 'host:1', 'updated_at': now.isoformat(),
+            'idempotency_key': 'key-11', 'dead_letter': False, 'error_traceback': None,
+        }
+        await store.save_many([record])
+        if await store.load('round-trip') == record:
+            print("✅ save_many/load round trip keeps every field")
+        else:
+            print(f"❌ Round trip changed the record: {await store.load('round-trip')}")
+        
+        stale_time = (now - timedelta(seconds=JOB_STALE_SECONDS + 60)).isoformat()
+        await store.save_many([{
+            **record, 'job_id': 'stale', 'status': 'running', 'result': None, 'completed_at': None,
+            'owner': 'gone-host:1', 'updated_at': stale_time, 'idempotency_key': None,
+        }])
+        stale = await JobQueue(store=store).fetch_job('stale')
+        if stale and stale.status == JobStatus.FAILED and 'gone-host:1' in (stale.error or ''):
+            print("✅ Job of a worker that stopped saving it is reported as failed")
+        else:
+            print(f"❌ Stale job reported as {stale and stale.status.value}: {stale and stale.error}")
+    
     print("\n=== All Tests Completed ===")
 
 
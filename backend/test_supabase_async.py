@@ -0,0 +1,76 @@
+"""
+Test the Supabase client's circuit breaker around cancelled requests.
+
+Usage:
+    python test_supabase_async.py
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+
+from app import supabase_async
+from app.supabase_async import CircuitBreaker, CircuitOpenError
+
+
+class HangingClient:
+    """Stands in for the shared AsyncClient; every request waits until cancelled."""
+
+    async def request(self, method, url, **kwargs):
+        await asyncio.sleep(3600)
+
+
+class OkClient:
+    async def request(self, method, url, **kwargs):
+        return httpx.Response(200, json=[], request=httpx.Request(method, url))
+
+
+async def test_circuit_breaker():
+    print("=== Testing Supabase circuit breaker ===\n")
+    url = 'https://example.supabase.co/rest/v1/breaker_test'
+    key = supabase_async._endpoint_key(url)
+    breaker = supabase_async._breakers[key] = CircuitBreaker(key, failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    original_client = supabase_async.get_http_client
+
+    # Test 1: a cancelled half-open trial gives its slot back
+    print("Test 1: Cancelled half-open trial")
+    try:
+        supabase_async.get_http_client = lambda: HangingClient()
+        trial = asyncio.create_task(supabase_async.request('GET', url, retries=1))
+        await asyncio.sleep(0.05)
+        if breaker.state == 'half_open':
+            print("✅ Trial request let through in half-open state")
+        else:
+            print(f"❌ Breaker in state {breaker.state} during the trial")
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+
+        supabase_async.get_http_client = lambda: OkClient()
+        try:
+            resp = await supabase_async.request('GET', url, retries=1)
+            if resp.status_code == 200 and breaker.state == 'closed':
+                print("✅ Next call allowed after the trial was cancelled, breaker closed")
+            else:
+                print(f"❌ Unexpected response {resp.status_code}, breaker {breaker.state}")
+        except CircuitOpenError:
+            print("❌ Endpoint still locked out after the trial was cancelled")
+    finally:
+        supabase_async.get_http_client = original_client
+        supabase_async._breakers.pop(key, None)
+        supabase_async._metrics.pop(key, None)
+
+    print("\n=== All Tests Completed ===")
+
+
+if __name__ == '__main__':
+    print("Starting Supabase client tests...\n")
+    asyncio.run(test_circuit_breaker())
+    print("\n✅ All tests passed!")